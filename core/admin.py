@@ -1,15 +1,17 @@
 from django.contrib import admin
+from django.template.response import TemplateResponse
 from .models import (
     PerfilUsuario, RolUsuario,
     MarcaVehiculo, ModeloVehiculo, Cliente, Vehiculo,
     EspecialidadMecanico, Mecanico, ZonaTrabajo,
-    Proveedor, Repuesto, Herramienta,
+    Proveedor, Repuesto, ConsumoRepuesto, Herramienta,
     Servicio, EstadoOT, OrdenTrabajo,
     ItemServicio, ItemRepuesto, HerramientaEnUso,
     BitacoraTrabajo, FotoBitacora,
     ControlCalidad,
     Notificacion
 )
+from .services.dashboard_cache import DashboardCache
 
 
 # ============================
@@ -69,9 +71,10 @@ class EspecialidadAdmin(admin.ModelAdmin):
 
 @admin.register(Mecanico)
 class MecanicoAdmin(admin.ModelAdmin):
-    list_display = ("nombre", "especialidad", "telefono", "cantidad_ayudantes")
+    list_display = ("nombre", "perfil", "especialidad", "telefono", "cantidad_ayudantes")
     list_filter = ("especialidad",)
     search_fields = ("nombre", "especialidad__nombre")
+    raw_id_fields = ("perfil",)
 
 
 @admin.register(ZonaTrabajo)
@@ -99,6 +102,15 @@ class RepuestoAdmin(admin.ModelAdmin):
     list_editable = ("stock", "precio_venta", "estado")
 
 
+@admin.register(ConsumoRepuesto)
+class ConsumoRepuestoAdmin(admin.ModelAdmin):
+    list_display = ("repuesto", "consumo_reciente", "consumo_promedio", "desviacion", "stock_seguridad", "calculado_en")
+    search_fields = ("repuesto__codigo", "repuesto__nombre")
+    # La tabla la llena el comando calcular_consumo
+    readonly_fields = ("repuesto", "consumo_promedio", "consumo_reciente", "desviacion",
+                       "estacionalidad", "stock_seguridad", "calculado_en")
+
+
 @admin.register(Herramienta)
 class HerramientaAdmin(admin.ModelAdmin):
     list_display = ("codigo", "nombre", "cantidad", "estado", "responsable_asignado")
@@ -154,6 +166,7 @@ class OrdenTrabajoAdmin(admin.ModelAdmin):
     )
     list_filter = ("estado", "prioridad", "en_lista_espera", "mecanico", "zona_trabajo")
     search_fields = ("vehiculo__patente", "cliente__nombre", "id")
+    readonly_fields = ("subtotal_servicios", "subtotal_repuestos")
 
     inlines = [ItemServicioInline, ItemRepuestoInline, HerramientaEnUsoInline, BitacoraInline]
 
@@ -201,3 +214,22 @@ class NotificacionAdmin(admin.ModelAdmin):
     list_filter = ("tipo", "leida")
     search_fields = ("orden__id", "mensaje", "emisor__usuario__username", "receptor__usuario__username")
     list_editable = ("leida",)
+
+
+# ============================
+#  MÉTRICAS DE CACHÉ
+# ============================
+
+def metricas_cache(request):
+    """Muestra los aciertos/fallos del caché de contadores del dashboard."""
+    dashboard_cache = DashboardCache()
+    if request.method == "POST":
+        dashboard_cache.reiniciar_estadisticas()
+
+    context = {
+        **admin.site.each_context(request),
+        "title": "Métricas del caché del dashboard",
+        "estadisticas": dashboard_cache.estadisticas(),
+        "ttl": dashboard_cache.ttl,
+    }
+    return TemplateResponse(request, "admin/core/metricas_cache.html", context)
@@ -1,7 +1,7 @@
 """
 Context processors para el sistema de taller mecánico.
 """
-from .models import PerfilUsuario
+from .helpers import contar_notificaciones_no_leidas
 
 
 def notificaciones(request):
@@ -9,18 +9,8 @@ def notificaciones(request):
     Context processor que agrega el contador de notificaciones no leídas
     a todos los templates.
     IMPORTANTE: Maneja casos donde el usuario no tiene perfil sin lanzar errores.
+    El conteo se comparte con la vista (se calcula una vez por request).
     """
-    context = {
-        'notif_no_leidas': 0,
+    return {
+        'notif_no_leidas': contar_notificaciones_no_leidas(request),
     }
-    
-    if request.user.is_authenticated:
-        try:
-            perfil = request.user.perfilusuario
-            context['notif_no_leidas'] = perfil.notificaciones_recibidas.filter(leida=False).count()
-        except (PerfilUsuario.DoesNotExist, AttributeError):
-            # Usuario autenticado pero sin perfil - no es un error crítico en el context processor
-            pass
-    
-    return context
-
@@ -6,7 +6,7 @@ from .models import (
     Cliente, Vehiculo, MarcaVehiculo, ModeloVehiculo,
     OrdenTrabajo, BitacoraTrabajo, Repuesto, Herramienta,
     ControlCalidad, Notificacion, Mecanico, EspecialidadMecanico,
-    ZonaTrabajo
+    ZonaTrabajo, EstadoOT
 )
 from .validators import validar_rut_chileno, validar_patente_chilena
 from .models import RolUsuario
@@ -132,12 +132,28 @@ class EditarRepuestoForm(forms.ModelForm):
     """Formulario para editar repuesto."""
     class Meta:
         model = Repuesto
-        fields = ("nombre", "descripcion", "precio_venta", "marca")
+        fields = ("nombre", "descripcion", "precio_venta", "marca", "punto_reorden", "tiempo_reposicion_dias")
         widgets = {
             "descripcion": forms.Textarea(attrs={"rows": 3}),
             "precio_venta": forms.NumberInput(attrs={"min": 0}),
+            "punto_reorden": forms.NumberInput(attrs={"min": 0}),
+            "tiempo_reposicion_dias": forms.NumberInput(attrs={"min": 0}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Opcionales: si no se envían se conserva el valor actual
+        self.fields["punto_reorden"].required = False
+        self.fields["tiempo_reposicion_dias"].required = False
+
+    def clean_punto_reorden(self):
+        valor = self.cleaned_data.get("punto_reorden")
+        return self.instance.punto_reorden if valor is None else valor
+
+    def clean_tiempo_reposicion_dias(self):
+        valor = self.cleaned_data.get("tiempo_reposicion_dias")
+        return self.instance.tiempo_reposicion_dias if valor is None else valor
+
 
 class MovimientoRepuestoForm(forms.Form):
     """Formulario para movimiento de stock."""
@@ -157,3 +173,25 @@ class EditarHerramientaForm(forms.ModelForm):
             "descripcion": forms.Textarea(attrs={"rows": 3}),
         }
 
+
+class ExportarInformesForm(forms.Form):
+    """Formulario para exportar los informes PDF de varias OTs en un ZIP."""
+    desde = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={'type': 'date'}), label="Entregadas desde"
+    )
+    hasta = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={'type': 'date'}), label="Entregadas hasta"
+    )
+    estado = forms.ModelChoiceField(queryset=EstadoOT.objects.all(), required=False, label="Estado")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get("desde")
+        hasta = cleaned_data.get("hasta")
+        
+        if not (desde or hasta or cleaned_data.get("estado")):
+            raise forms.ValidationError("Indique un rango de fechas o un estado.")
+        if desde and hasta and desde > hasta:
+            raise forms.ValidationError("La fecha 'desde' debe ser anterior a 'hasta'.")
+        
+        return cleaned_data
@@ -1,15 +1,17 @@
 """
 Funciones helper para el sistema de taller mecánico.
 """
-from .models import Mecanico, PerfilUsuario
+from .models import Mecanico, PerfilUsuario, Notificacion
+from .services.dashboard_cache import DashboardCache
 
 
 def obtener_mecanico_desde_usuario(user):
     """
     Obtiene el objeto Mecanico asociado a un usuario de forma segura.
     
-    Busca el Mecanico por el nombre completo del usuario (first_name + last_name).
-    Si no existe, lo crea automáticamente para evitar errores.
+    Usa el vínculo directo Mecanico.perfil (una consulta indexada) y guarda
+    el resultado en el propio objeto ``user``, que vive lo que dura el request,
+    así que llamadas repetidas en el mismo request no vuelven a consultar.
     
     Args:
         user: Usuario de Django
@@ -20,6 +22,9 @@ def obtener_mecanico_desde_usuario(user):
     if not user or not user.is_authenticated:
         return None
     
+    if hasattr(user, "_mecanico_cache"):
+        return user._mecanico_cache
+    
     try:
         perfil = user.perfilusuario
         if perfil.rol != "MECANICO":
@@ -27,27 +32,62 @@ def obtener_mecanico_desde_usuario(user):
     except PerfilUsuario.DoesNotExist:
         return None
     
-    # Buscar por nombre completo
-    nombre_completo = f"{user.first_name} {user.last_name}".strip()
+    mecanico = Mecanico.objects.filter(perfil=perfil).first()
     
-    # Si no hay nombre completo, usar username como fallback
-    if not nombre_completo or nombre_completo == "":
-        nombre_completo = user.username
+    # Mecánicos creados antes del vínculo directo: se enlazan una única vez
+    if mecanico is None:
+        mecanico = _vincular_mecanico_por_nombre(user, perfil)
     
-    # Buscar el mecánico
-    mecanico = Mecanico.objects.filter(nombre=nombre_completo).first()
+    user._mecanico_cache = mecanico
+    return mecanico
+
+
+def _vincular_mecanico_por_nombre(user, perfil):
+    """
+    Busca un Mecanico sin vincular cuyo nombre coincida con el usuario
+    (first_name + last_name, o username) y lo enlaza al perfil.
+    No crea mecánicos nuevos.
+    """
+    nombre_completo = f"{user.first_name} {user.last_name}".strip() or user.username
+    
+    mecanico = Mecanico.objects.filter(
+        nombre=nombre_completo,
+        perfil__isnull=True
+    ).order_by("pk").first()
     
-    # Si no existe, crearlo automáticamente
-    if not mecanico:
-        from .models import EspecialidadMecanico
-        # Obtener o crear especialidad por defecto
-        especialidad_default, _ = EspecialidadMecanico.objects.get_or_create(
-            nombre="General"
-        )
-        mecanico = Mecanico.objects.create(
-            nombre=nombre_completo,
-            especialidad=especialidad_default
-        )
+    if mecanico:
+        mecanico.perfil = perfil
+        mecanico.save(update_fields=["perfil"])
     
     return mecanico
 
+
+def contar_notificaciones_no_leidas(request):
+    """
+    Cuenta las notificaciones no leídas del usuario una sola vez por request.
+    
+    El resultado se guarda en el request, así la vista y el context processor
+    comparten la misma consulta, y en el caché del dashboard entre requests.
+    
+    Args:
+        request: HttpRequest actual
+        
+    Returns:
+        Cantidad de notificaciones no leídas (0 si no hay perfil)
+    """
+    if hasattr(request, "_notif_no_leidas"):
+        return request._notif_no_leidas
+    
+    no_leidas = 0
+    if request.user.is_authenticated:
+        try:
+            perfil = request.user.perfilusuario
+            no_leidas = DashboardCache().obtener(
+                DashboardCache.clave_no_leidas(perfil.pk),
+                lambda: Notificacion.objects.no_leidas(perfil).count()
+            )
+        except (PerfilUsuario.DoesNotExist, AttributeError):
+            pass
+    
+    request._notif_no_leidas = no_leidas
+    return no_leidas
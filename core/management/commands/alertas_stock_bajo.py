@@ -0,0 +1,26 @@
+"""
+Barrido periódico de stock bajo: crea la alerta del día para los repuestos bajo
+el umbral que no la tengan (ej: stock cargado por admin o SQL, o avisos del día
+anterior). Pensado para cron; repetirlo el mismo día no duplica alertas.
+Usa el punto de reorden de cada repuesto salvo que se indique --umbral.
+Uso: python manage.py alertas_stock_bajo [--umbral 3]
+"""
+from django.core.management.base import BaseCommand
+
+from core.services.inventory_manager import InventoryManager
+
+
+class Command(BaseCommand):
+    help = 'Crea las alertas de stock bajo pendientes del día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', type=int, default=None, help='Umbral común (default: punto_reorden de cada repuesto)')
+
+    def handle(self, *args, **options):
+        manager = InventoryManager(umbral_stock_bajo=options['umbral'])
+        repuestos = manager.verificar_stock_bajo()
+        alertas = manager.crear_alertas_stock_bajo(repuestos)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(repuestos)} repuestos con stock bajo, {len(alertas)} alertas nuevas."
+        ))
@@ -0,0 +1,96 @@
+"""
+Mide el ingreso de solicitudes de recepción (IntakeService): solicitudes por
+segundo y consultas por solicitud, para vehículos nuevos y recurrentes. Todo
+corre dentro de una transacción que se revierte al final: no deja datos.
+Uso: python manage.py benchmark_recepcion [--n 200] [--recurrentes 0.5]
+"""
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import ModeloVehiculo, Vehiculo
+from core.services.intake_service import IntakeService
+from core.management.commands.seed import generar_patente_chilena, generar_rut_chileno
+
+
+class Command(BaseCommand):
+    help = 'Mide el rendimiento del ingreso de solicitudes en recepción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=200, help='Solicitudes a registrar')
+        parser.add_argument(
+            '--recurrentes', type=float, default=0.5,
+            help='Fracción de solicitudes de vehículos ya registrados (0 a 1)'
+        )
+
+    def handle(self, *args, **options):
+        modelo = ModeloVehiculo.objects.select_related('marca').first()
+        if modelo is None:
+            raise CommandError("No hay modelos de vehículo; ejecute primero python manage.py seed.")
+
+        with transaction.atomic():
+            tiempos, consultas = self._medir(options['n'], options['recurrentes'], modelo)
+            transaction.set_rollback(True)
+
+        total = sum(sum(valores) for valores in tiempos.values())
+        cantidad = sum(len(valores) for valores in tiempos.values())
+        self.stdout.write(f"{cantidad} solicitudes en {total:.3f} s ({cantidad / total:.0f} por segundo)")
+        for tipo in ("nuevo", "recurrente"):
+            if not tiempos[tipo]:
+                continue
+            self.stdout.write(
+                f"  {tipo}: {len(tiempos[tipo])} solicitudes, "
+                f"{statistics.fmean(tiempos[tipo]) * 1000:.2f} ms promedio, "
+                f"consultas {min(consultas[tipo])}-{max(consultas[tipo])}"
+            )
+        self.stdout.write(self.style.SUCCESS("Datos del benchmark revertidos."))
+
+    def _medir(self, n, recurrentes, modelo):
+        servicio = IntakeService()
+        registrados = list(
+            Vehiculo.objects.select_related('cliente').values_list('patente', 'cliente__rut', 'kilometraje')
+        )
+        usadas = {patente for patente, _, _ in registrados}
+        tiempos = {"nuevo": [], "recurrente": []}
+        consultas = {"nuevo": [], "recurrente": []}
+
+        for _ in range(n):
+            recurrente = registrados and random.random() < recurrentes
+            if recurrente:
+                indice = random.randrange(len(registrados))
+                patente, rut, kilometraje = registrados[indice]
+                kilometraje += random.randint(1000, 10000)
+                registrados[indice] = (patente, rut, kilometraje)
+            else:
+                patente = generar_patente_chilena()
+                while patente in usadas:
+                    patente = generar_patente_chilena()
+                usadas.add(patente)
+                rut, kilometraje = generar_rut_chileno(), random.randint(0, 200000)
+
+            datos = {
+                "rut": rut, "nombre": "Cliente benchmark", "telefono": "+56900000000", "email": "",
+                "patente": patente, "marca": modelo.marca, "modelo": modelo,
+                "anio": 2020, "kilometraje": kilometraje,
+                "motivo": "Benchmark", "descripcion": "Solicitud de prueba", "fecha": date.today(),
+            }
+
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                exito, mensaje, _ = servicio.registrar_solicitud(datos)
+                duracion = time.perf_counter() - inicio
+            if not exito:
+                raise CommandError(mensaje)
+
+            tipo = "recurrente" if recurrente else "nuevo"
+            tiempos[tipo].append(duracion)
+            consultas[tipo].append(len(capturadas))
+            if not recurrente:
+                registrados.append((patente, rut, kilometraje))
+
+        return tiempos, consultas
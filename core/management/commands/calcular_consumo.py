@@ -0,0 +1,29 @@
+"""
+Recalcula la tabla ConsumoRepuesto (promedio, media móvil, desviación,
+estacionalidad y stock de seguridad por repuesto) desde el historial de
+ItemRepuesto. Pensado para cron nocturno.
+Uso: python manage.py calcular_consumo [--ventana 365] [--ventana-movil 30] [--z 1.65]
+"""
+from django.core.management.base import BaseCommand
+
+from core.services.consumption_analytics import ConsumptionAnalytics
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas de consumo de repuestos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ventana', type=int, default=None, help='Días de historial')
+        parser.add_argument('--ventana-movil', type=int, default=None, help='Días de la media móvil')
+        parser.add_argument('--z', type=float, default=None, help='Factor z del nivel de servicio')
+
+    def handle(self, *args, **options):
+        analytics = ConsumptionAnalytics(
+            ventana_dias=options['ventana'],
+            ventana_movil_dias=options['ventana_movil'],
+            z_servicio=options['z'],
+        )
+        total = analytics.recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f"Consumo recalculado para {total} repuestos ({analytics.ventana_dias} días)."
+        ))
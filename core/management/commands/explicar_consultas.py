@@ -0,0 +1,85 @@
+"""
+Muestra el plan de ejecución (EXPLAIN QUERY PLAN en SQLite) de las consultas
+más frecuentes y verifica que cada una use el índice esperado (no basta con
+que use alguno: el índice simple de una FK también "usa índice").
+Termina con error si alguna consulta usa otro índice o recorre la tabla.
+Uso: python manage.py explicar_consultas
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import OrdenTrabajo, Notificacion, Repuesto, Herramienta, Mecanico, PerfilUsuario
+from core.services.reorder_planner import ORDEN_URGENCIA, ReorderPlanner
+from core.services.state_catalog import get_state_catalog
+
+
+def consultas_frecuentes():
+    """
+    Construye las consultas críticas de dashboard, planificación, mis_trabajos,
+    retirar_herramienta, notificaciones, inventario, herramientas y reposición.
+
+    Returns:
+        Lista de tuplas (nombre, queryset, índice esperado)
+    """
+    catalogo = get_state_catalog()
+    mecanico = Mecanico.objects.order_by("pk").first()
+    perfil = PerfilUsuario.objects.order_by("pk").first()
+    mecanico_id = mecanico.pk if mecanico else 0
+    perfil_id = perfil.pk if perfil else 0
+
+    return [
+        ("dashboard: OTs atrasadas", OrdenTrabajo.objects.filter(
+            fecha_estimada_entrega__lt=date.today(),
+            estado_id__in=catalogo.ids_de("EN_PROGRESO")
+        ), "ot_estado_fecha_est_idx"),
+        ("planificacion: pendientes por ingreso", OrdenTrabajo.objects.filter(
+            estado_id__in=catalogo.ids_de("PENDIENTE", "EN_ESPERA")
+        ).order_by("fecha_ingreso", "id"), "ot_estado_fecha_ing_idx"),
+        ("mis_trabajos: OTs del mecánico", OrdenTrabajo.objects.filter(
+            mecanico_id=mecanico_id,
+            estado_id__in=catalogo.ids_de("EN_PROGRESO", "PENDIENTE")
+        ).order_by("fecha_ingreso"), "ot_mecanico_estado_idx"),
+        ("retirar_herramienta: OT activa del mecánico", OrdenTrabajo.objects.filter(
+            mecanico_id=mecanico_id,
+            estado_id__in=catalogo.ids_de("EN_PROGRESO")
+        ), "ot_mecanico_estado_idx"),
+        ("notificaciones: no leídas del receptor", Notificacion.objects.no_leidas(perfil_id),
+         "notif_receptor_leida_idx"),
+        ("notificaciones: listado del receptor", Notificacion.objects.filter(
+            receptor_id=perfil_id
+        ).order_by("-creada_en", "-id"), "notif_receptor_creada_idx"),
+        ("inventario: stock bajo", Repuesto.objects.stock_bajo(), "repuesto_stock_idx"),
+        ("inventario: página por nombre", Repuesto.objects.order_by("nombre", "id")[:51],
+         "repuesto_nombre_idx"),
+        ("herramientas: página por nombre", Herramienta.objects.order_by("nombre", "id")[:51],
+         "herramienta_nombre_idx"),
+        ("reposicion: más próximos al quiebre", ReorderPlanner.candidatos().filter(
+            dias_hasta_quiebre__isnull=False
+        ).order_by(*ORDEN_URGENCIA)[:20], "repuesto_quiebre_idx"),
+    ]
+
+
+def usa_indice(plan: str, indice: str) -> bool:
+    """True si el plan busca o recorre con ``indice`` (USING [COVERING] INDEX <indice>)."""
+    return f" INDEX {indice} " in f"{plan} ".replace("\n", " ")
+
+
+class Command(BaseCommand):
+    help = 'Imprime EXPLAIN QUERY PLAN de las consultas frecuentes y verifica el índice que usa cada una'
+
+    def handle(self, *args, **options):
+        fallidas = []
+        for nombre, queryset, indice in consultas_frecuentes():
+            plan = queryset.explain()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre}"))
+            self.stdout.write(plan)
+            if usa_indice(plan, indice):
+                self.stdout.write(self.style.SUCCESS(f"  ✓ usa {indice}"))
+            else:
+                self.stdout.write(self.style.WARNING(f"  ✗ no usa {indice}"))
+                fallidas.append(nombre)
+
+        if fallidas:
+            raise CommandError(f"Consultas sin su índice esperado: {', '.join(fallidas)}")
@@ -0,0 +1,32 @@
+"""
+Exporta órdenes (con totales), repuestos o notificaciones a CSV o XLSX sin
+cargar la tabla completa en memoria.
+Uso: python manage.py exportar_datos ordenes [--formato csv|xlsx] [--salida ordenes.csv]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.data_export import DataExporter, EXPORTACIONES
+
+
+class Command(BaseCommand):
+    help = 'Exporta órdenes, repuestos o notificaciones a CSV/XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', choices=sorted(EXPORTACIONES), help='Tabla a exportar')
+        parser.add_argument('--formato', choices=DataExporter.FORMATOS, default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (default: <nombre>.<formato>)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Filas por lectura del cursor')
+
+    def handle(self, *args, **options):
+        exportador = DataExporter(options['nombre'], chunk_size=options['chunk_size'])
+        salida = options['salida'] or f"{options['nombre']}.{options['formato']}"
+
+        if options['formato'] == 'xlsx':
+            if not exportador.xlsx_disponible():
+                raise CommandError('La exportación XLSX requiere openpyxl (pip install openpyxl).')
+            exportador.escribir_xlsx(salida)
+        else:
+            with open(salida, 'w', encoding='utf-8', newline='') as archivo:
+                archivo.writelines(exportador.lineas_csv())
+
+        self.stdout.write(self.style.SUCCESS(f"Exportación escrita en {salida}."))
@@ -0,0 +1,61 @@
+"""
+Exporta en un ZIP los informes PDF de las OTs entregadas en un rango de fechas
+y/o con un estado, renderizándolos en paralelo en todos los núcleos.
+Uso: python manage.py exportar_informes --desde 2026-09-01 --hasta 2026-09-30 [--estado FINALIZADO]
+     [--salida informes.zip] [--procesos 4]
+"""
+import os
+import shutil
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.pdf_report_queue import EstadoInforme, PdfReportQueue
+from core.services.report_builder import documentos_lote, ots_para_lote
+from core.services.state_catalog import get_state_catalog
+
+
+class Command(BaseCommand):
+    help = 'Exporta en un ZIP los informes PDF de varias OTs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha de entrega real mínima (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha de entrega real máxima (AAAA-MM-DD)')
+        parser.add_argument('--estado', help='Nombre del estado de las OTs (ej: FINALIZADO)')
+        parser.add_argument('--salida', default='informes.zip', help='Ruta del ZIP a escribir')
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos que renderizan en paralelo (default: núcleos disponibles)'
+        )
+
+    def handle(self, *args, **options):
+        if not (options['desde'] or options['hasta'] or options['estado']):
+            raise CommandError('Indique --desde/--hasta o --estado.')
+
+        estado_id = None
+        if options['estado']:
+            ids = get_state_catalog().ids_de(options['estado'])
+            if not ids:
+                raise CommandError(f"El estado '{options['estado']}' no existe.")
+            estado_id = ids[0]
+
+        ots = list(ots_para_lote(options['desde'], options['hasta'], estado_id))
+        if not ots:
+            self.stdout.write(self.style.WARNING('No hay órdenes que coincidan con el filtro.'))
+            return
+
+        cola = PdfReportQueue(workers=options['procesos'])
+        try:
+            lote_id = cola.encolar_lote(documentos_lote(ots))
+        finally:
+            cola.cerrar()
+
+        if cola.estado(lote_id) != EstadoInforme.LISTO:
+            raise CommandError('No se pudo generar la exportación.')
+
+        shutil.copyfile(cola.ruta_archivo(lote_id), options['salida'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ots)} informes exportados en {options['salida']}."
+        ))
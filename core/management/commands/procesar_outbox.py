@@ -0,0 +1,48 @@
+"""
+Worker que despacha los eventos pendientes del outbox de notificaciones.
+Solo se usa con NOTIFICACIONES_ASINCRONAS = True; en ese caso debe quedar
+corriendo junto al servidor (con --continuo) o no se crean notificaciones.
+Uso: python manage.py procesar_outbox [--lote 50] [--continuo] [--intervalo 2]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.notification_outbox import NotificationOutbox
+
+
+class Command(BaseCommand):
+    help = 'Despacha en lotes los eventos pendientes del outbox de notificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help='Eventos por lote')
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Sigue procesando indefinidamente (modo worker)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando el outbox está vacío (modo continuo)'
+        )
+
+    def handle(self, *args, **options):
+        outbox = NotificationOutbox()
+        total = {'procesados': 0, 'reintentos': 0, 'fallidos': 0}
+
+        while True:
+            resultado = outbox.procesar_lote(options['lote'])
+            for clave, valor in resultado.items():
+                total[clave] += valor
+
+            if not any(resultado.values()):
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox: {total['procesados']} procesados, "
+            f"{total['reintentos']} para reintento, {total['fallidos']} en dead letter."
+        ))
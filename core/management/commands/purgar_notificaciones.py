@@ -0,0 +1,42 @@
+"""
+Aplica la política de retención de notificaciones: agrupa los avisos repetidos
+y borra (o archiva y borra) las leídas más antiguas que N días, en lotes cortos.
+Uso: python manage.py purgar_notificaciones [--dias 90] [--lote 500]
+     [--archivar notificaciones.jsonl.gz] [--sin-compactar] [--pausa 0.1] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from core.services.notification_retention import NotificationRetention
+
+
+class Command(BaseCommand):
+    help = 'Compacta avisos repetidos y borra/archiva notificaciones leídas antiguas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Días que se conservan las leídas')
+        parser.add_argument('--lote', type=int, default=None, help='Filas por transacción')
+        parser.add_argument('--archivar', help='Archivo .jsonl.gz donde guardar las filas borradas')
+        parser.add_argument('--sin-compactar', action='store_true', help='No agrupar avisos repetidos')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa lo que se haría')
+
+    def handle(self, *args, **options):
+        retencion = NotificationRetention(
+            dias=options['dias'], lote=options['lote'], pausa=options['pausa']
+        )
+
+        if options['dry_run']:
+            duplicadas = sum(g['filas'] - 1 for g in retencion.duplicados())
+            self.stdout.write(
+                f"{duplicadas} avisos repetidos para compactar, "
+                f"{retencion.vencidas().count()} notificaciones leídas de más de {retencion.dias} días."
+            )
+            return
+
+        resultado = retencion.ejecutar(
+            archivo=options['archivar'], compactar=not options['sin_compactar']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['compactadas']} avisos repetidos compactados, "
+            f"{resultado['borradas']} notificaciones borradas."
+        ))
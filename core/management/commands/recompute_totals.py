@@ -0,0 +1,41 @@
+"""
+Repara en bloque los subtotales guardados de las OTs que no coinciden con sus
+ítems (ej: ítems cargados con bulk_create o SQL directo, que no envían señales).
+Uso: python manage.py recompute_totals [--dry-run] [--lote 500]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from core.models import OrdenTrabajo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los subtotales guardados de las OTs desfasadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa las OTs desfasadas')
+        parser.add_argument('--lote', type=int, default=500, help='OTs por UPDATE')
+
+    def handle(self, *args, **options):
+        desfasadas = list(
+            OrdenTrabajo.objects.con_totales_calculados()
+            .exclude(
+                subtotal_servicios=F("servicios_calculado"),
+                subtotal_repuestos=F("repuestos_calculado"),
+            )
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(desfasadas)} OTs con totales desfasados.")
+            return
+
+        for inicio in range(0, len(desfasadas), options['lote']):
+            with transaction.atomic():
+                OrdenTrabajo.objects.filter(
+                    pk__in=desfasadas[inicio:inicio + options['lote']]
+                ).recalcular_totales()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(desfasadas)} OTs con totales recalculados."))
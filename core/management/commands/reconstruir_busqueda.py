@@ -0,0 +1,24 @@
+"""
+Reconstruye el índice de búsqueda global (tabla FTS5 core_busqueda) desde
+clientes, vehículos, OTs, repuestos y herramientas. Necesario después de
+migrar y de cargas masivas que no disparan señales (seed, bulk_create).
+Uso: python manage.py reconstruir_busqueda [--lote 2000]
+"""
+from django.core.management.base import BaseCommand
+
+from core.services.search_index import SearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda global'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help='Documentos por inserción')
+
+    def handle(self, *args, **options):
+        totales = SearchIndex(lote=options['lote']).reconstruir()
+        for tipo, total in totales.items():
+            self.stdout.write(f"  {tipo}: {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice reconstruido con {sum(totales.values())} documentos."
+        ))
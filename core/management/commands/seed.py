@@ -185,7 +185,9 @@ class Command(BaseCommand):
             else:
                 # Usuario ya existe, verificar que tenga perfil
                 if not hasattr(user, 'perfilusuario'):
-                    PerfilUsuario.objects.create(usuario=user, rol=RolUsuario.MECANICO)
+                    perfil = PerfilUsuario.objects.create(usuario=user, rol=RolUsuario.MECANICO)
+                else:
+                    perfil = user.perfilusuario
             
             # Crear o obtener mecánico
             nombre_completo = f'{nombre} {apellido}'
@@ -201,6 +203,11 @@ class Command(BaseCommand):
             if mecanico_creado:
                 self.stdout.write(self.style.SUCCESS(f'  ✓ Mecánico {nombre_completo} creado'))
             
+            # Vincular mecánico con su usuario
+            if mecanico.perfil_id is None:
+                mecanico.perfil = perfil
+                mecanico.save(update_fields=['perfil'])
+            
             usuarios_creados['mecanicos'].append(mecanico)
             if user not in usuarios_creados['usuarios']:
                 usuarios_creados['usuarios'].append(user)
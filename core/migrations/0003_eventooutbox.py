@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_notificacion_orden'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_evento', models.CharField(max_length=50)),
+                ('datos', models.JSONField(blank=True, default=dict, help_text='Resto de claves del evento.')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('PROCESADO', 'Procesado'), ('FALLIDO', 'Fallido (dead letter)')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('lote', models.CharField(blank=True, default='', help_text='Token del worker que lo tomó.', max_length=32)),
+                ('disponible_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+                ('emisor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_outbox', to='core.perfilusuario')),
+                ('orden', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventos_outbox', to='core.ordentrabajo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'disponible_en'], name='outbox_estado_disp_idx'), models.Index(fields=['lote'], name='outbox_lote_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_eventooutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mecanico',
+            name='perfil',
+            field=models.OneToOneField(blank=True, help_text='Usuario del sistema asociado a este mecánico.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mecanico', to='core.perfilusuario'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def vincular_mecanicos(apps, schema_editor):
+    """
+    Enlaza cada Mecanico existente con el PerfilUsuario MECANICO cuyo nombre
+    coincide (first_name + last_name, o username como respaldo), que era la
+    regla usada antes del vínculo directo.
+    """
+    Mecanico = apps.get_model("core", "Mecanico")
+    PerfilUsuario = apps.get_model("core", "PerfilUsuario")
+
+    sin_vincular = {}
+    for mecanico in Mecanico.objects.filter(perfil__isnull=True).order_by("pk"):
+        sin_vincular.setdefault(mecanico.nombre, mecanico)
+
+    perfiles = PerfilUsuario.objects.filter(
+        rol="MECANICO", mecanico__isnull=True
+    ).select_related("usuario").order_by("pk")
+
+    for perfil in perfiles:
+        usuario = perfil.usuario
+        nombre = f"{usuario.first_name} {usuario.last_name}".strip() or usuario.username
+        mecanico = sin_vincular.pop(nombre, None)
+        if mecanico:
+            mecanico.perfil = perfil
+            mecanico.save(update_fields=["perfil"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_mecanico_perfil'),
+    ]
+
+    operations = [
+        migrations.RunPython(vincular_mecanicos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_backfill_mecanico_perfil'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['receptor', 'leida', 'creada_en'], name='notif_receptor_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['receptor', 'creada_en'], name='notif_receptor_creada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['estado', 'fecha_estimada_entrega'], name='ot_estado_fecha_est_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['mecanico', 'estado'], name='ot_mecanico_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['estado', 'fecha_ingreso'], name='ot_estado_fecha_ing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repuesto',
+            index=models.Index(fields=['stock'], name='repuesto_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='herramienta',
+            index=models.Index(fields=['nombre', 'id'], name='herramienta_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repuesto',
+            index=models.Index(fields=['nombre', 'id'], name='repuesto_nombre_idx'),
+        ),
+    ]
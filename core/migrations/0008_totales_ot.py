@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:10
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    """Llena los subtotales de las OTs existentes desde sus ítems (un UPDATE)."""
+    OrdenTrabajo = apps.get_model("core", "OrdenTrabajo")
+    ItemServicio = apps.get_model("core", "ItemServicio")
+    ItemRepuesto = apps.get_model("core", "ItemRepuesto")
+
+    servicios = (
+        ItemServicio.objects.filter(orden=OuterRef("pk"))
+        .values("orden").annotate(suma=Sum("precio")).values("suma")
+    )
+    repuestos = (
+        ItemRepuesto.objects.filter(orden=OuterRef("pk"))
+        .values("orden").annotate(suma=Sum(F("cantidad") * F("precio_unitario"))).values("suma")
+    )
+    OrdenTrabajo.objects.update(
+        subtotal_servicios=Coalesce(Subquery(servicios), 0),
+        subtotal_repuestos=Coalesce(Subquery(repuestos), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordentrabajo',
+            name='subtotal_repuestos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ordentrabajo',
+            name='subtotal_servicios',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
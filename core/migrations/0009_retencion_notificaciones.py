@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_totales_ot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='repeticiones',
+            field=models.PositiveIntegerField(default=1, help_text='Avisos idénticos agrupados en esta fila (compactación)'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['leida', 'creada_en'], name='notif_leida_creada_idx'),
+        ),
+    ]
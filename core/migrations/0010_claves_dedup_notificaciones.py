@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:31
+
+from django.db import migrations, models
+from django.db.models import CharField, Max, Value
+from django.db.models.functions import Cast, Concat
+
+
+def claves_atraso(apps, schema_editor):
+    """
+    Asigna atraso:<ot_id> a los avisos de atraso existentes (solo el más reciente
+    por OT y receptor, para no chocar con la restricción única).
+    """
+    Notificacion = apps.get_model("core", "Notificacion")
+    ultimas = (
+        Notificacion.objects.filter(tipo="ATRASO_TRABAJO", orden__isnull=False)
+        .values("orden_id", "receptor_id")
+        .annotate(ultima=Max("id"))
+        .values_list("ultima", flat=True)
+    )
+    Notificacion.objects.filter(pk__in=list(ultimas)).update(
+        clave_dedup=Concat(Value("atraso:"), Cast("orden_id", CharField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_retencion_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='clave_dedup',
+            field=models.CharField(blank=True, help_text='Identifica el aviso para no repetirlo (ej: stock_bajo:<repuesto_id>, atraso:<ot_id>)', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='periodo',
+            field=models.CharField(blank=True, default='', help_text='Ventana de la clave (ej: la fecha en avisos diarios); vacío = sin vencimiento', max_length=20),
+        ),
+        migrations.RunPython(claves_atraso, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notificacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('clave_dedup__isnull', False)), fields=('clave_dedup', 'periodo', 'receptor'), name='notif_dedup_unica'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_claves_dedup_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repuesto',
+            name='punto_reorden',
+            field=models.PositiveIntegerField(default=3, help_text='Con stock bajo este valor el repuesto se considera en stock bajo'),
+        ),
+        migrations.AddField(
+            model_name='repuesto',
+            name='tiempo_reposicion_dias',
+            field=models.PositiveIntegerField(default=7, help_text='Días que tarda el proveedor en entregar un pedido'),
+        ),
+        migrations.AddIndex(
+            model_name='repuesto',
+            index=models.Index(fields=['punto_reorden'], name='repuesto_punto_reorden_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_reorden_repuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoRepuesto',
+            fields=[
+                ('repuesto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='consumo', serialize=False, to='core.repuesto')),
+                ('consumo_promedio', models.FloatField(default=0, help_text='Unidades por día en la ventana completa')),
+                ('consumo_reciente', models.FloatField(default=0, help_text='Media móvil diaria de los últimos días')),
+                ('desviacion', models.FloatField(default=0, help_text='Desviación estándar del consumo diario')),
+                ('estacionalidad', models.JSONField(blank=True, default=dict, help_text="Factor por mes ('1'..'12') respecto del promedio")),
+                ('stock_seguridad', models.PositiveIntegerField(default=0)),
+                ('calculado_en', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-consumo_reciente'], name='consumo_reciente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:05
+#
+# Tabla virtual FTS5 de la búsqueda global (core/services/search_index.py).
+# Se crea vacía: después de migrar se llena con
+# ``python manage.py reconstruir_busqueda``.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_consumo_repuestos'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE VIRTUAL TABLE core_busqueda USING fts5("
+                "tipo UNINDEXED, objeto_id UNINDEXED, titulo, contenido, "
+                "tokenize = 'unicode61 remove_diacritics 2', "
+                "prefix = '2 3'"
+                ")"
+            ),
+            reverse_sql="DROP TABLE core_busqueda",
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+import re
+
+from django.db import migrations, models
+
+
+def _normalizar(valor):
+    # Igual que validators.normalizar_rut / normalizar_patente a la fecha de la migración
+    return re.sub(r"[.\-\s]", "", valor or "").upper()
+
+
+def _llenar(Modelo, campo, campo_normalizado):
+    filas = list(Modelo.objects.values_list("pk", campo))
+    por_clave = {}
+    for pk, valor in filas:
+        por_clave.setdefault(_normalizar(valor), []).append(valor)
+
+    repetidos = {clave: valores for clave, valores in por_clave.items() if len(valores) > 1}
+    if repetidos:
+        raise RuntimeError(
+            f"{Modelo.__name__}: hay registros que solo difieren en el formato de "
+            f"{campo} y deben unificarse antes de migrar: {repetidos}"
+        )
+
+    Modelo.objects.bulk_update(
+        [Modelo(pk=pk, **{campo_normalizado: _normalizar(valor)}) for pk, valor in filas],
+        [campo_normalizado],
+        batch_size=500,
+    )
+
+
+def llenar_claves(apps, schema_editor):
+    """Calcula rut_normalizado y patente_normalizada de los registros existentes."""
+    _llenar(apps.get_model("core", "Cliente"), "rut", "rut_normalizado")
+    _llenar(apps.get_model("core", "Vehiculo"), "patente", "patente_normalizada")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_normalizado',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='patente_normalizada',
+            field=models.CharField(editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(llenar_claves, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut_normalizado',
+            field=models.CharField(editable=False, max_length=12, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='patente_normalizada',
+            field=models.CharField(editable=False, max_length=10, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_claves_normalizadas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ordentrabajo',
+            name='estado',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='core.estadoot'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+def llenar_reposicion(apps, schema_editor):
+    """
+    Copia el consumo de ConsumoRepuesto y calcula días hasta el quiebre
+    (igual que Repuesto.actualizar_reposicion a la fecha de la migración).
+    """
+    Repuesto = apps.get_model("core", "Repuesto")
+    ConsumoRepuesto = apps.get_model("core", "ConsumoRepuesto")
+    consumos = dict(
+        (repuesto_id, (diario, seguridad))
+        for repuesto_id, diario, seguridad in ConsumoRepuesto.objects.values_list(
+            "repuesto_id", "consumo_reciente", "stock_seguridad"
+        )
+    )
+
+    repuestos = []
+    for repuesto in Repuesto.objects.all().iterator(chunk_size=500):
+        diario, seguridad = consumos.get(repuesto.pk, (0.0, 0))
+        if diario:
+            dias = repuesto.stock / diario
+        else:
+            dias = 0.0 if repuesto.stock == 0 else None
+        repuesto.consumo_diario = diario
+        repuesto.stock_seguridad = seguridad
+        repuesto.dias_hasta_quiebre = dias
+        repuesto.requiere_reposicion = repuesto.estado != "DESCONTINUADO" and (
+            repuesto.stock < repuesto.punto_reorden
+            or repuesto.stock < seguridad
+            or (dias is not None and dias <= repuesto.tiempo_reposicion_dias)
+        )
+        repuestos.append(repuesto)
+
+    Repuesto.objects.bulk_update(
+        repuestos,
+        ["consumo_diario", "stock_seguridad", "dias_hasta_quiebre", "requiere_reposicion"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_indice_estado_ot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repuesto',
+            name='consumo_diario',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='repuesto',
+            name='dias_hasta_quiebre',
+            field=models.FloatField(editable=False, help_text='stock / consumo diario; vacío = sin consumo', null=True),
+        ),
+        migrations.AddField(
+            model_name='repuesto',
+            name='requiere_reposicion',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='repuesto',
+            name='stock_seguridad',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(llenar_reposicion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='repuesto',
+            index=models.Index(condition=models.Q(('requiere_reposicion', True)), fields=['dias_hasta_quiebre', 'stock', 'id'], name='repuesto_quiebre_idx'),
+        ),
+    ]
@@ -1,5 +1,63 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+
+from .validators import normalizar_patente, normalizar_rut
+
+
+# ============================
+#  SEGUIMIENTO DE CAMBIOS
+# ============================
+
+class SeguimientoCamposMixin:
+    """
+    Guarda los valores de ``campos_seguidos`` cuando la instancia se carga
+    desde la base de datos, para detectar cambios al guardar sin volver a
+    consultarla. El estado vive en la propia instancia (no en un caché de
+    módulo), por lo que es seguro con varios hilos atendiendo requests.
+    """
+    campos_seguidos = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._guardar_valores_originales()
+        return instancia
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Los receivers de post_save ya vieron los valores originales
+        self._guardar_valores_originales()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._guardar_valores_originales()
+
+    def _guardar_valores_originales(self):
+        # Los campos diferidos (only/defer) no se conocen todavía
+        self._valores_originales = {
+            campo: self.__dict__[campo]
+            for campo in self.campos_seguidos
+            if campo in self.__dict__
+        }
+
+    def valor_original(self, campo):
+        """Valor del campo al cargarse la instancia (None si es nueva)."""
+        originales = getattr(self, "_valores_originales", None)
+        if originales is None:
+            return None
+        if campo not in originales:
+            # Campo diferido: se consulta una sola vez
+            originales[campo] = (
+                type(self)._base_manager.filter(pk=self.pk).values_list(campo, flat=True).first()
+            )
+        return originales[campo]
+
+    def campo_cambio(self, campo):
+        """True si el valor actual del campo difiere del original."""
+        return self.valor_original(campo) != getattr(self, campo)
 
 
 # ============================
@@ -46,20 +104,77 @@ class ModeloVehiculo(models.Model):
         return f"{self.marca} {self.nombre}"
 
 
+def filtro_prefijo(campo, prefijo):
+    """
+    Filtro ``campo >= prefijo AND campo < prefijo siguiente`` para buscar por
+    prefijo con el índice del campo. (En SQLite ``startswith`` usa un LIKE que
+    no distingue mayúsculas y no aprovecha el índice.)
+
+    Ej: filtro_prefijo("patente_normalizada", "AB1") ->
+        {"patente_normalizada__gte": "AB1", "patente_normalizada__lt": "AB2"}
+    """
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    return {f"{campo}__gte": prefijo, f"{campo}__lt": siguiente}
+
+
+class ClienteQuerySet(models.QuerySet):
+    def por_rut(self, rut):
+        """Clientes cuyo RUT normalizado es exactamente el de ``rut`` (con o sin formato)."""
+        return self.filter(rut_normalizado=normalizar_rut(rut))
+
+    def con_prefijo_rut(self, texto):
+        """Clientes cuyo RUT normalizado empieza con ``texto`` normalizado (usa el índice único)."""
+        prefijo = normalizar_rut(texto)
+        if not prefijo:
+            return self.none()
+        return self.filter(**filtro_prefijo("rut_normalizado", prefijo)).order_by("rut_normalizado")
+
+
 class Cliente(models.Model):
     rut = models.CharField(max_length=12, unique=True)
+    # RUT sin puntos ni guion (validators.normalizar_rut): clave de búsqueda
+    rut_normalizado = models.CharField(max_length=12, unique=True, editable=False)
     nombre = models.CharField(max_length=150)
     telefono = models.CharField(max_length=20)
     email = models.EmailField(blank=True, null=True)
     direccion = models.CharField(max_length=200, blank=True, null=True)
 
+    objects = ClienteQuerySet.as_manager()
+
+    def clean(self):
+        # rut_normalizado no es editable: validate_unique de los formularios no lo revisa
+        if self.rut and Cliente.objects.por_rut(self.rut).exclude(pk=self.pk).exists():
+            raise ValidationError({"rut": "Ya existe un cliente con este RUT (con otro formato)."})
+
+    def save(self, *args, **kwargs):
+        self.rut_normalizado = normalizar_rut(self.rut)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "rut" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "rut_normalizado"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.nombre} ({self.rut})"
 
 
+class VehiculoQuerySet(models.QuerySet):
+    def por_patente(self, patente):
+        """Vehículos cuya patente normalizada es la de ``patente`` (con o sin formato)."""
+        return self.filter(patente_normalizada=normalizar_patente(patente))
+
+    def con_prefijo_patente(self, texto):
+        """Vehículos cuya patente normalizada empieza con ``texto`` normalizado (usa el índice único)."""
+        prefijo = normalizar_patente(texto)
+        if not prefijo:
+            return self.none()
+        return self.filter(**filtro_prefijo("patente_normalizada", prefijo)).order_by("patente_normalizada")
+
+
 class Vehiculo(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name="vehiculos")
     patente = models.CharField(max_length=10, unique=True)
+    # Patente sin espacios ni guiones y en mayúsculas: clave de búsqueda
+    patente_normalizada = models.CharField(max_length=10, unique=True, editable=False)
     marca = models.ForeignKey(MarcaVehiculo, on_delete=models.PROTECT)
     modelo = models.ForeignKey(ModeloVehiculo, on_delete=models.PROTECT)
     anio = models.PositiveIntegerField()
@@ -67,6 +182,20 @@ class Vehiculo(models.Model):
     fecha_ultimo_servicio = models.DateField(blank=True, null=True)
     golpes_observados = models.TextField(blank=True, null=True)
 
+    objects = VehiculoQuerySet.as_manager()
+
+    def clean(self):
+        # patente_normalizada no es editable: validate_unique de los formularios no la revisa
+        if self.patente and Vehiculo.objects.por_patente(self.patente).exclude(pk=self.pk).exists():
+            raise ValidationError({"patente": "Ya existe un vehículo con esta patente (con otro formato)."})
+
+    def save(self, *args, **kwargs):
+        self.patente_normalizada = normalizar_patente(self.patente)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "patente" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "patente_normalizada"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.patente} - {self.marca} {self.modelo}"
 
@@ -87,6 +216,14 @@ class EspecialidadMecanico(models.Model):
 
 
 class Mecanico(models.Model):
+    perfil = models.OneToOneField(
+        PerfilUsuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="mecanico",
+        help_text="Usuario del sistema asociado a este mecánico."
+    )
     nombre = models.CharField(max_length=150)
     rut = models.CharField(max_length=12, blank=True, null=True)
     telefono = models.CharField(max_length=20, blank=True, null=True)
@@ -127,7 +264,21 @@ class Proveedor(models.Model):
         return self.nombre
 
 
-class Repuesto(models.Model):
+class RepuestoQuerySet(models.QuerySet):
+    def stock_bajo(self):
+        """
+        Repuestos con stock bajo su punto de reorden.
+        El rango ``stock < MAX(punto_reorden)`` (subconsulta resuelta por
+        repuesto_punto_reorden_idx) permite recorrer solo el tramo bajo de
+        repuesto_stock_idx en vez de toda la tabla.
+        """
+        maximo = Repuesto.objects.order_by("-punto_reorden").values("punto_reorden")[:1]
+        return self.filter(stock__lt=models.Subquery(maximo)).filter(
+            stock__lt=models.F("punto_reorden")
+        )
+
+
+class Repuesto(SeguimientoCamposMixin, models.Model):
     ESTADO_CHOICES = [
         ("DISPONIBLE", "Disponible"),
         ("AGOTADO", "Agotado"),
@@ -153,6 +304,81 @@ class Repuesto(models.Model):
     fecha_ingreso = models.DateField()
     proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="DISPONIBLE")
+    punto_reorden = models.PositiveIntegerField(
+        default=3,
+        help_text="Con stock bajo este valor el repuesto se considera en stock bajo"
+    )
+    tiempo_reposicion_dias = models.PositiveIntegerField(
+        default=7,
+        help_text="Días que tarda el proveedor en entregar un pedido"
+    )
+
+    # Plan de reposición: consumo copiado de ConsumoRepuesto por calcular_consumo
+    # y días hasta el quiebre recalculados en save() (movimientos de stock)
+    consumo_diario = models.FloatField(default=0, editable=False)
+    stock_seguridad = models.PositiveIntegerField(default=0, editable=False)
+    dias_hasta_quiebre = models.FloatField(
+        null=True, editable=False, help_text="stock / consumo diario; vacío = sin consumo"
+    )
+    requiere_reposicion = models.BooleanField(default=False, editable=False)
+
+    CAMPOS_REPOSICION = (
+        "stock", "punto_reorden", "tiempo_reposicion_dias", "estado", "consumo_diario", "stock_seguridad",
+    )
+
+    # Stock (caché del dashboard y alertas) y datos del índice de búsqueda
+    campos_seguidos = (
+        "stock", "punto_reorden",
+        "codigo", "nombre", "marca", "fabricante", "modelo_compatible", "proveedor_id",
+    )
+
+    objects = RepuestoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Alertas y contador de stock bajo
+            models.Index(fields=["stock"], name="repuesto_stock_idx"),
+            # Inventario paginado por (nombre, id)
+            models.Index(fields=["nombre", "id"], name="repuesto_nombre_idx"),
+            # MAX(punto_reorden) acota el rango de stock a revisar
+            models.Index(fields=["punto_reorden"], name="repuesto_punto_reorden_idx"),
+            # Plan de reposición: los k más próximos al quiebre sin recorrer la tabla
+            models.Index(
+                fields=["dias_hasta_quiebre", "stock", "id"],
+                condition=models.Q(requiere_reposicion=True),
+                name="repuesto_quiebre_idx",
+            ),
+        ]
+
+    @property
+    def stock_bajo(self) -> bool:
+        return self.stock < self.punto_reorden
+
+    def actualizar_reposicion(self) -> None:
+        """
+        Recalcula dias_hasta_quiebre y requiere_reposicion: bajo el punto de
+        reorden o el stock de seguridad, o sin stock para cubrir el tiempo de
+        reposición del proveedor (los descontinuados no se reponen).
+        """
+        if self.consumo_diario:
+            self.dias_hasta_quiebre = self.stock / self.consumo_diario
+        else:
+            self.dias_hasta_quiebre = 0.0 if self.stock == 0 else None
+        self.requiere_reposicion = self.estado != "DESCONTINUADO" and (
+            self.stock_bajo
+            or self.stock < self.stock_seguridad
+            or (
+                self.dias_hasta_quiebre is not None
+                and self.dias_hasta_quiebre <= self.tiempo_reposicion_dias
+            )
+        )
+
+    def save(self, *args, **kwargs):
+        self.actualizar_reposicion()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_REPOSICION):
+            kwargs["update_fields"] = {*update_fields, "dias_hasta_quiebre", "requiere_reposicion"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
@@ -183,6 +409,12 @@ class Herramienta(models.Model):
     )
     fecha_ultima_mantencion = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Lista de herramientas paginada por (nombre, id)
+            models.Index(fields=["nombre", "id"], name="herramienta_nombre_idx"),
+        ]
+
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
 
@@ -214,7 +446,67 @@ class EstadoOT(models.Model):
         return self.nombre
 
 
-class OrdenTrabajo(models.Model):
+class OrdenTrabajoQuerySet(models.QuerySet):
+    """
+    Consultas compartidas de las listas de OT.
+    """
+
+    # Columnas que muestran planificacion y mis_trabajos, más los campos
+    # seguidos (así guardar o comparar no dispara consultas por fila)
+    CAMPOS_LISTADO = (
+        "id", "fecha_ingreso", "fecha_estimada_entrega", "motivo_ingreso", "prioridad",
+        "cliente", "cliente__nombre",
+        "vehiculo", "vehiculo__patente",
+        "estado", "estado__nombre",
+        "mecanico",
+    )
+
+    def para_listado(self):
+        """Trae cliente, vehículo y estado en la misma consulta, solo con las columnas de la tabla."""
+        return self.select_related("cliente", "vehiculo", "estado").only(*self.CAMPOS_LISTADO)
+
+    def recalcular_totales(self) -> int:
+        """
+        Reescribe los subtotales guardados desde los ítems con un único UPDATE.
+
+        Returns:
+            Cantidad de OTs actualizadas
+        """
+        return self.update(**self._totales_calculados())
+
+    def con_totales_calculados(self):
+        """Anota los subtotales calculados desde los ítems (para detectar desfases)."""
+        calculados = self._totales_calculados()
+        return self.annotate(
+            servicios_calculado=calculados["subtotal_servicios"],
+            repuestos_calculado=calculados["subtotal_repuestos"],
+        )
+
+    @staticmethod
+    def _totales_calculados():
+        servicios = (
+            ItemServicio.objects.filter(orden=models.OuterRef("pk"))
+            .values("orden").annotate(suma=models.Sum("precio")).values("suma")
+        )
+        repuestos = (
+            ItemRepuesto.objects.filter(orden=models.OuterRef("pk"))
+            .values("orden")
+            .annotate(suma=models.Sum(models.F("cantidad") * models.F("precio_unitario")))
+            .values("suma")
+        )
+        return {
+            "subtotal_servicios": Coalesce(models.Subquery(servicios), 0),
+            "subtotal_repuestos": Coalesce(models.Subquery(repuestos), 0),
+        }
+
+    def para_informe(self):
+        """Precarga todo lo que usa el informe PDF (totales incluidos) en un número fijo de consultas."""
+        return self.select_related(
+            "cliente", "vehiculo__marca", "vehiculo__modelo", "mecanico", "control_calidad"
+        ).prefetch_related("servicios__servicio", "repuestos__repuesto", "bitacoras")
+
+
+class OrdenTrabajo(SeguimientoCamposMixin, models.Model):
     PRIORIDAD_CHOICES = [
         ("BAJA", "Baja"),
         ("MEDIA", "Media"),
@@ -234,7 +526,9 @@ class OrdenTrabajo(models.Model):
     descripcion_problema = models.TextField()
     observaciones_iniciales = models.TextField(blank=True, null=True)
 
-    estado = models.ForeignKey(EstadoOT, on_delete=models.PROTECT)
+    # Sin índice propio: ot_estado_fecha_est_idx y ot_estado_fecha_ing_idx
+    # empiezan por estado (con el índice simple SQLite elegía ese y ordenaba aparte)
+    estado = models.ForeignKey(EstadoOT, on_delete=models.PROTECT, db_index=False)
     prioridad = models.CharField(max_length=10, choices=PRIORIDAD_CHOICES, default="MEDIA")
     en_lista_espera = models.BooleanField(
         default=False,
@@ -244,24 +538,66 @@ class OrdenTrabajo(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    # Totales (RF06) guardados; los mantienen las señales de ItemServicio e
+    # ItemRepuesto y se reparan con ``python manage.py recompute_totals``
+    subtotal_servicios = models.PositiveIntegerField(default=0, editable=False)
+    subtotal_repuestos = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = OrdenTrabajoQuerySet.as_manager()
+
+    CAMPOS_TOTALES = ("subtotal_servicios", "subtotal_repuestos")
+
+    # Permite detectar cambios en post_save sin re-consultar la OT
+    # (notificación de estado, invalidación del caché del dashboard e índice
+    # de búsqueda)
+    campos_seguidos = (
+        "estado_id", "mecanico_id", "fecha_estimada_entrega", "cliente_id", "vehiculo_id",
+    )
+
+    class Meta:
+        indexes = [
+            # Dashboard (atrasadas) y filtros por estado + fecha comprometida
+            models.Index(fields=["estado", "fecha_estimada_entrega"], name="ot_estado_fecha_est_idx"),
+            # mis_trabajos, dashboard mecánico y retirar_herramienta
+            models.Index(fields=["mecanico", "estado"], name="ot_mecanico_estado_idx"),
+            # planificacion: pendientes ordenadas por ingreso
+            models.Index(fields=["estado", "fecha_ingreso"], name="ot_estado_fecha_ing_idx"),
+        ]
+
     def __str__(self):
         return f"OT #{self.id} - {self.vehiculo.patente}"
 
-    # Cálculos de totales (RF06)
+    def save(self, *args, **kwargs):
+        # Los totales solo los escriben las señales de los ítems: una instancia
+        # cargada antes de agregar un ítem no debe pisarlos al guardarse
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            diferidos = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key
+                and campo.name not in self.CAMPOS_TOTALES
+                and campo.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
+    # Totales (RF06), sin consultas
     def total_servicios(self):
-        return sum(item.total() for item in self.servicios.all())
+        return self.subtotal_servicios
 
     def total_repuestos(self):
-        return sum(item.total() for item in self.repuestos.all())
+        return self.subtotal_repuestos
 
     def total_general(self):
-        return self.total_servicios() + self.total_repuestos()
+        return self.subtotal_servicios + self.subtotal_repuestos
 
 
-class ItemServicio(models.Model):
+class ItemServicio(SeguimientoCamposMixin, models.Model):
     """
     Servicios asociados a la OT (mano de obra).
     """
+    # Si el ítem cambia de OT, también se recalcula la OT anterior
+    campos_seguidos = ("orden_id",)
+
     orden = models.ForeignKey(OrdenTrabajo, on_delete=models.CASCADE, related_name="servicios")
     servicio = models.ForeignKey(Servicio, on_delete=models.PROTECT)
     precio = models.PositiveIntegerField(help_text="Precio aplicado a este servicio.")
@@ -273,10 +609,12 @@ class ItemServicio(models.Model):
         return f"{self.servicio.nombre} en OT {self.orden.id}"
 
 
-class ItemRepuesto(models.Model):
+class ItemRepuesto(SeguimientoCamposMixin, models.Model):
     """
     Repuestos utilizados en una OT.
     """
+    campos_seguidos = ("orden_id",)
+
     orden = models.ForeignKey(OrdenTrabajo, on_delete=models.CASCADE, related_name="repuestos")
     repuesto = models.ForeignKey(Repuesto, on_delete=models.PROTECT)
     cantidad = models.PositiveIntegerField(default=1)
@@ -302,6 +640,33 @@ class HerramientaEnUso(models.Model):
         return f"{self.herramienta.nombre} en OT {self.orden.id}"
 
 
+class ConsumoRepuesto(models.Model):
+    """
+    Estadísticas de consumo de un repuesto, precalculadas cada noche por
+    ``python manage.py calcular_consumo`` a partir de ItemRepuesto.
+    """
+    repuesto = models.OneToOneField(
+        Repuesto, on_delete=models.CASCADE, primary_key=True, related_name="consumo"
+    )
+    consumo_promedio = models.FloatField(default=0, help_text="Unidades por día en la ventana completa")
+    consumo_reciente = models.FloatField(default=0, help_text="Media móvil diaria de los últimos días")
+    desviacion = models.FloatField(default=0, help_text="Desviación estándar del consumo diario")
+    estacionalidad = models.JSONField(
+        default=dict, blank=True, help_text="Factor por mes ('1'..'12') respecto del promedio"
+    )
+    stock_seguridad = models.PositiveIntegerField(default=0)
+    calculado_en = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Repuestos de mayor consumo en el dashboard de bodega
+            models.Index(fields=["-consumo_reciente"], name="consumo_reciente_idx"),
+        ]
+
+    def __str__(self):
+        return f"Consumo {self.repuesto_id}: {self.consumo_reciente:.2f}/día"
+
+
 # ============================
 #  BITÁCORA (HU009, CU-10)
 # ============================
@@ -373,6 +738,16 @@ class TipoNotificacion(models.TextChoices):
     MENSAJE_GENERAL = "MENSAJE_GENERAL", "Mensaje general"
 
 
+class NotificacionQuerySet(models.QuerySet):
+    def no_leidas(self, receptor):
+        """
+        No leídas del receptor. ``leida=False`` se compila como ``NOT leida``,
+        que SQLite no busca en un índice; ``leida IN (0)`` usa
+        notif_receptor_leida_idx (receptor_id=? AND leida=?).
+        """
+        return self.filter(receptor=receptor, leida__in=[False])
+
+
 class Notificacion(models.Model):
     """
     Usada para:
@@ -407,8 +782,94 @@ class Notificacion(models.Model):
     mensaje = models.TextField()
     creada_en = models.DateTimeField(auto_now_add=True)
     leida = models.BooleanField(default=False)
+    repeticiones = models.PositiveIntegerField(
+        default=1,
+        help_text="Avisos idénticos agrupados en esta fila (compactación)"
+    )
+    clave_dedup = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Identifica el aviso para no repetirlo (ej: stock_bajo:<repuesto_id>, atraso:<ot_id>)"
+    )
+    periodo = models.CharField(
+        max_length=20,
+        blank=True,
+        default="",
+        help_text="Ventana de la clave (ej: la fecha en avisos diarios); vacío = sin vencimiento"
+    )
+
+    objects = NotificacionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Contador de no leídas y listado por receptor
+            models.Index(fields=["receptor", "leida", "creada_en"], name="notif_receptor_leida_idx"),
+            models.Index(fields=["receptor", "creada_en"], name="notif_receptor_creada_idx"),
+            # Retención: leídas más antiguas que N días
+            models.Index(fields=["leida", "creada_en"], name="notif_leida_creada_idx"),
+        ]
+        constraints = [
+            # Un aviso por clave, periodo y receptor: INSERT OR IGNORE descarta repetidos
+            models.UniqueConstraint(
+                fields=["clave_dedup", "periodo", "receptor"],
+                condition=models.Q(clave_dedup__isnull=False),
+                name="notif_dedup_unica",
+            ),
+        ]
 
     def __str__(self):
         if self.orden:
             return f"{self.get_tipo_display()} - OT {self.orden.id}"
         return f"{self.get_tipo_display()} - General"
+
+
+class EstadoEventoOutbox(models.TextChoices):
+    PENDIENTE = "PENDIENTE", "Pendiente"
+    PROCESANDO = "PROCESANDO", "Procesando"
+    PROCESADO = "PROCESADO", "Procesado"
+    FALLIDO = "FALLIDO", "Fallido (dead letter)"
+
+
+class EventoOutbox(models.Model):
+    """
+    Evento del patrón Observador pendiente de despacho.
+    Se escribe en la misma transacción que el cambio de la OT y lo procesa
+    el worker ``procesar_outbox`` fuera del request.
+    """
+    tipo_evento = models.CharField(max_length=50)
+    orden = models.ForeignKey(
+        OrdenTrabajo,
+        on_delete=models.CASCADE,
+        related_name="eventos_outbox",
+        null=True,
+        blank=True,
+    )
+    emisor = models.ForeignKey(
+        PerfilUsuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="eventos_outbox",
+    )
+    datos = models.JSONField(default=dict, blank=True, help_text="Resto de claves del evento.")
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoEventoOutbox.choices,
+        default=EstadoEventoOutbox.PENDIENTE,
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    ultimo_error = models.TextField(blank=True, default="")
+    lote = models.CharField(max_length=32, blank=True, default="", help_text="Token del worker que lo tomó.")
+    disponible_en = models.DateTimeField(default=timezone.now)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    procesado_en = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "disponible_en"], name="outbox_estado_disp_idx"),
+            models.Index(fields=["lote"], name="outbox_lote_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo_evento} #{self.id} - {self.get_estado_display()}"
@@ -5,21 +5,84 @@ Según la documentación:
 - Subject: Estado de la Orden de Trabajo
 - Observers: Diferentes roles (Mecánico, Encargado de Taller, Recepcionista)
 - Cuando cambia el estado de una OT, se notifica automáticamente a los observadores
+
+Despacho en lote: cada observador declara a qué perfiles les interesa el evento
+(``destinatarios``) y qué notificaciones generaría (``construir_notificaciones``).
+El Subject resuelve todos los perfiles en una sola consulta y escribe todas las
+notificaciones con un único ``bulk_create``.
 """
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from django.contrib.auth.models import User
+from typing import List, Dict, Any, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q
 
 from ..models import PerfilUsuario, Notificacion, OrdenTrabajo, TipoNotificacion
 
+logger = logging.getLogger(__name__)
+
+
+def guardar_notificaciones(notificaciones: List[Notificacion]) -> List[Notificacion]:
+    """
+    Escribe las notificaciones con un único bulk_create.
+    bulk_create no envía post_save, así que invalida aquí el contador de no
+    leídas de cada receptor.
+    
+    Si alguna lleva ``clave_dedup`` el insert es INSERT OR IGNORE: la
+    restricción única (clave_dedup, periodo, receptor) descarta los avisos ya
+    existentes sin consultas previas (y sin asignar pk a las filas).
+    
+    Args:
+        notificaciones: Notificaciones sin guardar
+        
+    Returns:
+        Notificaciones enviadas al insert
+    """
+    from ..services.dashboard_cache import DashboardCache
+    
+    creadas = Notificacion.objects.bulk_create(
+        notificaciones,
+        ignore_conflicts=any(n.clave_dedup for n in notificaciones)
+    )
+    DashboardCache().invalidar_no_leidas(n.receptor_id for n in creadas)
+    return creadas
+
+
+def aplicar_clave_dedup(event: Dict[str, Any], notificaciones: List[Notificacion]) -> List[Notificacion]:
+    """Copia ``clave_dedup`` y ``periodo`` del evento (si vienen) a sus notificaciones."""
+    if event.get('clave_dedup'):
+        for notificacion in notificaciones:
+            notificacion.clave_dedup = event['clave_dedup']
+            notificacion.periodo = event.get('periodo', "")
+    return notificaciones
+
 
 class Observer(ABC):
     """Interfaz para observadores del sistema."""
     
+    def destinatarios(self, event: Dict[str, Any]) -> Optional[Q]:
+        """
+        Filtro de PerfilUsuario con los posibles receptores del evento.
+        
+        Args:
+            event: Diccionario con información del evento
+            
+        Returns:
+            Q sobre PerfilUsuario, o None si el evento no le interesa al observador
+        """
+        return None
+    
     @abstractmethod
-    def update(self, event: Dict[str, Any]) -> None:
+    def construir_notificaciones(
+        self,
+        event: Dict[str, Any],
+        perfiles: List[PerfilUsuario]
+    ) -> List[Notificacion]:
         """
-        Método que se llama cuando el Subject notifica un cambio.
+        Construye (sin guardar) las notificaciones que genera el evento.
         
         Args:
             event: Diccionario con información del evento
@@ -28,81 +91,97 @@ class Observer(ABC):
                 - 'estado_anterior': str (opcional)
                 - 'estado_nuevo': str (opcional)
                 - 'emisor': PerfilUsuario (opcional)
+            perfiles: Perfiles que cumplen el filtro de ``destinatarios``,
+                ordenados por id
+                
+        Returns:
+            Lista de Notificacion sin guardar
         """
         pass
+    
+    def update(self, event: Dict[str, Any]) -> None:
+        """
+        Método que se llama cuando el Subject notifica un cambio (despacho individual).
+        
+        Args:
+            event: Diccionario con información del evento
+        """
+        filtro = self.destinatarios(event)
+        if filtro is None:
+            return
+        
+        perfiles = list(PerfilUsuario.objects.filter(filtro).order_by("pk"))
+        notificaciones = aplicar_clave_dedup(event, self.construir_notificaciones(event, perfiles))
+        if notificaciones:
+            guardar_notificaciones(notificaciones)
 
 
 class MecanicoObserver(Observer):
     """Observer para notificar a mecánicos."""
     
-    def update(self, event: Dict[str, Any]) -> None:
+    EVENTOS = ('ASIGNACION', 'CONTROL_CALIDAD', 'ESTADO_CAMBIADO')
+    
+    def destinatarios(self, event: Dict[str, Any]) -> Optional[Q]:
+        """Perfil del mecánico asignado a la OT (vínculo directo Mecanico.perfil)."""
+        orden = event.get('orden')
+        
+        if not orden or not orden.mecanico_id:
+            return None
+        if event.get('tipo_evento') not in self.EVENTOS:
+            return None
+        
+        return Q(rol="MECANICO", mecanico__id=orden.mecanico_id)
+    
+    def construir_notificaciones(self, event, perfiles):
         """Notifica al mecánico cuando hay cambios relevantes."""
         orden = event.get('orden')
         tipo_evento = event.get('tipo_evento')
-        emisor = event.get('emisor')
         
-        if not orden or not orden.mecanico:
-            return
-        
-        # Buscar perfil del mecánico
-        perfil_mecanico = self._obtener_perfil_mecanico(orden.mecanico)
-        if not perfil_mecanico:
-            return
+        if not perfiles:
+            return []
         
         # Crear notificación según el tipo de evento
         if tipo_evento == 'ASIGNACION':
             mensaje = f"Se le ha asignado la OT #{orden.id}."
-            tipo_notif = TipoNotificacion.MENSAJE_GENERAL
         elif tipo_evento == 'CONTROL_CALIDAD':
             resultado = event.get('resultado', '')
             mensaje = f"Control de calidad {resultado} para la OT #{orden.id}."
-            tipo_notif = TipoNotificacion.MENSAJE_GENERAL
         elif tipo_evento == 'ESTADO_CAMBIADO':
             estado_nuevo = event.get('estado_nuevo', '')
             mensaje = f"La OT #{orden.id} cambió a estado: {estado_nuevo}."
-            tipo_notif = TipoNotificacion.MENSAJE_GENERAL
         else:
-            return
+            return []
         
-        Notificacion.objects.create(
-            tipo=tipo_notif,
-            orden=orden,
-            mensaje=mensaje,
-            emisor=emisor,
-            receptor=perfil_mecanico
-        )
-    
-    def _obtener_perfil_mecanico(self, mecanico):
-        """Obtiene el PerfilUsuario asociado a un Mecanico."""
-        nombre_parts = mecanico.nombre.split(maxsplit=1)
-        if len(nombre_parts) == 2:
-            return PerfilUsuario.objects.filter(
-                rol="MECANICO",
-                usuario__first_name=nombre_parts[0],
-                usuario__last_name=nombre_parts[1]
-            ).first()
-        return None
+        return [
+            Notificacion(
+                tipo=TipoNotificacion.MENSAJE_GENERAL,
+                orden=orden,
+                mensaje=mensaje,
+                emisor=event.get('emisor'),
+                receptor=perfil
+            )
+            for perfil in perfiles
+        ]
 
 
 class EncargadoObserver(Observer):
     """Observer para notificar a encargados de taller."""
     
-    def update(self, event: Dict[str, Any]) -> None:
+    EVENTOS = ('SOLICITUD_CAMBIO', 'ATRASO', 'BITACORA_REGISTRADA')
+    
+    def destinatarios(self, event: Dict[str, Any]) -> Optional[Q]:
+        """Perfiles con rol de encargado de taller."""
+        if not event.get('orden') or event.get('tipo_evento') not in self.EVENTOS:
+            return None
+        return Q(rol="ENCARGADO_TALLER")
+    
+    def construir_notificaciones(self, event, perfiles):
         """Notifica al encargado cuando hay cambios relevantes."""
         orden = event.get('orden')
         tipo_evento = event.get('tipo_evento')
-        emisor = event.get('emisor')
-        
-        if not orden:
-            return
-        
-        # Buscar perfil del encargado
-        perfil_encargado = PerfilUsuario.objects.filter(
-            rol="ENCARGADO_TALLER"
-        ).first()
         
-        if not perfil_encargado:
-            return
+        if not perfiles:
+            return []
         
         # Crear notificación según el tipo de evento
         if tipo_evento == 'SOLICITUD_CAMBIO':
@@ -115,49 +194,48 @@ class EncargadoObserver(Observer):
             mensaje = f"Se registró una nueva bitácora para la OT #{orden.id}."
             tipo_notif = TipoNotificacion.MENSAJE_GENERAL
         else:
-            return
+            return []
         
-        Notificacion.objects.create(
-            tipo=tipo_notif,
-            orden=orden,
-            mensaje=mensaje,
-            emisor=emisor,
-            receptor=perfil_encargado
-        )
+        # Todos los encargados de taller reciben la notificación
+        return [
+            Notificacion(
+                tipo=tipo_notif,
+                orden=orden,
+                mensaje=mensaje,
+                emisor=event.get('emisor'),
+                receptor=perfil
+            )
+            for perfil in perfiles
+        ]
 
 
 class RecepcionistaObserver(Observer):
     """Observer para notificar a recepcionistas."""
     
-    def update(self, event: Dict[str, Any]) -> None:
-        """Notifica al recepcionista cuando hay cambios relevantes."""
+    def destinatarios(self, event: Dict[str, Any]) -> Optional[Q]:
+        """Perfiles con rol de recepcionista."""
+        if not event.get('orden') or event.get('tipo_evento') != 'OT_FINALIZADA':
+            return None
+        return Q(rol="RECEPCIONISTA")
+    
+    def construir_notificaciones(self, event, perfiles):
+        """Notifica al recepcionista cuando la OT es finalizada."""
         orden = event.get('orden')
-        tipo_evento = event.get('tipo_evento')
-        emisor = event.get('emisor')
-        
-        if not orden:
-            return
         
-        # Buscar perfil del recepcionista
-        perfil_recepcionista = PerfilUsuario.objects.filter(
-            rol="RECEPCIONISTA"
-        ).first()
+        if not perfiles:
+            return []
         
-        if not perfil_recepcionista:
-            return
-        
-        # Crear notificación según el tipo de evento
-        if tipo_evento == 'OT_FINALIZADA':
-            mensaje = f"La OT #{orden.id} ha sido finalizada."
-            tipo_notif = TipoNotificacion.MENSAJE_GENERAL
-            
-            Notificacion.objects.create(
-                tipo=tipo_notif,
+        mensaje = f"La OT #{orden.id} ha sido finalizada."
+        return [
+            Notificacion(
+                tipo=TipoNotificacion.MENSAJE_GENERAL,
                 orden=orden,
                 mensaje=mensaje,
-                emisor=emisor,
-                receptor=perfil_recepcionista
+                emisor=event.get('emisor'),
+                receptor=perfil
             )
+            for perfil in perfiles
+        ]
 
 
 class OrdenTrabajoSubject:
@@ -166,10 +244,20 @@ class OrdenTrabajoSubject:
     Representa el estado de la Orden de Trabajo y notifica cambios a los observadores.
     """
     
-    def __init__(self):
-        """Inicializa el Subject con una lista vacía de observadores."""
+    def __init__(self, en_lote: bool = True):
+        """
+        Inicializa el Subject con una lista vacía de observadores.
+        
+        Args:
+            en_lote: Si es True, resuelve destinatarios en una sola consulta y
+                escribe con un único bulk_create. Si es False, llama a
+                ``update`` de cada observador por separado.
+        """
         self._observers: List[Observer] = []
         self._estado_anterior = None
+        self.en_lote = en_lote
+        self._metricas: Dict[str, Dict[str, int]] = {}
+        self._lock_metricas = threading.Lock()
     
     def attach(self, observer: Observer) -> None:
         """
@@ -195,15 +283,126 @@ class OrdenTrabajoSubject:
         """
         Notifica a todos los observadores registrados sobre un cambio.
         
+        Con NOTIFICACIONES_ASINCRONAS activo el evento se guarda en el outbox
+        (misma transacción que el cambio de la OT) y lo despacha el worker
+        ``procesar_outbox``; si no, se despacha en el acto.
+        
         Args:
             event: Diccionario con información del evento
         """
+        if getattr(settings, "NOTIFICACIONES_ASINCRONAS", False):
+            from ..services.notification_outbox import NotificationOutbox
+            NotificationOutbox(subject=self).encolar(event)
+            return
+        
+        self.despachar(event)
+    
+    def despachar(self, event: Dict[str, Any], tolerante: bool = True) -> None:
+        """
+        Despacha el evento a los observadores de forma síncrona.
+        
+        Args:
+            event: Diccionario con información del evento
+            tolerante: Si es True, el error de un observador se registra en el
+                log y no interrumpe al resto. Si es False se propaga (lo usa el
+                worker del outbox para reintentar el evento completo).
+        """
+        consultas = []
+        
+        def contar_consulta(execute, sql, params, many, context):
+            consultas.append(sql)
+            return execute(sql, params, many, context)
+        
+        with connection.execute_wrapper(contar_consulta):
+            if self.en_lote:
+                self._notificar_en_lote(event, tolerante)
+            else:
+                self._notificar_individual(event, tolerante)
+        
+        self._registrar_metrica(event.get('tipo_evento'), len(consultas))
+    
+    def _error_observer(self, observer: Observer, tolerante: bool) -> None:
+        """Registra el error de un observador o lo propaga según el modo."""
+        if not tolerante:
+            raise
+        # Log error pero no interrumpir notificaciones a otros observadores
+        logger.exception("Error notificando a observer %s", observer.__class__.__name__)
+    
+    def _notificar_individual(self, event: Dict[str, Any], tolerante: bool = True) -> None:
+        """Despacho clásico: cada observador consulta y escribe por su cuenta."""
         for observer in self._observers:
             try:
                 observer.update(event)
-            except Exception as e:
-                # Log error pero no interrumpir notificaciones a otros observadores
-                print(f"Error notificando a observer {observer.__class__.__name__}: {e}")
+            except Exception:
+                self._error_observer(observer, tolerante)
+    
+    def _notificar_en_lote(self, event: Dict[str, Any], tolerante: bool = True) -> None:
+        """
+        Despacho en lote: una consulta para todos los destinatarios y un
+        único bulk_create para todas las notificaciones.
+        """
+        filtros = []
+        for observer in self._observers:
+            try:
+                filtros.append(observer.destinatarios(event))
+            except Exception:
+                self._error_observer(observer, tolerante)
+                filtros.append(None)
+        
+        activos = [(i, filtro) for i, filtro in enumerate(filtros) if filtro is not None]
+        if not activos:
+            return
+        
+        # Una sola consulta: cada fila indica a qué observadores pertenece
+        filtro_total = Q()
+        anotaciones = {}
+        for i, filtro in activos:
+            filtro_total |= filtro
+            anotaciones[f"_obs_{i}"] = ExpressionWrapper(filtro, output_field=BooleanField())
+        
+        perfiles = list(
+            PerfilUsuario.objects.filter(filtro_total).annotate(**anotaciones).order_by("pk")
+        )
+        
+        notificaciones = []
+        for i, _ in activos:
+            observer = self._observers[i]
+            perfiles_observer = [p for p in perfiles if getattr(p, f"_obs_{i}")]
+            try:
+                notificaciones.extend(observer.construir_notificaciones(event, perfiles_observer))
+            except Exception:
+                self._error_observer(observer, tolerante)
+        
+        if notificaciones:
+            guardar_notificaciones(aplicar_clave_dedup(event, notificaciones))
+    
+    def _registrar_metrica(self, tipo_evento: Optional[str], consultas: int) -> None:
+        """Acumula la cantidad de consultas usadas por tipo de evento."""
+        with self._lock_metricas:
+            metrica = self._metricas.setdefault(
+                tipo_evento or "DESCONOCIDO",
+                {"eventos": 0, "consultas": 0, "max_consultas": 0, "ultimas_consultas": 0}
+            )
+            metrica["eventos"] += 1
+            metrica["consultas"] += consultas
+            metrica["max_consultas"] = max(metrica["max_consultas"], consultas)
+            metrica["ultimas_consultas"] = consultas
+    
+    def metricas(self) -> Dict[str, Dict[str, int]]:
+        """
+        Obtiene el conteo de consultas por tipo de evento.
+        
+        Returns:
+            Diccionario {tipo_evento: {'eventos', 'consultas', 'max_consultas',
+            'ultimas_consultas'}}
+        """
+        with self._lock_metricas:
+            return {tipo: dict(valores) for tipo, valores in self._metricas.items()}
+    
+    def reiniciar_metricas(self) -> None:
+        """Limpia las métricas acumuladas."""
+        with self._lock_metricas:
+            self._metricas.clear()
     
     def cambiar_estado(self, orden: OrdenTrabajo, estado_nuevo: str, emisor: PerfilUsuario = None) -> None:
         """
@@ -214,7 +413,8 @@ class OrdenTrabajoSubject:
             estado_nuevo: Nuevo estado
             emisor: PerfilUsuario que realizó el cambio (opcional)
         """
-        self._estado_anterior = orden.estado.nombre if orden.estado else None
+        from ..services.state_catalog import get_state_catalog
+        self._estado_anterior = get_state_catalog().nombre_de(orden.estado_id)
         
         event = {
             'orden': orden,
@@ -250,4 +450,3 @@ def get_orden_trabajo_subject() -> OrdenTrabajoSubject:
         _orden_trabajo_subject.attach(RecepcionistaObserver())
     
     return _orden_trabajo_subject
-
@@ -5,14 +5,16 @@ Implementa Inyección de Dependencias según la documentación.
 """
 from typing import Optional
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from datetime import date
 
 from ..models import (
-    OrdenTrabajo, Mecanico, ZonaTrabajo, EstadoOT, 
+    OrdenTrabajo, Mecanico, ZonaTrabajo,
     PerfilUsuario
 )
 from ..patterns.observer import get_orden_trabajo_subject
 from .inventory_manager import InventoryManager
+from .state_catalog import get_state_catalog
 
 
 class AssignmentService:
@@ -30,6 +32,7 @@ class AssignmentService:
         """
         self.inventory_manager = inventory_manager
         self.subject = get_orden_trabajo_subject()
+        self.catalogo_estados = get_state_catalog()
     
     def asignar_ot(
         self,
@@ -61,24 +64,25 @@ class AssignmentService:
         # Nota: En una implementación completa, se verificaría el stock de repuestos
         # requeridos para la OT. Por ahora, solo validamos la asignación.
         
-        # Asignar recursos
-        orden.mecanico = mecanico
-        orden.zona_trabajo = zona
-        orden.fecha_estimada_entrega = fecha_estimada
-        
-        # Cambiar estado
-        estado_en_progreso = EstadoOT.objects.get_or_create(nombre="EN_PROGRESO")[0]
-        orden.estado = estado_en_progreso
-        orden.en_lista_espera = False
-        orden.save()
-        
-        # Notificar usando patrón Observer
-        event = {
-            'orden': orden,
-            'tipo_evento': 'ASIGNACION',
-            'emisor': emisor
-        }
-        self.subject.notify(event)
+        # La asignación y sus eventos (outbox) se confirman juntos
+        with transaction.atomic():
+            # Asignar recursos
+            orden.mecanico = mecanico
+            orden.zona_trabajo = zona
+            orden.fecha_estimada_entrega = fecha_estimada
+            
+            # Cambiar estado
+            orden.estado_id = self.catalogo_estados.id_de("EN_PROGRESO")
+            orden.en_lista_espera = False
+            orden.save()
+            
+            # Notificar usando patrón Observer
+            event = {
+                'orden': orden,
+                'tipo_evento': 'ASIGNACION',
+                'emisor': emisor
+            }
+            self.subject.notify(event)
         
         return True, "Asignación realizada correctamente."
     
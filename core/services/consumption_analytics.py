@@ -0,0 +1,190 @@
+"""
+Consumption Analytics - Estadísticas de consumo de repuestos.
+
+Lee el historial de ItemRepuesto con la fecha de ingreso de su OT en una sola
+consulta (agrupada por repuesto y día, recorrida con iterator) y calcula por
+repuesto:
+
+- consumo diario promedio de la ventana y media móvil de los últimos días,
+- desviación estándar del consumo diario,
+- estacionalidad: consumo diario de cada mes respecto del promedio,
+- stock de seguridad: z * desviación * raíz(tiempo de reposición).
+
+El resultado se guarda en ConsumoRepuesto (``python manage.py calcular_consumo``,
+pensado para correr cada noche) y lo lee el dashboard de bodega sin volver a
+agregar el historial en cada request. La media móvil y el stock de seguridad
+se copian además a cada Repuesto, que recalcula con ellos sus días hasta el
+quiebre (índice del plan de reposición).
+"""
+import math
+import statistics
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import ConsumoRepuesto, ItemRepuesto, Repuesto
+from .dashboard_cache import DashboardCache
+
+
+class ConsumptionAnalytics:
+    """
+    Motor de estadísticas de consumo por repuesto.
+    """
+
+    def __init__(
+        self,
+        ventana_dias: Optional[int] = None,
+        ventana_movil_dias: Optional[int] = None,
+        z_servicio: Optional[float] = None
+    ):
+        """
+        Args:
+            ventana_dias: Días de historial (default: CONSUMO_VENTANA_DIAS)
+            ventana_movil_dias: Días de la media móvil (default: CONSUMO_VENTANA_MOVIL_DIAS)
+            z_servicio: Factor z del nivel de servicio (default: CONSUMO_Z_SERVICIO,
+                1.65 ≈ 95%)
+        """
+        self.ventana_dias = ventana_dias or getattr(settings, "CONSUMO_VENTANA_DIAS", 365)
+        self.ventana_movil_dias = min(
+            ventana_movil_dias or getattr(settings, "CONSUMO_VENTANA_MOVIL_DIAS", 30),
+            self.ventana_dias,
+        )
+        self.z_servicio = z_servicio if z_servicio is not None else getattr(settings, "CONSUMO_Z_SERVICIO", 1.65)
+
+        # Días de la ventana, del más antiguo a hoy
+        hoy = timezone.localdate()
+        self.dias: List[date] = [hoy - timedelta(days=n) for n in range(self.ventana_dias - 1, -1, -1)]
+
+    def historial(self, desde: date) -> Iterator[Tuple[int, date, int]]:
+        """
+        Unidades consumidas por repuesto y día, ordenadas por repuesto (una consulta).
+
+        Returns:
+            Iterador de (repuesto_id, fecha, unidades)
+        """
+        return (
+            ItemRepuesto.objects.filter(orden__fecha_ingreso__gte=desde)
+            .values_list("repuesto_id", "orden__fecha_ingreso")
+            .annotate(unidades=Sum("cantidad"))
+            .order_by("repuesto_id", "orden__fecha_ingreso")
+            .iterator()
+        )
+
+    def series(self) -> Iterator[Tuple[int, List[int]]]:
+        """
+        Serie diaria de consumo (con ceros en los días sin uso) de cada repuesto
+        con historial en la ventana.
+
+        Returns:
+            Iterador de (repuesto_id, unidades por día)
+        """
+        posicion = {dia: i for i, dia in enumerate(self.dias)}
+        for repuesto_id, filas in groupby(self.historial(self.dias[0]), key=itemgetter(0)):
+            serie = [0] * len(self.dias)
+            for _, fecha, unidades in filas:
+                if fecha in posicion:
+                    serie[posicion[fecha]] += unidades
+            yield repuesto_id, serie
+
+    def estadisticas(self, serie: List[int], tiempo_reposicion_dias: int) -> Dict:
+        """
+        Estadísticas de una serie diaria.
+
+        Args:
+            serie: Unidades por día, del más antiguo al más reciente
+            tiempo_reposicion_dias: Días de reposición del repuesto
+
+        Returns:
+            Diccionario con los campos de ConsumoRepuesto
+        """
+        promedio = statistics.fmean(serie)
+        desviacion = statistics.pstdev(serie, promedio)
+
+        por_mes: Dict[int, List[int]] = {}
+        for dia, unidades in zip(self.dias, serie):
+            por_mes.setdefault(dia.month, []).append(unidades)
+        estacionalidad = {
+            str(mes): round(statistics.fmean(valores) / promedio, 3) if promedio else 0.0
+            for mes, valores in sorted(por_mes.items())
+        }
+
+        return {
+            "consumo_promedio": promedio,
+            "consumo_reciente": statistics.fmean(serie[-self.ventana_movil_dias:]),
+            "desviacion": desviacion,
+            "estacionalidad": estacionalidad,
+            "stock_seguridad": math.ceil(
+                self.z_servicio * desviacion * math.sqrt(tiempo_reposicion_dias)
+            ),
+        }
+
+    def calcular(self) -> List[ConsumoRepuesto]:
+        """
+        Calcula (sin guardar) las estadísticas de todos los repuestos con consumo.
+
+        Returns:
+            Lista de ConsumoRepuesto sin guardar
+        """
+        calculado_en = timezone.now()
+        tiempos = dict(Repuesto.objects.values_list("id", "tiempo_reposicion_dias"))
+        return [
+            ConsumoRepuesto(
+                repuesto_id=repuesto_id,
+                calculado_en=calculado_en,
+                **self.estadisticas(serie, tiempos.get(repuesto_id, 0)),
+            )
+            for repuesto_id, serie in self.series()
+        ]
+
+    def recalcular(self) -> int:
+        """
+        Reemplaza la tabla ConsumoRepuesto con el cálculo actual.
+
+        Returns:
+            Cantidad de repuestos con estadísticas
+        """
+        filas = self.calcular()
+        with transaction.atomic():
+            ConsumoRepuesto.objects.all().delete()
+            ConsumoRepuesto.objects.bulk_create(filas, batch_size=500)
+            self.actualizar_repuestos(filas)
+        DashboardCache().invalidar(DashboardCache.clave_consumo())
+        return len(filas)
+
+    @staticmethod
+    def actualizar_repuestos(consumos: List[ConsumoRepuesto], lote: int = 500) -> int:
+        """
+        Copia consumo diario (media móvil) y stock de seguridad a los repuestos
+        y recalcula sus días hasta el quiebre. Los repuestos sin estadísticas
+        quedan sin consumo.
+
+        Args:
+            consumos: Estadísticas calculadas (una por repuesto)
+            lote: Filas por UPDATE
+
+        Returns:
+            Cantidad de repuestos modificados
+        """
+        por_repuesto = {c.repuesto_id: c for c in consumos}
+        campos = ["consumo_diario", "stock_seguridad", "dias_hasta_quiebre", "requiere_reposicion"]
+        repuestos = Repuesto.objects.only(
+            "id", *Repuesto.CAMPOS_REPOSICION, "dias_hasta_quiebre", "requiere_reposicion"
+        )
+
+        cambiados = []
+        for repuesto in repuestos.iterator(chunk_size=lote):
+            consumo = por_repuesto.get(repuesto.pk)
+            anterior = [getattr(repuesto, campo) for campo in campos]
+            repuesto.consumo_diario = consumo.consumo_reciente if consumo else 0.0
+            repuesto.stock_seguridad = consumo.stock_seguridad if consumo else 0
+            repuesto.actualizar_reposicion()
+            if [getattr(repuesto, campo) for campo in campos] != anterior:
+                cambiados.append(repuesto)
+        Repuesto.objects.bulk_update(cambiados, campos, batch_size=lote)
+        return len(cambiados)
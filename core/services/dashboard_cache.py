@@ -0,0 +1,135 @@
+"""
+Dashboard Cache - Caché de corta duración para los contadores del dashboard.
+
+Guarda los contadores por rol (y por mecánico) y el número de notificaciones
+no leídas por perfil en el backend configurado en DASHBOARD_CACHE_ALIAS
+(memoria local o archivo, sin servicios externos). Las señales post_save /
+post_delete invalidan solo las claves afectadas.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class DashboardCache:
+    """
+    Caché de contadores del dashboard con estadísticas de aciertos/fallos.
+    """
+
+    PREFIJO = "dashboard"
+    CLAVE_ACIERTOS = "dashboard:stats:aciertos"
+    CLAVE_FALLOS = "dashboard:stats:fallos"
+
+    def __init__(self, alias: Optional[str] = None, ttl: Optional[int] = None):
+        """
+        Args:
+            alias: Alias del backend en CACHES (default: DASHBOARD_CACHE_ALIAS)
+            ttl: Segundos de vida de cada contador (default: DASHBOARD_CACHE_TTL)
+        """
+        self.cache = caches[alias or getattr(settings, "DASHBOARD_CACHE_ALIAS", "default")]
+        self.ttl = ttl if ttl is not None else getattr(settings, "DASHBOARD_CACHE_TTL", 30)
+
+    # ---------- Claves ----------
+
+    @classmethod
+    def clave_encargado(cls) -> str:
+        return f"{cls.PREFIJO}:encargado"
+
+    @classmethod
+    def clave_mecanico(cls, mecanico_id: int) -> str:
+        return f"{cls.PREFIJO}:mecanico:{mecanico_id}"
+
+    @classmethod
+    def clave_bodega(cls) -> str:
+        return f"{cls.PREFIJO}:bodega"
+
+    @classmethod
+    def clave_consumo(cls) -> str:
+        return f"{cls.PREFIJO}:consumo"
+    
+    @classmethod
+    def clave_no_leidas(cls, perfil_id: int) -> str:
+        return f"{cls.PREFIJO}:no_leidas:{perfil_id}"
+
+    # ---------- Lectura / invalidación ----------
+
+    def obtener(self, clave: str, calcular: Callable[[], Any]) -> Any:
+        """
+        Obtiene un valor cacheado o lo calcula y lo guarda.
+
+        Args:
+            clave: Clave del contador
+            calcular: Función que calcula el valor en caso de fallo
+
+        Returns:
+            Valor cacheado o recién calculado
+        """
+        valor = self.cache.get(clave)
+        if valor is not None:
+            self._incrementar(self.CLAVE_ACIERTOS)
+            return valor
+
+        self._incrementar(self.CLAVE_FALLOS)
+        valor = calcular()
+        self.cache.set(clave, valor, self.ttl)
+        return valor
+
+    def actualizar(self, clave: str, valor: Any) -> None:
+        """Reemplaza un valor ya conocido (ej: tras marcar notificaciones)."""
+        self.cache.set(clave, valor, self.ttl)
+
+    def invalidar(self, *claves: str) -> None:
+        """Elimina las claves indicadas."""
+        if claves:
+            self.cache.delete_many(claves)
+
+    def invalidar_no_leidas(self, perfil_ids: Iterable[Optional[int]]) -> None:
+        """Invalida el contador de no leídas de varios perfiles."""
+        self.invalidar(*{self.clave_no_leidas(pid) for pid in perfil_ids if pid})
+
+    def descontar_no_leidas(self, perfil_id: int, cantidad: int) -> None:
+        """
+        Resta ``cantidad`` al contador de no leídas de un perfil, si está cacheado.
+        Si no lo está, se calculará en la próxima lectura.
+        """
+        if cantidad <= 0:
+            return
+        clave = self.clave_no_leidas(perfil_id)
+        try:
+            restante = self.cache.decr(clave, cantidad)
+        except ValueError:
+            return  # No estaba cacheado
+        if restante < 0:
+            # Desfase con la base de datos: que se recalcule
+            self.invalidar(clave)
+    
+    # ---------- Estadísticas ----------
+
+    def _incrementar(self, clave: str) -> None:
+        try:
+            self.cache.incr(clave)
+        except ValueError:
+            # La clave no existe todavía (o expiró)
+            if not self.cache.add(clave, 1, None):
+                self.cache.incr(clave)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de aciertos y fallos.
+
+        Returns:
+            Diccionario {'aciertos', 'fallos', 'tasa_aciertos'} (tasa en %)
+        """
+        aciertos = self.cache.get(self.CLAVE_ACIERTOS, 0)
+        fallos = self.cache.get(self.CLAVE_FALLOS, 0)
+        total = aciertos + fallos
+        return {
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_aciertos": round(100 * aciertos / total, 1) if total else 0.0,
+        }
+
+    def reiniciar_estadisticas(self) -> None:
+        """Pone en cero los contadores de aciertos y fallos."""
+        self.cache.delete_many([self.CLAVE_ACIERTOS, self.CLAVE_FALLOS])
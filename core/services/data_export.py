@@ -0,0 +1,153 @@
+"""
+Data Export - Exportación de órdenes, inventario y notificaciones a CSV/XLSX.
+
+Las filas se leen con ``values_list().iterator(chunk_size=...)`` y se escriben
+a medida que llegan, así la memoria usada no depende del tamaño de la tabla:
+el CSV se entrega con StreamingHttpResponse y el XLSX se arma con el modo
+``write_only`` de openpyxl sobre un archivo temporal.
+
+openpyxl es opcional: sin él solo está disponible el CSV.
+"""
+import csv
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import F, QuerySet
+
+from ..models import OrdenTrabajo, Repuesto, Notificacion
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover - dependencia opcional
+    Workbook = None
+
+
+class Exportacion(NamedTuple):
+    """Definición de una exportación: columnas (encabezado, campo) y roles con acceso."""
+    consulta: Callable[[], QuerySet]
+    columnas: Sequence[Tuple[str, str]]
+    roles: Tuple[str, ...]
+
+
+EXPORTACIONES: Dict[str, Exportacion] = {
+    "ordenes": Exportacion(
+        consulta=lambda: OrdenTrabajo.objects.annotate(
+            total=F("subtotal_servicios") + F("subtotal_repuestos")
+        ).order_by("id"),
+        columnas=(
+            ("OT", "id"),
+            ("Fecha ingreso", "fecha_ingreso"),
+            ("Entrega estimada", "fecha_estimada_entrega"),
+            ("Entrega real", "fecha_entrega_real"),
+            ("Cliente", "cliente__nombre"),
+            ("RUT", "cliente__rut"),
+            ("Patente", "vehiculo__patente"),
+            ("Estado", "estado__nombre"),
+            ("Mecánico", "mecanico__nombre"),
+            ("Prioridad", "prioridad"),
+            ("Total servicios", "subtotal_servicios"),
+            ("Total repuestos", "subtotal_repuestos"),
+            ("Total", "total"),
+        ),
+        roles=("ENCARGADO_TALLER",),
+    ),
+    "repuestos": Exportacion(
+        consulta=lambda: Repuesto.objects.order_by("id"),
+        columnas=(
+            ("Código", "codigo"),
+            ("Nombre", "nombre"),
+            ("Marca", "marca"),
+            ("Stock", "stock"),
+            ("Precio compra", "precio_compra"),
+            ("Precio venta", "precio_venta"),
+            ("Estado", "estado"),
+            ("Proveedor", "proveedor__nombre"),
+        ),
+        roles=("ENCARGADO_TALLER", "ENCARGADO_BODEGA"),
+    ),
+    "notificaciones": Exportacion(
+        consulta=lambda: Notificacion.objects.order_by("id"),
+        columnas=(
+            ("Id", "id"),
+            ("Tipo", "tipo"),
+            ("OT", "orden_id"),
+            ("Emisor", "emisor__usuario__username"),
+            ("Receptor", "receptor__usuario__username"),
+            ("Mensaje", "mensaje"),
+            ("Creada", "creada_en"),
+            ("Leída", "leida"),
+            ("Repeticiones", "repeticiones"),
+        ),
+        roles=("ENCARGADO_TALLER",),
+    ),
+}
+
+
+class _Eco:
+    """Pseudo-archivo: csv.writer escribe una fila y se devuelve tal cual."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+class DataExporter:
+    """
+    Exportador de tablas a CSV (streaming) o XLSX.
+    """
+
+    FORMATOS = ("csv", "xlsx")
+
+    def __init__(self, nombre: str, chunk_size: Optional[int] = None):
+        """
+        Args:
+            nombre: Clave en EXPORTACIONES ('ordenes', 'repuestos', 'notificaciones')
+            chunk_size: Filas por lectura del cursor (default: EXPORTACION_CHUNK_SIZE)
+
+        Raises:
+            KeyError: Si la exportación no existe
+        """
+        self.nombre = nombre
+        self.exportacion = EXPORTACIONES[nombre]
+        self.chunk_size = chunk_size or getattr(settings, "EXPORTACION_CHUNK_SIZE", 2000)
+
+    @staticmethod
+    def xlsx_disponible() -> bool:
+        return Workbook is not None
+
+    def encabezados(self) -> List[str]:
+        return [encabezado for encabezado, _ in self.exportacion.columnas]
+
+    def filas(self) -> Iterator[Tuple[Any, ...]]:
+        """Filas de la tabla leídas por bloques desde la base de datos."""
+        campos = [campo for _, campo in self.exportacion.columnas]
+        return self.exportacion.consulta().values_list(*campos).iterator(chunk_size=self.chunk_size)
+
+    def lineas_csv(self) -> Iterator[str]:
+        """
+        Genera el CSV línea por línea (con BOM para que Excel reconozca UTF-8).
+        """
+        escritor = csv.writer(_Eco())
+        yield "\ufeff" + escritor.writerow(self.encabezados())
+        for fila in self.filas():
+            yield escritor.writerow(fila)
+
+    def escribir_xlsx(self, destino) -> None:
+        """
+        Escribe el XLSX en ``destino`` (ruta o archivo) sin mantener las filas en memoria.
+
+        Raises:
+            RuntimeError: Si openpyxl no está instalado
+        """
+        if Workbook is None:
+            raise RuntimeError("La exportación XLSX requiere openpyxl (pip install openpyxl).")
+
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet(self.nombre)
+        hoja.append(self.encabezados())
+        for fila in self.filas():
+            # openpyxl no acepta fechas con zona horaria
+            hoja.append([
+                valor.replace(tzinfo=None) if getattr(valor, "tzinfo", None) else valor
+                for valor in fila
+            ])
+        libro.save(destino)
@@ -0,0 +1,112 @@
+"""
+Intake Service - Ingreso de solicitudes de trabajo en recepción.
+
+Reconoce un vehículo que vuelve al taller por su patente normalizada (índice
+único de Vehiculo.patente_normalizada) y, en ese caso, reutiliza el vehículo y
+su cliente: solo actualiza el kilometraje y abre la OT. Un vehículo nuevo se
+registra con su cliente (buscado por RUT normalizado) como antes.
+
+Todo ocurre en una sola transacción y con una cantidad fija de consultas por
+solicitud, independiente del tamaño de las tablas
+(``python manage.py benchmark_recepcion`` lo mide).
+"""
+from typing import Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+
+from ..models import Cliente, OrdenTrabajo, Vehiculo
+from ..validators import normalizar_rut
+from .state_catalog import get_state_catalog
+
+
+class IntakeService:
+    """
+    Servicio de ingreso de solicitudes (vehículos nuevos y recurrentes).
+    """
+
+    def __init__(self):
+        self.catalogo_estados = get_state_catalog()
+
+    def registrar_solicitud(self, datos: Dict) -> Tuple[bool, str, Optional[OrdenTrabajo]]:
+        """
+        Registra una solicitud: cliente y vehículo (nuevos o existentes) y su OT
+        en estado PENDIENTE.
+
+        Args:
+            datos: cleaned_data de RegistrarSolicitudForm
+
+        Returns:
+            Tupla (éxito, mensaje, OT creada o None)
+        """
+        patente = datos["patente"]
+        try:
+            with transaction.atomic():
+                vehiculo = Vehiculo.objects.select_related("cliente").por_patente(patente).first()
+
+                if vehiculo:
+                    error = self._validar_recurrente(vehiculo, datos)
+                    if error:
+                        return False, error, None
+                    # UPDATE directo: el kilometraje no está en el índice de búsqueda
+                    Vehiculo.objects.filter(pk=vehiculo.pk).update(kilometraje=datos["kilometraje"])
+                    vehiculo.kilometraje = datos["kilometraje"]
+                    cliente = vehiculo.cliente
+                    mensaje = (
+                        f"Solicitud registrada para el vehículo {vehiculo.patente} de "
+                        f"{cliente.nombre} (kilometraje actualizado)."
+                    )
+                else:
+                    cliente = self._cliente(datos)
+                    vehiculo = Vehiculo.objects.create(
+                        cliente=cliente,
+                        patente=patente,
+                        marca=datos["marca"],
+                        modelo=datos["modelo"],
+                        anio=datos["anio"],
+                        kilometraje=datos["kilometraje"],
+                    )
+                    mensaje = "Solicitud registrada correctamente."
+
+                # OT en estado PENDIENTE (id desde el catálogo en memoria)
+                orden = OrdenTrabajo.objects.create(
+                    cliente=cliente,
+                    vehiculo=vehiculo,
+                    estado_id=self.catalogo_estados.id_de("PENDIENTE"),
+                    motivo_ingreso=datos["motivo"],
+                    descripcion_problema=datos["descripcion"],
+                    fecha_ingreso=datos["fecha"],
+                )
+        except IntegrityError:
+            # Otra recepción registró la misma patente o RUT al mismo tiempo
+            return False, f"La patente {patente} o el RUT se acaban de registrar; intente nuevamente.", None
+
+        return True, mensaje, orden
+
+    @staticmethod
+    def _validar_recurrente(vehiculo: Vehiculo, datos: Dict) -> Optional[str]:
+        """Mensaje de error si la solicitud no corresponde al vehículo registrado."""
+        if vehiculo.cliente.rut_normalizado != normalizar_rut(datos["rut"]):
+            return (
+                f"La patente {vehiculo.patente} está registrada a nombre de otro cliente "
+                f"({vehiculo.cliente.rut})."
+            )
+        if datos["kilometraje"] < vehiculo.kilometraje:
+            return (
+                f"El kilometraje no puede ser menor al registrado para {vehiculo.patente} "
+                f"({vehiculo.kilometraje} km)."
+            )
+        return None
+
+    @staticmethod
+    def _cliente(datos: Dict) -> Cliente:
+        """Cliente del RUT (con o sin formato), creado si no existe."""
+        cliente, _ = Cliente.objects.get_or_create(
+            rut_normalizado=normalizar_rut(datos["rut"]),
+            defaults={
+                "rut": datos["rut"],
+                "nombre": datos["nombre"],
+                "telefono": datos["telefono"],
+                "email": datos.get("email", ""),
+            }
+        )
+        return cliente
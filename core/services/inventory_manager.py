@@ -5,12 +5,13 @@ Implementa Inyección de Dependencias según la documentación:
 "Vista de Asignación de Servicio recibiendo un Inventory Manager inyectado 
 para realizar verificación de stock antes de asignar trabajo."
 """
-from typing import Optional, List
+from typing import Iterable, Optional, List
 from django.core.exceptions import ValidationError
 
 from ..models import Repuesto, Notificacion, PerfilUsuario, TipoNotificacion
+from ..patterns.observer import guardar_notificaciones
+from .notification_service import NotificationService
 from django.utils import timezone
-from datetime import timedelta
 
 
 class InventoryManager:
@@ -19,6 +20,14 @@ class InventoryManager:
     Permite verificar stock, gestionar movimientos y alertas.
     """
     
+    def __init__(self, umbral_stock_bajo: Optional[int] = None):
+        """
+        Args:
+            umbral_stock_bajo: Umbral común para todos los repuestos
+                (default: el punto_reorden de cada repuesto)
+        """
+        self.umbral_stock_bajo = umbral_stock_bajo
+    
     def verificar_stock(self, repuesto_id: int, cantidad_requerida: int = 1) -> bool:
         """
         Verifica si hay stock suficiente de un repuesto.
@@ -55,69 +64,114 @@ class InventoryManager:
         except Repuesto.DoesNotExist:
             return 0
     
-    def verificar_stock_bajo(self, umbral: int = 3) -> List[Repuesto]:
+    def verificar_stock_bajo(self, umbral: Optional[int] = None) -> List[Repuesto]:
         """
         Obtiene lista de repuestos con stock bajo.
         
         Args:
-            umbral: Umbral mínimo de stock (default: 3)
+            umbral: Umbral mínimo de stock (default: umbral_stock_bajo, o el
+                punto_reorden de cada repuesto)
             
         Returns:
             Lista de repuestos con stock bajo
         """
-        return list(Repuesto.objects.filter(stock__lt=umbral))
+        if umbral is None:
+            umbral = self.umbral_stock_bajo
+        if umbral is None:
+            return list(Repuesto.objects.stock_bajo().order_by("id"))
+        return list(Repuesto.objects.filter(stock__lt=umbral).order_by("id"))
+    
+    def umbral_de(self, repuesto: Repuesto) -> int:
+        """Stock bajo el cual el repuesto está en stock bajo."""
+        if self.umbral_stock_bajo is not None:
+            return self.umbral_stock_bajo
+        return repuesto.punto_reorden
     
-    def crear_alerta_stock_bajo(self, repuesto: Repuesto, emisor: PerfilUsuario) -> Optional[Notificacion]:
+    def crear_alerta_stock_bajo(
+        self,
+        repuesto: Repuesto,
+        emisor: Optional[PerfilUsuario] = None
+    ) -> Optional[Notificacion]:
         """
-        Crea una alerta de stock bajo si no existe una reciente.
+        Crea una alerta de stock bajo si no existe una del día.
         
         Args:
             repuesto: Repuesto con stock bajo
-            emisor: PerfilUsuario que genera la alerta
+            emisor: PerfilUsuario que genera la alerta (None = sistema)
             
         Returns:
-            Notificacion creada o None si ya existe una reciente
+            Notificacion creada o None si ya existe una del día
         """
-        # Verificar si ya existe una notificación reciente (últimas 24 horas)
-        hace_24h = timezone.now() - timedelta(hours=24)
+        creadas = self.crear_alertas_stock_bajo([repuesto], emisor)
+        return creadas[0] if creadas else None
+    
+    def crear_alertas_stock_bajo(
+        self,
+        repuestos: Iterable[Repuesto],
+        emisor: Optional[PerfilUsuario] = None
+    ) -> List[Notificacion]:
+        """
+        Crea las alertas de stock bajo del día para varios repuestos, para
+        todos los encargados de taller.
         
-        if Notificacion.objects.filter(
-            tipo=TipoNotificacion.MENSAJE_GENERAL,
-            orden__isnull=True,
-            mensaje__contains=f"Repuesto {repuesto.nombre} bajo en stock",
-            creada_en__gte=hace_24h
-        ).exists():
-            return None
+        Cada alerta lleva la clave ``stock_bajo:<repuesto_id>`` y la fecha como
+        periodo: los repuestos ya avisados hoy se descartan con una sola
+        consulta indexada, los receptores se resuelven una vez y todas las
+        alertas (repuesto × encargado) se escriben con un único insert; la
+        restricción única ignora los repetidos que lleguen en paralelo.
         
-        # Buscar perfil del encargado
-        perfil_encargado = PerfilUsuario.objects.filter(
-            rol="ENCARGADO_TALLER"
-        ).first()
+        Args:
+            repuestos: Repuestos con stock bajo
+            emisor: PerfilUsuario que genera la alerta (None = sistema)
+            
+        Returns:
+            Notificaciones enviadas al insert
+        """
+        servicio = NotificationService()
+        periodo = timezone.localdate().isoformat()
+        por_clave = {servicio.clave_stock_bajo(r.id): r for r in repuestos}
+        if not por_clave:
+            return []
         
-        if not perfil_encargado:
-            return None
+        existentes = servicio.claves_existentes(por_clave, periodo)
+        nuevas = [(clave, r) for clave, r in por_clave.items() if clave not in existentes]
+        if not nuevas:
+            return []
         
-        return Notificacion.objects.create(
-            tipo=TipoNotificacion.MENSAJE_GENERAL,
-            orden=None,
-            mensaje=f"Repuesto {repuesto.nombre} bajo en stock (solo {repuesto.stock} unidades).",
-            emisor=emisor,
-            receptor=perfil_encargado
-        )
+        receptores = servicio.ids_receptores(["ENCARGADO_TALLER"])
+        alertas = [
+            Notificacion(
+                tipo=TipoNotificacion.MENSAJE_GENERAL,
+                mensaje=f"Repuesto {repuesto.nombre} bajo en stock (solo {repuesto.stock} unidades).",
+                emisor=emisor,
+                receptor_id=receptor_id,
+                clave_dedup=clave,
+                periodo=periodo,
+            )
+            for clave, repuesto in nuevas
+            for receptor_id in receptores
+        ]
+        if not alertas:
+            return []
+        return guardar_notificaciones(alertas)
     
     def realizar_movimiento_stock(
         self, 
         repuesto_id: int, 
         tipo: str, 
-        cantidad: int
+        cantidad: int,
+        emisor: Optional[PerfilUsuario] = None
     ):
         """
         Realiza un movimiento de stock (entrada o salida).
+        Si una salida deja el stock bajo el umbral (y antes no lo estaba) crea
+        la alerta de stock bajo.
         
         Args:
             repuesto_id: ID del repuesto
             tipo: 'entrada' o 'salida'
             cantidad: Cantidad a mover
+            emisor: PerfilUsuario que registra el movimiento (opcional)
             
         Returns:
             Tupla (éxito, mensaje)
@@ -134,8 +188,10 @@ class InventoryManager:
                 if repuesto.stock < cantidad:
                     return False, f"No hay suficiente stock. Disponible: {repuesto.stock}"
                 
+                stock_anterior = repuesto.stock
                 repuesto.stock -= cantidad
                 repuesto.save()
+                self.alertar_si_cruza_umbral(repuesto, stock_anterior, emisor)
                 return True, f"Salida de {cantidad} unidades registrada."
             
             else:
@@ -143,4 +199,26 @@ class InventoryManager:
                 
         except Repuesto.DoesNotExist:
             return False, f"Repuesto con ID {repuesto_id} no existe"
-
+    
+    def alertar_si_cruza_umbral(
+        self,
+        repuesto: Repuesto,
+        stock_anterior: int,
+        emisor: Optional[PerfilUsuario] = None
+    ) -> Optional[Notificacion]:
+        """
+        Crea la alerta de stock bajo solo cuando el stock cruza el umbral
+        (de >= umbral a < umbral). Los repuestos que ya estaban bajo el umbral
+        los cubre el barrido periódico (comando alertas_stock_bajo).
+        
+        Args:
+            repuesto: Repuesto con el stock ya actualizado
+            stock_anterior: Stock antes del movimiento
+            emisor: PerfilUsuario que registró el movimiento (opcional)
+            
+        Returns:
+            Notificacion creada o None
+        """
+        if stock_anterior >= self.umbral_de(repuesto) > repuesto.stock:
+            return self.crear_alerta_stock_bajo(repuesto, emisor)
+        return None
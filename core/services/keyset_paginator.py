@@ -0,0 +1,139 @@
+"""
+Keyset Paginator - Paginación por cursor para las listas del sistema.
+
+En vez de OFFSET (que recorre todas las filas anteriores) cada página filtra
+a partir de la última fila de la página anterior usando el mismo orden que el
+índice, por ejemplo ``(creada_en, id)`` o ``(nombre, id)``. El costo de cada
+página no depende del tamaño de la tabla.
+"""
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Conserva los microsegundos (DjangoJSONEncoder los trunca a milisegundos)."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class PaginaKeyset:
+    """
+    Una página de resultados y el cursor para pedir la siguiente.
+    """
+
+    def __init__(self, elementos: List[Any], cursor_siguiente: Optional[str]):
+        self.elementos = elementos
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def hay_siguiente(self) -> bool:
+        return self.cursor_siguiente is not None
+
+    def __iter__(self):
+        return iter(self.elementos)
+
+    def __len__(self):
+        return len(self.elementos)
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un orden fijo de campos.
+    El último campo debe ser único (normalmente ``id``) para que el orden sea total.
+    """
+
+    def __init__(self, orden: Sequence[str], tamano: Optional[int] = None):
+        """
+        Args:
+            orden: Campos de orden, con '-' para descendente (ej: ('-creada_en', '-id'))
+            tamano: Filas por página (default: PAGINACION_TAMANO)
+        """
+        self.orden = tuple(orden)
+        self.tamano = tamano or getattr(settings, "PAGINACION_TAMANO", 50)
+
+    @classmethod
+    def desde_request(cls, request, orden: Sequence[str]) -> "KeysetPaginator":
+        """
+        Crea el paginador leyendo ``tamano`` del query string (acotado por
+        PAGINACION_TAMANO_MAXIMO).
+        """
+        maximo = getattr(settings, "PAGINACION_TAMANO_MAXIMO", 200)
+        try:
+            tamano = min(max(int(request.GET.get("tamano", 0)), 0), maximo)
+        except ValueError:
+            tamano = 0
+        return cls(orden, tamano or None)
+
+    def paginar(self, queryset: QuerySet, cursor: Optional[str] = None) -> PaginaKeyset:
+        """
+        Obtiene una página del queryset.
+
+        Args:
+            queryset: Consulta ya filtrada (se reordena con ``orden``)
+            cursor: Cursor devuelto por la página anterior (None = primera página).
+                Un cursor inválido se trata como la primera página.
+
+        Returns:
+            PaginaKeyset con los elementos y el cursor siguiente
+        """
+        queryset = queryset.order_by(*self.orden)
+
+        valores = self._decodificar(cursor)
+        if valores is not None:
+            try:
+                queryset = queryset.filter(self._filtro_desde(valores))
+            except (ValidationError, ValueError, TypeError):
+                pass  # Cursor manipulado: primera página
+
+        # Una fila extra indica si existe página siguiente
+        elementos = list(queryset[:self.tamano + 1])
+        cursor_siguiente = None
+        if len(elementos) > self.tamano:
+            elementos = elementos[:self.tamano]
+            cursor_siguiente = self._codificar(elementos[-1])
+
+        return PaginaKeyset(elementos, cursor_siguiente)
+
+    def _campos(self):
+        return [(campo.lstrip("-"), campo.startswith("-")) for campo in self.orden]
+
+    def _filtro_desde(self, valores: List[Any]) -> Q:
+        """
+        Construye (a > x) OR (a = x AND b > y) OR ... respetando la dirección
+        de cada campo.
+        """
+        filtro = Q()
+        iguales = {}
+        for (campo, descendente), valor in zip(self._campos(), valores):
+            lookup = "lt" if descendente else "gt"
+            filtro |= Q(**iguales, **{f"{campo}__{lookup}": valor})
+            iguales[campo] = valor
+        return filtro
+
+    def _codificar(self, elemento: Any) -> str:
+        valores = [getattr(elemento, campo) for campo, _ in self._campos()]
+        crudo = json.dumps(valores, cls=_CursorEncoder).encode()
+        return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+    def _decodificar(self, cursor: Optional[str]) -> Optional[List[Any]]:
+        if not cursor:
+            return None
+        try:
+            relleno = "=" * (-len(cursor) % 4)
+            valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        except (binascii.Error, ValueError):
+            return None
+        if not isinstance(valores, list) or len(valores) != len(self.orden):
+            return None
+        return valores
@@ -0,0 +1,156 @@
+"""
+Notification Outbox - Cola transaccional de eventos del patrón Observador.
+
+Los eventos se guardan en la tabla EventoOutbox dentro de la misma transacción
+que el cambio de la OT. El worker (``python manage.py procesar_outbox``) los
+despacha en lotes fuera del request, con reintentos y dead letter.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import EventoOutbox, EstadoEventoOutbox, OrdenTrabajo, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """
+    Outbox de notificaciones.
+    Serializa eventos del Subject y los despacha más tarde con reintentos.
+    """
+
+    def __init__(self, subject=None, max_intentos: Optional[int] = None):
+        """
+        Constructor que recibe dependencias inyectadas.
+
+        Args:
+            subject: OrdenTrabajoSubject que despacha los eventos (default: singleton)
+            max_intentos: Intentos antes de mover el evento a dead letter
+        """
+        if subject is None:
+            from ..patterns.observer import get_orden_trabajo_subject
+            subject = get_orden_trabajo_subject()
+        self.subject = subject
+        self.max_intentos = max_intentos or getattr(settings, "OUTBOX_MAX_INTENTOS", 5)
+        self.duracion_lease = timedelta(seconds=getattr(settings, "OUTBOX_LEASE_SEGUNDOS", 300))
+
+    def encolar(self, event: Dict[str, Any]) -> EventoOutbox:
+        """
+        Guarda un evento en el outbox (en la transacción actual).
+
+        Args:
+            event: Diccionario con información del evento
+
+        Returns:
+            EventoOutbox creado
+        """
+        datos = {
+            clave: valor for clave, valor in event.items()
+            if clave not in ('orden', 'emisor', 'tipo_evento')
+        }
+        orden = event.get('orden')
+        emisor = event.get('emisor')
+
+        return EventoOutbox.objects.create(
+            tipo_evento=event.get('tipo_evento') or "",
+            orden_id=orden.pk if orden else None,
+            emisor_id=emisor.pk if emisor else None,
+            datos=datos,
+        )
+
+    def procesar_lote(self, tamano: Optional[int] = None) -> Dict[str, int]:
+        """
+        Toma un lote de eventos disponibles y los despacha.
+
+        Args:
+            tamano: Máximo de eventos a procesar (default: OUTBOX_TAMANO_LOTE)
+
+        Returns:
+            Diccionario con conteos {'procesados', 'reintentos', 'fallidos'}
+        """
+        tamano = tamano or getattr(settings, "OUTBOX_TAMANO_LOTE", 50)
+        resultado = {'procesados': 0, 'reintentos': 0, 'fallidos': 0}
+
+        for evento in self._tomar_lote(tamano):
+            try:
+                with transaction.atomic():
+                    self.subject.despachar(self._deserializar(evento), tolerante=False)
+                    evento.estado = EstadoEventoOutbox.PROCESADO
+                    evento.procesado_en = timezone.now()
+                    evento.save(update_fields=["estado", "procesado_en"])
+                resultado['procesados'] += 1
+            except Exception as e:
+                if self._registrar_fallo(evento, e):
+                    resultado['fallidos'] += 1
+                else:
+                    resultado['reintentos'] += 1
+
+        return resultado
+
+    def _tomar_lote(self, tamano: int):
+        """
+        Reclama un lote con un token propio para que dos workers no despachen
+        el mismo evento. Los eventos PROCESANDO con lease vencido (worker caído)
+        vuelven a ser elegibles.
+        """
+        ahora = timezone.now()
+        disponibles = EventoOutbox.objects.filter(
+            Q(estado=EstadoEventoOutbox.PENDIENTE) | Q(estado=EstadoEventoOutbox.PROCESANDO),
+            disponible_en__lte=ahora,
+        )
+        ids = list(disponibles.order_by("disponible_en", "id").values_list("id", flat=True)[:tamano])
+        if not ids:
+            return []
+
+        token = uuid.uuid4().hex
+        disponibles.filter(id__in=ids).update(
+            estado=EstadoEventoOutbox.PROCESANDO,
+            lote=token,
+            disponible_en=ahora + self.duracion_lease,
+        )
+        return list(EventoOutbox.objects.filter(lote=token).order_by("id"))
+
+    def _registrar_fallo(self, evento: EventoOutbox, error: Exception) -> bool:
+        """
+        Registra un intento fallido con backoff exponencial.
+
+        Returns:
+            True si el evento pasó a dead letter
+        """
+        evento.intentos += 1
+        evento.ultimo_error = f"{error.__class__.__name__}: {error}"
+
+        if evento.intentos >= self.max_intentos:
+            evento.estado = EstadoEventoOutbox.FALLIDO
+            logger.error("Evento outbox #%s movido a dead letter: %s", evento.id, evento.ultimo_error)
+        else:
+            evento.estado = EstadoEventoOutbox.PENDIENTE
+            evento.disponible_en = timezone.now() + timedelta(seconds=2 ** evento.intentos)
+            logger.warning(
+                "Evento outbox #%s falló (intento %s/%s): %s",
+                evento.id, evento.intentos, self.max_intentos, evento.ultimo_error
+            )
+
+        evento.save(update_fields=["intentos", "ultimo_error", "estado", "disponible_en"])
+        return evento.estado == EstadoEventoOutbox.FALLIDO
+
+    def _deserializar(self, evento: EventoOutbox) -> Dict[str, Any]:
+        """Reconstruye el diccionario de evento que esperan los observadores."""
+        event = dict(evento.datos)
+        event['tipo_evento'] = evento.tipo_evento
+        event['orden'] = (
+            OrdenTrabajo.objects.select_related("mecanico").get(pk=evento.orden_id)
+            if evento.orden_id else None
+        )
+        event['emisor'] = (
+            PerfilUsuario.objects.filter(pk=evento.emisor_id).first()
+            if evento.emisor_id else None
+        )
+        return event
@@ -0,0 +1,156 @@
+"""
+Notification Retention - Retención y compactación de notificaciones.
+
+- Compactación: los avisos repetidos se agrupan en la fila más reciente, que
+  acumula el total en ``repeticiones``. Son repetidos los que comparten
+  receptor, tipo, estado de lectura y ``clave_dedup`` (p. ej. stock_bajo:<id>,
+  aunque el texto cambie con el stock o el período); los que no tienen clave,
+  si además coinciden OT y mensaje.
+- Retención: las notificaciones leídas más antiguas que N días se borran,
+  opcionalmente guardándolas antes en un archivo JSON Lines comprimido.
+
+Todo se hace en lotes acotados, cada uno en su propia transacción corta, para
+que SQLite no mantenga el bloqueo de escritura mientras se procesa la tabla.
+"""
+import gzip
+import json
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from ..models import Notificacion
+
+CAMPOS_ARCHIVO = (
+    "id", "tipo", "orden_id", "emisor_id", "receptor_id",
+    "mensaje", "creada_en", "leida", "repeticiones",
+)
+
+# Agrupaciones de duplicados: (campos que deben coincidir, filtro de las filas)
+AGRUPACIONES_DUPLICADO = (
+    (("receptor_id", "tipo", "clave_dedup", "leida"), {"clave_dedup__isnull": False}),
+    (("receptor_id", "tipo", "orden_id", "mensaje", "leida"), {"clave_dedup__isnull": True}),
+)
+
+
+class NotificationRetention:
+    """
+    Política de retención de notificaciones.
+    """
+
+    def __init__(
+        self,
+        dias: Optional[int] = None,
+        lote: Optional[int] = None,
+        pausa: float = 0.0
+    ):
+        """
+        Args:
+            dias: Días que se conservan las leídas (default: NOTIFICACIONES_RETENCION_DIAS)
+            lote: Filas (o grupos de duplicados) por transacción
+                (default: NOTIFICACIONES_RETENCION_LOTE)
+            pausa: Segundos de espera entre lotes, para dejar escribir a otros procesos
+        """
+        self.dias = dias if dias is not None else getattr(settings, "NOTIFICACIONES_RETENCION_DIAS", 90)
+        self.lote = lote or getattr(settings, "NOTIFICACIONES_RETENCION_LOTE", 500)
+        self.pausa = pausa
+
+    def vencidas(self):
+        """Notificaciones leídas anteriores al límite de retención."""
+        limite = timezone.now() - timedelta(days=self.dias)
+        return Notificacion.objects.filter(leida=True, creada_en__lt=limite)
+
+    def purgar(self, archivo: Optional[str] = None) -> int:
+        """
+        Borra (y opcionalmente archiva) las notificaciones vencidas.
+
+        Args:
+            archivo: Ruta de un .jsonl.gz donde agregar las filas antes de borrarlas
+
+        Returns:
+            Cantidad de notificaciones borradas
+        """
+        salida = gzip.open(archivo, "at", encoding="utf-8") if archivo else None
+        borradas = 0
+        try:
+            while True:
+                filas = list(self.vencidas().order_by("pk").values(*CAMPOS_ARCHIVO)[:self.lote])
+                if not filas:
+                    break
+
+                if salida:
+                    for fila in filas:
+                        salida.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+                    salida.flush()
+
+                with transaction.atomic():
+                    borradas += Notificacion.objects.filter(
+                        pk__in=[fila["id"] for fila in filas]
+                    ).delete()[0]
+
+                self._pausar()
+        finally:
+            if salida:
+                salida.close()
+        return borradas
+
+    def duplicados(self) -> List[Dict]:
+        """Grupos de avisos repetidos con más de una fila (de todas las agrupaciones)."""
+        return [
+            grupo
+            for campos, filtro in AGRUPACIONES_DUPLICADO
+            for grupo in self._grupos(campos, filtro)
+        ]
+
+    @staticmethod
+    def _grupos(campos, filtro):
+        return (
+            Notificacion.objects.filter(**filtro)
+            .values(*campos)
+            .annotate(filas=Count("id"), ultima=Max("id"), total=Sum("repeticiones"))
+            .filter(filas__gt=1)
+            .order_by("ultima")
+        )
+
+    def compactar(self) -> int:
+        """
+        Agrupa los avisos repetidos en su fila más reciente.
+
+        Returns:
+            Cantidad de filas eliminadas
+        """
+        eliminadas = 0
+        for campos, filtro in AGRUPACIONES_DUPLICADO:
+            grupos = list(self._grupos(campos, filtro)[:self.lote])
+            while grupos:
+                with transaction.atomic():
+                    for grupo in grupos:
+                        eliminadas += self._compactar_grupo(grupo, campos, filtro)
+                self._pausar()
+                grupos = list(self._grupos(campos, filtro)[:self.lote])
+
+        return eliminadas
+
+    def _compactar_grupo(self, grupo: Dict, campos, filtro) -> int:
+        filas = Notificacion.objects.filter(**filtro, **{campo: grupo[campo] for campo in campos})
+        Notificacion.objects.filter(pk=grupo["ultima"]).update(repeticiones=grupo["total"])
+        return filas.exclude(pk=grupo["ultima"]).delete()[0]
+
+    def ejecutar(self, archivo: Optional[str] = None, compactar: bool = True) -> Dict[str, int]:
+        """
+        Aplica la política completa: compactación y luego retención.
+
+        Returns:
+            Diccionario {'compactadas', 'borradas'}
+        """
+        compactadas = self.compactar() if compactar else 0
+        return {"compactadas": compactadas, "borradas": self.purgar(archivo)}
+
+    def _pausar(self) -> None:
+        if self.pausa:
+            time.sleep(self.pausa)
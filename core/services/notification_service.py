@@ -3,9 +3,15 @@ Notification Service - Servicio para gestión de notificaciones.
 
 Usa el patrón Observador para notificaciones automáticas.
 """
-from typing import Optional
-from ..models import PerfilUsuario, OrdenTrabajo, TipoNotificacion, Notificacion
-from ..patterns.observer import get_orden_trabajo_subject
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+
+from ..models import (
+    PerfilUsuario, OrdenTrabajo, TipoNotificacion, Notificacion, EventoOutbox, EstadoEventoOutbox
+)
+from ..patterns.observer import get_orden_trabajo_subject, guardar_notificaciones
+from .dashboard_cache import DashboardCache
 
 
 class NotificationService:
@@ -18,6 +24,41 @@ class NotificationService:
         """Inicializa el servicio con el Subject del patrón Observer."""
         self.subject = get_orden_trabajo_subject()
     
+    # ---------- Claves de deduplicación ----------
+    
+    @staticmethod
+    def clave_atraso(orden_id: int) -> str:
+        return f"atraso:{orden_id}"
+    
+    @staticmethod
+    def clave_stock_bajo(repuesto_id: int) -> str:
+        return f"stock_bajo:{repuesto_id}"
+    
+    @staticmethod
+    def claves_existentes(claves: Iterable[str], periodo: str = "") -> set:
+        """
+        Claves que ya tienen aviso en el periodo (una consulta sobre el índice
+        de notif_dedup_unica).
+        """
+        return set(
+            Notificacion.objects.filter(clave_dedup__in=list(claves), periodo=periodo)
+            .values_list("clave_dedup", flat=True)
+            .distinct()
+        )
+    
+    @staticmethod
+    def claves_en_outbox(claves: Iterable[str]) -> set:
+        """
+        Claves con un evento todavía sin despachar en el outbox (pendiente o en
+        proceso): su aviso aún no existe como Notificacion.
+        """
+        return set(
+            EventoOutbox.objects.filter(
+                estado__in=[EstadoEventoOutbox.PENDIENTE, EstadoEventoOutbox.PROCESANDO],
+                datos__clave_dedup__in=list(claves),
+            ).values_list("datos__clave_dedup", flat=True)
+        )
+    
     def notificar_solicitud_cambio(
         self,
         orden: OrdenTrabajo,
@@ -52,19 +93,43 @@ class NotificationService:
             orden: OrdenTrabajo atrasada
             emisor: PerfilUsuario que detecta el atraso
         """
-        # Verificar si ya existe notificación de atraso
-        if Notificacion.objects.filter(
-            tipo=TipoNotificacion.ATRASO_TRABAJO,
-            orden=orden
-        ).exists():
-            return
+        self.notificar_atrasos([orden], emisor)
+    
+    def notificar_atrasos(
+        self,
+        ordenes: Iterable[OrdenTrabajo],
+        emisor: PerfilUsuario
+    ) -> int:
+        """
+        Notifica el atraso de varias OTs, una sola vez por OT.
+        Las OTs ya avisadas se descartan con una única consulta por clave
+        (``atraso:<ot_id>``); la restricción única cubre las carreras. Con
+        NOTIFICACIONES_ASINCRONAS también se descartan las que tienen el aviso
+        encolado en el outbox y aún no procesado.
         
-        event = {
-            'orden': orden,
-            'tipo_evento': 'ATRASO',
-            'emisor': emisor
-        }
-        self.subject.notify(event)
+        Args:
+            ordenes: OrdenTrabajo atrasadas
+            emisor: PerfilUsuario que detecta el atraso
+            
+        Returns:
+            Cantidad de OTs notificadas
+        """
+        por_clave = {self.clave_atraso(orden.id): orden for orden in ordenes}
+        if not por_clave:
+            return 0
+        
+        existentes = self.claves_existentes(por_clave)
+        if getattr(settings, "NOTIFICACIONES_ASINCRONAS", False):
+            existentes |= self.claves_en_outbox(set(por_clave) - existentes)
+        nuevas = [(clave, orden) for clave, orden in por_clave.items() if clave not in existentes]
+        for clave, orden in nuevas:
+            self.subject.notify({
+                'orden': orden,
+                'tipo_evento': 'ATRASO',
+                'emisor': emisor,
+                'clave_dedup': clave,
+            })
+        return len(nuevas)
     
     def notificar_bitacora_registrada(
         self,
@@ -125,4 +190,95 @@ class NotificationService:
             'emisor': emisor
         }
         self.subject.notify(event)
-
+    
+    @staticmethod
+    def ids_receptores(roles: Iterable[str]) -> List[int]:
+        """Ids de los perfiles de los roles indicados (una consulta)."""
+        return list(
+            PerfilUsuario.objects.filter(rol__in=list(roles))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+    
+    def notificar_roles(
+        self,
+        roles: Iterable[str],
+        mensaje: str,
+        emisor: Optional[PerfilUsuario] = None,
+        orden: Optional[OrdenTrabajo] = None,
+        tipo: str = TipoNotificacion.MENSAJE_GENERAL,
+        clave_dedup: Optional[str] = None,
+        periodo: str = ""
+    ) -> List[Notificacion]:
+        """
+        Envía el mismo mensaje a todos los perfiles de los roles indicados.
+        Resuelve los receptores en una sola consulta y escribe con un único
+        bulk_create, sin importar cuántos perfiles tenga cada rol.
+        
+        Args:
+            roles: Roles destinatarios (ej: ['ENCARGADO_BODEGA', 'ENCARGADO_TALLER'])
+            mensaje: Texto de la notificación
+            emisor: PerfilUsuario que origina el mensaje (opcional)
+            orden: OrdenTrabajo relacionada (opcional)
+            tipo: TipoNotificacion (default: MENSAJE_GENERAL)
+            clave_dedup: Clave del aviso; los receptores que ya lo tienen en el
+                periodo se omiten (INSERT OR IGNORE)
+            periodo: Ventana de la clave (ej: fecha ISO en avisos diarios)
+            
+        Returns:
+            Lista de Notificacion enviadas al insert
+        """
+        notificaciones = [
+            Notificacion(
+                tipo=tipo,
+                orden=orden,
+                mensaje=mensaje,
+                emisor=emisor,
+                receptor_id=receptor_id,
+                clave_dedup=clave_dedup,
+                periodo=periodo
+            )
+            for receptor_id in self.ids_receptores(roles)
+        ]
+        if not notificaciones:
+            return []
+        return guardar_notificaciones(notificaciones)
+    
+    def marcar_leidas(
+        self,
+        receptor: PerfilUsuario,
+        ids: Optional[Iterable[int]] = None,
+        tipo: Optional[str] = None,
+        orden_id: Optional[int] = None
+    ) -> int:
+        """
+        Marca como leídas las notificaciones no leídas del receptor con un único
+        UPDATE y actualiza su contador de no leídas en el mismo paso.
+        Sin filtros marca todas.
+        
+        Args:
+            receptor: PerfilUsuario dueño de las notificaciones
+            ids: Ids de notificaciones a marcar (opcional)
+            tipo: TipoNotificacion a marcar (opcional)
+            orden_id: OT de las notificaciones a marcar (opcional)
+            
+        Returns:
+            Cantidad de notificaciones marcadas
+        """
+        pendientes = Notificacion.objects.no_leidas(receptor)
+        todas = ids is None and tipo is None and orden_id is None
+        if ids is not None:
+            pendientes = pendientes.filter(id__in=list(ids))
+        if tipo is not None:
+            pendientes = pendientes.filter(tipo=tipo)
+        if orden_id is not None:
+            pendientes = pendientes.filter(orden_id=orden_id)
+        
+        # update() no envía post_save: el contador se ajusta aquí
+        marcadas = pendientes.update(leida=True)
+        cache = DashboardCache()
+        if todas:
+            cache.actualizar(DashboardCache.clave_no_leidas(receptor.pk), 0)
+        else:
+            cache.descontar_no_leidas(receptor.pk, marcadas)
+        return marcadas
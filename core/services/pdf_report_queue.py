@@ -0,0 +1,416 @@
+"""
+PDF Report Queue - Cola de informes PDF renderizados fuera del request.
+
+xhtml2pdf consume mucha CPU, así que el request solo arma el HTML (que necesita
+el ORM) y lo entrega a un pool de procesos. El PDF terminado queda en
+``MEDIA_ROOT/informes/<trabajo>.pdf``; el estado de cada trabajo se deduce de
+los archivos del directorio, por lo que cualquier proceso del servidor puede
+responder la consulta de estado y la descarga.
+
+El id de trabajo es ``<ot_id>-<huella>``, donde la huella resume el contenido
+del informe: si la OT no cambió, el PDF ya generado se reutiliza sin volver a
+renderizar. El directorio es un caché LRU acotado por tamaño (la fecha de
+modificación de cada PDF marca su último uso). Un marcador ``.pendiente`` más
+antiguo que INFORMES_PENDIENTE_EXPIRA_SEGUNDOS (proceso caído a mitad del
+renderizado) se descarta y el informe se vuelve a encolar en el siguiente pedido.
+
+Las exportaciones masivas (``encolar_lote``) reparten los informes en el mismo
+pool y los empaquetan en ``lote-<huella>.zip``.
+
+Este módulo no importa modelos: los procesos hijos solo ejecutan
+``renderizar_pdf``.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import hashlib
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_PATRON_TRABAJO = re.compile(r"^(\d+)-([0-9a-f]{16,64})$")
+_PATRON_LOTE = re.compile(r"^lote-[0-9a-f]{32}$")
+
+
+def renderizar_pdf(html: str, destino: str) -> None:
+    """
+    Renderiza el HTML a PDF (se ejecuta en un proceso hijo).
+    Escribe en un archivo temporal y lo renombra, así nunca se sirve un PDF a medias.
+
+    Args:
+        html: Informe ya renderizado
+        destino: Ruta final del PDF
+
+    Raises:
+        RuntimeError: Si xhtml2pdf reporta errores
+    """
+    from xhtml2pdf import pisa
+
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as archivo:
+        resultado = pisa.CreatePDF(html, dest=archivo)
+    if resultado.err:
+        os.remove(temporal)
+        raise RuntimeError(f"xhtml2pdf reportó {resultado.err} error(es)")
+    os.replace(temporal, destino)
+
+
+class EstadoInforme:
+    PENDIENTE = "PENDIENTE"
+    LISTO = "LISTO"
+    ERROR = "ERROR"
+
+
+class PdfReportQueue:
+    """
+    Cola de informes PDF respaldada por un ProcessPoolExecutor.
+    """
+
+    def __init__(self, directorio: Optional[Path] = None, workers: Optional[int] = None):
+        """
+        Args:
+            directorio: Carpeta de los PDFs (default: MEDIA_ROOT/informes)
+            workers: Procesos del pool (default: INFORMES_PDF_WORKERS).
+                Con 0 se renderiza en el mismo proceso (desarrollo y tests).
+        """
+        self.directorio = Path(directorio or Path(settings.MEDIA_ROOT) / "informes")
+        self.workers = workers if workers is not None else getattr(settings, "INFORMES_PDF_WORKERS", 2)
+        self.max_bytes = getattr(settings, "INFORMES_PDF_CACHE_MAX_MB", 200) * 1024 * 1024
+        self.expiracion_pendiente = getattr(settings, "INFORMES_PENDIENTE_EXPIRA_SEGUNDOS", 900)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Renderizados en curso en este proceso y lotes esperando sus PDFs
+        self._futuros: Dict[str, Future] = {}
+        self._hilos_lote: List[threading.Thread] = []
+        self._lotes_en_curso = 0
+
+    # ---------- Encolar ----------
+
+    def solicitar(self, ot_id: int, huella: str, generar_html: Callable[[], str]) -> str:
+        """
+        Obtiene el informe desde el caché o lo encola si no existe.
+
+        Args:
+            ot_id: Id de la OT del informe
+            huella: Hash hexadecimal del contenido del informe
+            generar_html: Función que renderiza el HTML (solo se llama si falta el PDF)
+
+        Returns:
+            Id del trabajo para consultar su estado
+        """
+        trabajo_id = f"{ot_id}-{huella}"
+        estado = self.estado(trabajo_id)
+        if estado == EstadoInforme.LISTO:
+            self.marcar_uso(trabajo_id)
+            return trabajo_id
+        if estado == EstadoInforme.PENDIENTE:
+            return trabajo_id
+
+        # Sin PDF o con error previo: las versiones anteriores de la OT ya no sirven
+        self._descartar_versiones(ot_id)
+        return self.encolar(ot_id, generar_html(), huella)
+
+    def encolar(self, ot_id: int, html: str, huella: Optional[str] = None) -> str:
+        """
+        Encola el renderizado de un informe.
+
+        Args:
+            ot_id: Id de la OT del informe
+            html: Informe ya renderizado
+            huella: Hash del contenido (default: id aleatorio, sin reutilización)
+
+        Returns:
+            Id del trabajo para consultar su estado
+        """
+        trabajo_id = f"{ot_id}-{huella or uuid.uuid4().hex[:16]}"
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._ruta(trabajo_id, ".error").unlink(missing_ok=True)
+        self._ruta(trabajo_id, ".pendiente").touch()
+        destino = str(self._ruta(trabajo_id, ".pdf"))
+
+        if self.workers == 0:
+            try:
+                renderizar_pdf(html, destino)
+                self._terminar(trabajo_id, None)
+            except Exception as e:
+                self._terminar(trabajo_id, e)
+            return trabajo_id
+
+        try:
+            futuro = self._pool().submit(renderizar_pdf, html, destino)
+        except BrokenProcessPool:
+            # Un hijo murió (ej: sin memoria); se recrea el pool una vez
+            self._reiniciar_pool()
+            futuro = self._pool().submit(renderizar_pdf, html, destino)
+        with self._lock:
+            self._futuros[trabajo_id] = futuro
+        futuro.add_done_callback(lambda f: self._terminar(trabajo_id, f.exception()))
+        return trabajo_id
+
+    def encolar_lote(self, documentos: Iterable[Tuple[int, str, Callable[[], str]]]) -> str:
+        """
+        Encola muchos informes y los empaqueta en un ZIP cuando terminan.
+        Los informes ya cacheados no se vuelven a renderizar.
+
+        Args:
+            documentos: Tuplas (ot_id, huella, función que genera el HTML)
+
+        Returns:
+            Id del lote para consultar su estado
+        """
+        with self._lock:
+            self._lotes_en_curso += 1
+        try:
+            trabajos = [
+                self.solicitar(ot_id, huella, generar_html)
+                for ot_id, huella, generar_html in documentos
+            ]
+            lote_id = "lote-" + hashlib.sha256("\n".join(trabajos).encode()).hexdigest()[:32]
+            if self.estado(lote_id) in (EstadoInforme.LISTO, EstadoInforme.PENDIENTE):
+                self.marcar_uso(lote_id)
+                self._finalizar_lote()
+                return lote_id
+
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            self._ruta(lote_id, ".error").unlink(missing_ok=True)
+            self._ruta(lote_id, ".pendiente").touch()
+        except BaseException:
+            self._finalizar_lote()
+            raise
+
+        with self._lock:
+            futuros = [self._futuros[t] for t in trabajos if t in self._futuros]
+        if not futuros:
+            self._armar_lote(lote_id, trabajos, [])
+        else:
+            hilo = threading.Thread(target=self._armar_lote, args=(lote_id, trabajos, futuros), daemon=True)
+            with self._lock:
+                self._hilos_lote.append(hilo)
+            hilo.start()
+        return lote_id
+
+    def _armar_lote(self, lote_id: str, trabajos: List[str], futuros: List[Future]) -> None:
+        """Espera los PDFs del lote y escribe el ZIP (temporal + rename)."""
+        try:
+            wait(futuros)
+            # Informes que renderiza otro proceso del servidor
+            limite = time.monotonic() + getattr(settings, "INFORMES_LOTE_ESPERA_SEGUNDOS", 600)
+            while any(self.estado(t) == EstadoInforme.PENDIENTE for t in trabajos):
+                if time.monotonic() > limite:
+                    break
+                time.sleep(0.5)
+
+            destino = self._ruta(lote_id, ".zip")
+            temporal = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+            fallidos = []
+            with zipfile.ZipFile(temporal, "w") as archivo_zip:
+                for trabajo_id in trabajos:
+                    ruta = self.ruta_archivo(trabajo_id)
+                    if ruta is None:
+                        fallidos.append(trabajo_id)
+                        continue
+                    archivo_zip.write(ruta, f"informe_OT_{self.ot_de(trabajo_id)}.pdf")
+                if fallidos:
+                    archivo_zip.writestr("errores.txt", "".join(
+                        f"OT #{self.ot_de(t)}: no se pudo generar el informe\n" for t in fallidos
+                    ))
+            os.replace(temporal, destino)
+            self._terminar(lote_id, None)
+        except Exception as e:
+            self._terminar(lote_id, e)
+        finally:
+            self._finalizar_lote()
+
+    def _finalizar_lote(self) -> None:
+        with self._lock:
+            self._lotes_en_curso -= 1
+            en_curso = self._lotes_en_curso
+        if not en_curso:
+            self.desalojar()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: no se hereda el estado de hilos ni conexiones del servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reiniciar_pool(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _terminar(self, trabajo_id: str, error: Optional[BaseException]) -> None:
+        if error is not None:
+            logger.error("Informe %s falló: %s", trabajo_id, error)
+            self._ruta(trabajo_id, ".error").write_text(f"{error.__class__.__name__}: {error}")
+        self._ruta(trabajo_id, ".pendiente").unlink(missing_ok=True)
+        with self._lock:
+            self._futuros.pop(trabajo_id, None)
+            # Un lote en curso todavía necesita sus PDFs
+            desalojar = error is None and not self._lotes_en_curso
+        if desalojar:
+            self.desalojar()
+
+    def cerrar(self) -> None:
+        """Espera los trabajos y lotes en curso y libera el pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            hilos, self._hilos_lote = self._hilos_lote, []
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for hilo in hilos:
+            hilo.join()
+
+    # ---------- Caché ----------
+
+    def marcar_uso(self, trabajo_id: str) -> None:
+        """Actualiza la fecha de último uso de un PDF o ZIP (política LRU)."""
+        try:
+            os.utime(self._ruta(trabajo_id, self._extension(trabajo_id)))
+        except FileNotFoundError:
+            pass
+
+    def _descartar_versiones(self, ot_id: int) -> None:
+        """Elimina los PDFs y errores de versiones anteriores de una OT."""
+        for ruta in self.directorio.glob(f"{ot_id}-*"):
+            if ruta.suffix in (".pdf", ".error"):
+                ruta.unlink(missing_ok=True)
+
+    def desalojar(self) -> int:
+        """
+        Elimina los PDFs y ZIPs usados hace más tiempo hasta quedar bajo
+        INFORMES_PDF_CACHE_MAX_MB.
+
+        Returns:
+            Cantidad de archivos eliminados
+        """
+        archivos = []
+        for ruta in [*self.directorio.glob("*.pdf"), *self.directorio.glob("lote-*.zip")]:
+            try:
+                info = ruta.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in archivos)
+        eliminados = 0
+        for _, tamano, ruta in sorted(archivos):
+            if total <= self.max_bytes:
+                break
+            ruta.unlink(missing_ok=True)
+            total -= tamano
+            eliminados += 1
+        return eliminados
+
+    # ---------- Consultas ----------
+
+    def _ruta(self, trabajo_id: str, extension: str) -> Path:
+        return self.directorio / f"{trabajo_id}{extension}"
+
+    @staticmethod
+    def es_lote(trabajo_id: str) -> bool:
+        return bool(_PATRON_LOTE.match(trabajo_id))
+
+    def _extension(self, trabajo_id: str) -> str:
+        return ".zip" if self.es_lote(trabajo_id) else ".pdf"
+
+    @staticmethod
+    def ot_de(trabajo_id: str) -> Optional[int]:
+        """Id de la OT de un trabajo (None si el id no es válido)."""
+        coincidencia = _PATRON_TRABAJO.match(trabajo_id)
+        return int(coincidencia.group(1)) if coincidencia else None
+
+    def estado(self, trabajo_id: str) -> Optional[str]:
+        """
+        Obtiene el estado de un trabajo o lote.
+
+        Returns:
+            EstadoInforme o None si el trabajo no existe
+        """
+        if self.ot_de(trabajo_id) is None and not self.es_lote(trabajo_id):
+            return None
+        if self._ruta(trabajo_id, self._extension(trabajo_id)).exists():
+            return EstadoInforme.LISTO
+        if self._ruta(trabajo_id, ".error").exists():
+            return EstadoInforme.ERROR
+        if self._pendiente_vigente(trabajo_id):
+            return EstadoInforme.PENDIENTE
+        return None
+
+    def _pendiente_vigente(self, trabajo_id: str) -> bool:
+        """
+        True si el trabajo tiene un marcador ``.pendiente`` reciente. Un marcador
+        vencido que no corresponde a un renderizado de este proceso se elimina.
+        """
+        marcador = self._ruta(trabajo_id, ".pendiente")
+        try:
+            antiguedad = time.time() - marcador.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if antiguedad <= self.expiracion_pendiente:
+            return True
+        with self._lock:
+            en_curso = trabajo_id in self._futuros
+        if en_curso:
+            return True
+        logger.warning("Informe %s: marcador pendiente vencido (%.0f s), se descarta", trabajo_id, antiguedad)
+        marcador.unlink(missing_ok=True)
+        return False
+
+    def ruta_archivo(self, trabajo_id: str) -> Optional[Path]:
+        """Ruta del PDF o ZIP terminado, o None si todavía no está listo."""
+        if self.estado(trabajo_id) != EstadoInforme.LISTO:
+            return None
+        return self._ruta(trabajo_id, self._extension(trabajo_id))
+
+    def abrir(self, trabajo_id: str):
+        """
+        Abre el PDF o ZIP terminado para descargarlo y marca su uso.
+
+        Returns:
+            Archivo abierto en modo binario, o None si no está listo o el
+            desalojo lo eliminó entre la consulta y la apertura
+        """
+        ruta = self.ruta_archivo(trabajo_id)
+        if ruta is None:
+            return None
+        try:
+            archivo = open(ruta, "rb")
+        except FileNotFoundError:
+            return None
+        self.marcar_uso(trabajo_id)
+        return archivo
+
+
+# Instancia global de la cola (Singleton pattern)
+_pdf_report_queue = None
+
+
+def get_pdf_report_queue() -> PdfReportQueue:
+    """
+    Obtiene la instancia global de la cola de informes (Singleton).
+
+    Returns:
+        Instancia de PdfReportQueue
+    """
+    global _pdf_report_queue
+
+    if _pdf_report_queue is None:
+        _pdf_report_queue = PdfReportQueue()
+
+    return _pdf_report_queue
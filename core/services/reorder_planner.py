@@ -0,0 +1,134 @@
+"""
+Reorder Planner - Planificación de reposición de repuestos.
+
+Ordena los repuestos por días hasta quedar sin stock y arma una orden de
+compra sugerida agrupada por proveedor.
+
+Cada Repuesto guarda su consumo diario y stock de seguridad (copiados de
+ConsumoRepuesto por ``python manage.py calcular_consumo``) y, en cada save()
+(movimientos de stock), sus días hasta el quiebre y si requiere reposición.
+``urgentes(k)`` lee los k primeros del índice parcial repuesto_quiebre_idx
+(solo repuestos que requieren reposición, ordenados por días, stock e id):
+no recorre la tabla ni agrega el historial de consumo.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from ..models import Proveedor, Repuesto
+
+
+class SugerenciaReposicion(NamedTuple):
+    """Un repuesto a reponer y la cantidad sugerida."""
+    repuesto: Repuesto
+    consumo_diario: float
+    dias_hasta_quiebre: float
+    cantidad_sugerida: int
+
+    @property
+    def sin_consumo(self) -> bool:
+        return self.dias_hasta_quiebre == math.inf
+
+    @property
+    def costo(self) -> int:
+        return self.cantidad_sugerida * self.repuesto.precio_compra
+
+    @classmethod
+    def de_repuesto(cls, repuesto: Repuesto) -> "SugerenciaReposicion":
+        """
+        Sugerencia a partir de los campos de reposición del repuesto: cubrir la
+        demanda durante la reposición y volver al punto de reorden (o al stock
+        de seguridad, si es mayor).
+        """
+        objetivo = max(repuesto.punto_reorden, repuesto.stock_seguridad) + math.ceil(
+            repuesto.consumo_diario * repuesto.tiempo_reposicion_dias
+        )
+        dias = repuesto.dias_hasta_quiebre
+        return cls(
+            repuesto=repuesto,
+            consumo_diario=repuesto.consumo_diario,
+            dias_hasta_quiebre=math.inf if dias is None else dias,
+            cantidad_sugerida=max(objetivo - repuesto.stock, 1),
+        )
+
+
+ORDEN_URGENCIA = ("dias_hasta_quiebre", "stock", "id")
+
+
+class ReorderPlanner:
+    """
+    Planificador de reposición basado en consumo.
+    """
+
+    @staticmethod
+    def candidatos() -> QuerySet:
+        """Repuestos que requieren reposición (índice parcial repuesto_quiebre_idx)."""
+        return Repuesto.objects.filter(requiere_reposicion=True).select_related("proveedor")
+
+    def sugerencias(self) -> Iterator[SugerenciaReposicion]:
+        """
+        Repuestos que necesitan reposición: bajo su punto de reorden o su stock
+        de seguridad, o cuyo stock no alcanza a cubrir el tiempo de reposición
+        del proveedor.
+        """
+        for repuesto in self.candidatos().order_by(*ORDEN_URGENCIA).iterator():
+            yield SugerenciaReposicion.de_repuesto(repuesto)
+
+    def urgentes(self, k: Optional[int] = None) -> List[SugerenciaReposicion]:
+        """
+        Los k repuestos más próximos a quedar sin stock: los primeros k del
+        índice y, si faltan, los sin consumo (días infinitos) con menos stock.
+
+        Args:
+            k: Cantidad de repuestos (default: REPOSICION_TOP)
+
+        Returns:
+            Sugerencias ordenadas por días hasta el quiebre (y luego por stock)
+        """
+        k = k or getattr(settings, "REPOSICION_TOP", 20)
+        # En SQLite los NULL van primero: los sin consumo se piden aparte
+        repuestos = list(
+            self.candidatos().filter(dias_hasta_quiebre__isnull=False).order_by(*ORDEN_URGENCIA)[:k]
+        )
+        if len(repuestos) < k:
+            repuestos += self.candidatos().filter(
+                dias_hasta_quiebre__isnull=True
+            ).order_by(*ORDEN_URGENCIA)[:k - len(repuestos)]
+        return [SugerenciaReposicion.de_repuesto(repuesto) for repuesto in repuestos]
+
+    def orden_compra(
+        self,
+        sugerencias: Optional[List[SugerenciaReposicion]] = None,
+        k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Orden de compra sugerida para los repuestos urgentes, por proveedor.
+
+        Args:
+            sugerencias: Resultado de ``urgentes`` ya calculado (default: urgentes(k))
+            k: Cantidad de repuestos si hay que calcular las sugerencias
+
+        Returns:
+            Lista de {'proveedor', 'items', 'total'} ordenada por nombre de
+            proveedor (los repuestos sin proveedor van al final)
+        """
+        por_proveedor: Dict[Optional[Proveedor], List[SugerenciaReposicion]] = defaultdict(list)
+        if sugerencias is None:
+            sugerencias = self.urgentes(k)
+        for sugerencia in sugerencias:
+            por_proveedor[sugerencia.repuesto.proveedor].append(sugerencia)
+
+        return [
+            {
+                "proveedor": proveedor,
+                "items": items,
+                "total": sum(item.costo for item in items),
+            }
+            for proveedor, items in sorted(
+                por_proveedor.items(),
+                key=lambda par: (par[0] is None, par[0].nombre if par[0] else ""),
+            )
+        ]
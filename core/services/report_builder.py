@@ -0,0 +1,115 @@
+"""
+Report Builder - Contenido del informe PDF de una OT.
+
+Arma el HTML del informe y su huella (hash del contenido que usa el caché de
+PdfReportQueue). Ambos leen solo la OT y sus relaciones, así que con
+``OrdenTrabajo.objects.para_informe()`` no se hacen consultas por OT, ni en
+un informe individual ni en una exportación de cientos de OTs.
+"""
+import hashlib
+import json
+from datetime import date
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import get_template
+
+from ..models import OrdenTrabajo
+
+PLANTILLA_INFORME = "core/encargado/informe_pdf.html"
+
+
+def html_informe(ot: OrdenTrabajo) -> str:
+    """
+    Renderiza el HTML del informe (lo que luego se pasa a PDF).
+
+    Args:
+        ot: OrdenTrabajo, idealmente cargada con para_informe()
+
+    Returns:
+        HTML del informe
+    """
+    # Totales guardados en la OT (sin recorrer los ítems)
+    total_servicios = ot.total_servicios()
+    total_repuestos = ot.total_repuestos()
+
+    context = {
+        "ot": ot,
+        "total_servicios": total_servicios,
+        "total_repuestos": total_repuestos,
+        "total_general": total_servicios + total_repuestos,
+        "tiempo_total": sum(b.tiempo_ejecucion_minutos for b in ot.bitacoras.all()),
+    }
+    return get_template(PLANTILLA_INFORME).render(context)
+
+
+def huella_informe(ot: OrdenTrabajo) -> str:
+    """
+    Hash del contenido del informe: fecha de actualización de la OT, datos que
+    muestra (cliente, vehículo, mecánico, control de calidad), ítems, totales,
+    bitácoras y la versión de la plantilla. Si no cambia, el PDF cacheado sirve.
+
+    Args:
+        ot: OrdenTrabajo, idealmente cargada con para_informe()
+
+    Returns:
+        Hash hexadecimal de 32 caracteres
+    """
+    cliente = ot.cliente
+    vehiculo = ot.vehiculo
+    control = ot.control_calidad if hasattr(ot, "control_calidad") else None
+
+    contenido = [
+        ot.actualizado_en,
+        [cliente.nombre, cliente.rut, cliente.telefono],
+        [vehiculo.patente, vehiculo.marca.nombre, vehiculo.modelo.nombre, vehiculo.kilometraje],
+        ot.mecanico.nombre if ot.mecanico else None,
+        [ot.subtotal_servicios, ot.subtotal_repuestos],
+        [control.resultado, control.fecha, control.responsable] if control else None,
+        sorted((i.id, i.servicio.nombre, i.precio) for i in ot.servicios.all()),
+        sorted((i.id, i.repuesto.nombre, i.cantidad, i.precio_unitario) for i in ot.repuestos.all()),
+        sorted(
+            (b.id, b.fecha, b.estado_avance, b.descripcion, b.tiempo_ejecucion_minutos)
+            for b in ot.bitacoras.all()
+        ),
+        get_template(PLANTILLA_INFORME).template.source,
+    ]
+    crudo = json.dumps(contenido, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return hashlib.sha256(crudo.encode()).hexdigest()[:32]
+
+
+def ots_para_lote(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    estado_id: Optional[int] = None,
+):
+    """
+    OTs de una exportación masiva, con todas sus relaciones precargadas.
+
+    Args:
+        desde: Fecha de entrega real mínima (inclusive)
+        hasta: Fecha de entrega real máxima (inclusive)
+        estado_id: Estado de las OTs
+
+    Returns:
+        QuerySet ordenado por id
+    """
+    ots = OrdenTrabajo.objects.para_informe()
+    if desde:
+        ots = ots.filter(fecha_entrega_real__gte=desde)
+    if hasta:
+        ots = ots.filter(fecha_entrega_real__lte=hasta)
+    if estado_id:
+        ots = ots.filter(estado_id=estado_id)
+    return ots.order_by("id")
+
+
+def documentos_lote(ots) -> List[Tuple[int, str, Callable[[], str]]]:
+    """
+    Convierte OTs en documentos para PdfReportQueue.encolar_lote.
+
+    Returns:
+        Lista de (ot_id, huella, función que genera el HTML)
+    """
+    return [(ot.id, huella_informe(ot), partial(html_informe, ot)) for ot in ots]
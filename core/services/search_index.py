@@ -0,0 +1,296 @@
+"""
+Search Index - Búsqueda global sobre clientes, vehículos, OTs, repuestos y
+herramientas.
+
+Usa una tabla virtual FTS5 de SQLite (``core_busqueda``, migración 0013) con un
+documento por registro: un título y un contenido con el resto de los datos
+buscables (incluidos los de tablas relacionadas, como el cliente de un
+vehículo). La consulta usa el índice invertido de FTS5 y ordena por bm25, en
+vez de recorrer varias tablas con ``icontains``.
+
+El rowid de cada documento se deriva del tipo y la pk (``pk * len(TIPOS) +
+posición del tipo``), así actualizar o borrar un documento es un acceso por
+clave y no un recorrido de la tabla virtual.
+
+Las señales mantienen el índice al día; lo que se carga sin señales
+(``bulk_create``, ``update``, el comando seed) se recupera con
+``python manage.py reconstruir_busqueda``.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import (
+    Cliente, Herramienta, MarcaVehiculo, ModeloVehiculo, OrdenTrabajo, Repuesto, Vehiculo
+)
+
+TABLA = "core_busqueda"
+
+
+class TipoBusqueda(NamedTuple):
+    """
+    Documento de un modelo: plantilla del título, campos del contenido, roles
+    que lo ven y, si existe, la vista del registro con los roles que pueden abrirla.
+
+    ``cambios`` son los campos seguidos (SeguimientoCamposMixin) que obligan a
+    reindexar al guardar; vacío significa reindexar en cada guardado.
+    """
+    modelo: type
+    titulo: str
+    contenido: Sequence[str]
+    roles: Tuple[str, ...]
+    url: Optional[str] = None
+    roles_url: Tuple[str, ...] = ()
+    cambios: Tuple[str, ...] = ()
+
+
+TIPOS: Dict[str, TipoBusqueda] = {
+    "cliente": TipoBusqueda(
+        modelo=Cliente,
+        titulo="{nombre}",
+        contenido=("rut", "telefono", "email"),
+        roles=("ENCARGADO_TALLER", "RECEPCIONISTA"),
+    ),
+    "vehiculo": TipoBusqueda(
+        modelo=Vehiculo,
+        titulo="{patente}",
+        contenido=("marca__nombre", "modelo__nombre", "anio", "cliente__nombre"),
+        roles=("ENCARGADO_TALLER", "RECEPCIONISTA"),
+    ),
+    "orden": TipoBusqueda(
+        modelo=OrdenTrabajo,
+        titulo="OT #{id}",
+        contenido=("cliente__nombre", "vehiculo__patente"),
+        roles=("ENCARGADO_TALLER", "RECEPCIONISTA"),
+        url="detalle_ot",
+        roles_url=("ENCARGADO_TALLER",),
+        cambios=("cliente_id", "vehiculo_id"),
+    ),
+    "repuesto": TipoBusqueda(
+        modelo=Repuesto,
+        titulo="{nombre}",
+        contenido=("codigo", "marca", "fabricante", "modelo_compatible", "proveedor__nombre"),
+        roles=("ENCARGADO_TALLER", "ENCARGADO_BODEGA", "MECANICO"),
+        url="editar_repuesto",
+        roles_url=("ENCARGADO_TALLER", "ENCARGADO_BODEGA"),
+        cambios=("codigo", "nombre", "marca", "fabricante", "modelo_compatible", "proveedor_id"),
+    ),
+    "herramienta": TipoBusqueda(
+        modelo=Herramienta,
+        titulo="{nombre}",
+        contenido=("codigo", "marca", "modelo", "ubicacion_fisica"),
+        roles=("ENCARGADO_TALLER", "ENCARGADO_BODEGA", "MECANICO"),
+        url="editar_herramienta",
+        roles_url=("ENCARGADO_BODEGA",),
+    ),
+}
+
+# Documentos que copian datos de otro registro: (tipo dependiente, campo que lo enlaza)
+DEPENDIENTES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "cliente": (("vehiculo", "cliente_id"), ("orden", "cliente_id")),
+    "vehiculo": (("orden", "vehiculo_id"),),
+    "marca": (("vehiculo", "marca_id"),),
+    "modelo": (("vehiculo", "modelo_id"),),
+}
+
+TIPO_POR_MODELO = {definicion.modelo: tipo for tipo, definicion in TIPOS.items()}
+
+# Modelos sin documento propio cuyos datos copian otros documentos
+ORIGEN_POR_MODELO = {MarcaVehiculo: "marca", ModeloVehiculo: "modelo"}
+
+_POSICION = {tipo: posicion for posicion, tipo in enumerate(TIPOS)}
+
+
+class ResultadoBusqueda(NamedTuple):
+    """Un documento encontrado."""
+    tipo: str
+    objeto_id: int
+    titulo: str
+    contenido: str
+    rango: float
+
+
+def rowid_de(tipo: str, pk: int) -> int:
+    """Rowid del documento de un registro en la tabla FTS5."""
+    return pk * len(TIPOS) + _POSICION[tipo]
+
+
+def consulta_fts(texto: str, max_terminos: int = 8) -> str:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5: cada palabra
+    entre comillas (sin operadores de FTS5) y como prefijo, todas obligatorias.
+
+    Returns:
+        Consulta MATCH ('' si el texto no tiene palabras)
+    """
+    terminos = re.findall(r"\w+", texto.lower())[:max_terminos]
+    return " ".join(f'"{termino}"*' for termino in terminos)
+
+
+class SearchIndex:
+    """
+    Índice de búsqueda global (FTS5).
+    """
+
+    def __init__(self, lote: Optional[int] = None):
+        """
+        Args:
+            lote: Documentos por inserción al reconstruir (default: BUSQUEDA_LOTE)
+        """
+        self.lote = lote or getattr(settings, "BUSQUEDA_LOTE", 2000)
+
+    def documentos(self, tipo: str, **filtro) -> Iterable[Tuple[int, str, int, str, str]]:
+        """
+        Documentos de un tipo, en una consulta con sus relaciones.
+
+        Args:
+            tipo: Clave en TIPOS
+            **filtro: Filtro opcional sobre el modelo (p. ej. pk__in=[...])
+
+        Returns:
+            Iterador de (rowid, tipo, objeto_id, titulo, contenido)
+        """
+        definicion = TIPOS[tipo]
+        campos_titulo = re.findall(r"{(\w+)}", definicion.titulo)
+        campos = list(dict.fromkeys(["id", *campos_titulo, *definicion.contenido]))
+
+        filas = definicion.modelo.objects.filter(**filtro).values(*campos).order_by().iterator()
+        for fila in filas:
+            contenido = " · ".join(
+                str(fila[campo]) for campo in definicion.contenido if fila[campo] not in (None, "")
+            )
+            yield (
+                rowid_de(tipo, fila["id"]), tipo, fila["id"],
+                definicion.titulo.format(**fila), contenido,
+            )
+
+    def _insertar(self, cursor, documentos: Iterable) -> int:
+        total = 0
+        bloque = []
+        for documento in documentos:
+            bloque.append(documento)
+            if len(bloque) >= self.lote:
+                cursor.executemany(self._sql_insertar(), bloque)
+                total += len(bloque)
+                bloque = []
+        if bloque:
+            cursor.executemany(self._sql_insertar(), bloque)
+            total += len(bloque)
+        return total
+
+    @staticmethod
+    def _sql_insertar() -> str:
+        return f"INSERT INTO {TABLA} (rowid, tipo, objeto_id, titulo, contenido) VALUES (%s, %s, %s, %s, %s)"
+
+    def indexar(self, tipo: str, **filtro) -> int:
+        """
+        Reemplaza los documentos de los registros de un tipo que cumplen el filtro.
+
+        Returns:
+            Cantidad de documentos escritos
+        """
+        documentos = list(self.documentos(tipo, **filtro))
+        if not documentos:
+            return 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._borrar(cursor, [documento[0] for documento in documentos])
+            return self._insertar(cursor, documentos)
+
+    @staticmethod
+    def requiere_reindexar(instancia) -> bool:
+        """
+        True si al guardar la instancia cambió algún dato de su documento (los
+        movimientos de stock o cambios de estado no tocan el índice).
+        """
+        cambios = TIPOS[TIPO_POR_MODELO[type(instancia)]].cambios
+        return not cambios or any(instancia.campo_cambio(campo) for campo in cambios)
+
+    def indexar_instancia(self, instancia, dependientes: bool = True) -> None:
+        """
+        Reindexa un registro y los documentos que copian sus datos (p. ej. los
+        vehículos y OTs de un cliente).
+
+        Args:
+            instancia: Registro de un modelo de TIPOS
+            dependientes: False para un registro recién creado, que todavía no
+                tiene documentos que dependan de él
+        """
+        tipo = TIPO_POR_MODELO[type(instancia)]
+        self.indexar(tipo, pk=instancia.pk)
+        if dependientes:
+            self.indexar_dependientes(tipo, instancia.pk)
+
+    def indexar_dependientes(self, origen: str, pk: int) -> None:
+        """
+        Reindexa los documentos que copian datos de un registro (clave de
+        DEPENDIENTES: un tipo o un origen como la marca de los vehículos).
+        """
+        for dependiente, campo in DEPENDIENTES.get(origen, ()):
+            self.indexar(dependiente, **{campo: pk})
+
+    def eliminar(self, tipo: str, pks: Sequence[int]) -> None:
+        """Quita del índice los documentos de los registros indicados."""
+        with connection.cursor() as cursor:
+            self._borrar(cursor, [rowid_de(tipo, pk) for pk in pks])
+
+    @staticmethod
+    def _borrar(cursor, rowids: Sequence[int]) -> None:
+        cursor.executemany(f"DELETE FROM {TABLA} WHERE rowid = %s", [(rowid,) for rowid in rowids])
+
+    def reconstruir(self) -> Dict[str, int]:
+        """
+        Vacía el índice y lo vuelve a llenar desde las tablas.
+
+        Returns:
+            Diccionario {tipo: documentos indexados}
+        """
+        totales = {}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA}")
+            for tipo in TIPOS:
+                totales[tipo] = self._insertar(cursor, self.documentos(tipo))
+            # Fusiona los segmentos de FTS5 para que las consultas lean menos páginas
+            cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+        return totales
+
+    def buscar(
+        self,
+        texto: str,
+        tipos: Optional[Sequence[str]] = None,
+        limite: Optional[int] = None
+    ) -> List[ResultadoBusqueda]:
+        """
+        Busca documentos que contengan todas las palabras (o palabras que
+        empiecen con ellas), ordenados por relevancia (bm25, con más peso en el
+        título).
+
+        Args:
+            texto: Texto ingresado por el usuario
+            tipos: Tipos a incluir (default: todos)
+            limite: Máximo de resultados (default: BUSQUEDA_LIMITE)
+
+        Returns:
+            Lista de ResultadoBusqueda, la más relevante primero
+        """
+        consulta = consulta_fts(texto)
+        tipos = [tipo for tipo in (tipos if tipos is not None else TIPOS) if tipo in TIPOS]
+        if not consulta or not tipos:
+            return []
+
+        limite = limite or getattr(settings, "BUSQUEDA_LIMITE", 20)
+        marcadores = ", ".join(["%s"] * len(tipos))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT tipo, objeto_id, titulo, contenido, bm25({TABLA}, 0, 0, 10.0, 1.0) AS rango "
+                f"FROM {TABLA} WHERE {TABLA} MATCH %s AND tipo IN ({marcadores}) "
+                f"ORDER BY rango LIMIT %s",
+                [consulta, *tipos, limite],
+            )
+            return [ResultadoBusqueda(*fila) for fila in cursor.fetchall()]
+
+    @staticmethod
+    def tipos_para_rol(rol: str) -> List[str]:
+        """Tipos de documento que puede ver un rol."""
+        return [tipo for tipo, definicion in TIPOS.items() if rol in definicion.roles]
@@ -0,0 +1,138 @@
+"""
+State Catalog - Registro en memoria del catálogo de estados de OT.
+
+El catálogo EstadoOT es pequeño y casi nunca cambia, así que se carga una vez
+por proceso y se entregan los ids por nombre. Las vistas filtran por
+``estado_id`` sin el JOIN a EstadoOT y las transiciones no consultan el
+catálogo. Se invalida con las señales post_save/post_delete de EstadoOT en el
+proceso que hace el cambio. Los demás procesos (u otros cambios sin señales,
+como ``bulk_create``) se detectan por un fallo de búsqueda: un id desconocido
+recarga el catálogo de inmediato (una OT no puede apuntar a un estado que no
+existe) y un nombre desconocido lo recarga si la carga tiene más de
+ESTADOS_RECARGA_SEGUNDOS, para que buscar un estado que no existe no consulte
+en cada request.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from ..models import EstadoOT
+
+
+class StateCatalog:
+    """
+    Catálogo de estados de OT cacheado en el proceso.
+    """
+
+    def __init__(self):
+        """Inicializa el catálogo vacío (se carga en el primer uso)."""
+        # Tupla (ids_por_nombre, nombres_por_id); se reemplaza completa
+        self._datos: Optional[Tuple[Dict[str, int], Dict[int, str]]] = None
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+
+    def _catalogo(self) -> Tuple[Dict[str, int], Dict[int, str]]:
+        """Devuelve el catálogo, cargándolo con una consulta si hace falta."""
+        datos = self._datos
+        if datos is None:
+            with self._lock:
+                if self._datos is None:
+                    ids_por_nombre = dict(EstadoOT.objects.values_list("nombre", "id"))
+                    nombres_por_id = {id_: nombre for nombre, id_ in ids_por_nombre.items()}
+                    self._datos = (ids_por_nombre, nombres_por_id)
+                    self._cargado_en = time.monotonic()
+                datos = self._datos
+        return datos
+
+    def _recargar(self, minimo_segundos: float = 0) -> Tuple[Dict[str, int], Dict[int, str]]:
+        """
+        Vuelve a cargar el catálogo tras un fallo de búsqueda, salvo que se haya
+        cargado hace menos de ``minimo_segundos``.
+        """
+        if time.monotonic() - self._cargado_en >= minimo_segundos:
+            self.invalidar()
+        return self._catalogo()
+
+    def _ids_por_nombre(self, nombres) -> Dict[str, int]:
+        """Ids por nombre, recargando si falta alguno de los nombres."""
+        catalogo = self._catalogo()[0]
+        if any(nombre not in catalogo for nombre in nombres):
+            catalogo = self._recargar(getattr(settings, "ESTADOS_RECARGA_SEGUNDOS", 30))[0]
+        return catalogo
+
+    def id_de(self, nombre: str) -> int:
+        """
+        Obtiene el id de un estado para asignarlo en una transición.
+        Si el estado no existe todavía, lo crea (como el get_or_create anterior).
+
+        Args:
+            nombre: Nombre del estado (ej: 'PENDIENTE')
+
+        Returns:
+            Id del EstadoOT
+        """
+        estado_id = self._catalogo()[0].get(nombre)
+        if estado_id is None:
+            # Puede haberlo creado otro proceso; si no, se crea aquí y la
+            # señal post_save invalida el catálogo
+            estado_id = self._recargar()[0].get(nombre)
+        if estado_id is None:
+            estado_id = EstadoOT.objects.get_or_create(nombre=nombre)[0].id
+        return estado_id
+
+    def ids_de(self, *nombres: str) -> List[int]:
+        """
+        Obtiene los ids de varios estados para usarlos en filtros.
+        Los nombres que no existen se omiten (no coincide ninguna OT).
+
+        Args:
+            nombres: Nombres de estado
+
+        Returns:
+            Lista de ids
+        """
+        catalogo = self._ids_por_nombre(nombres)
+        return [catalogo[nombre] for nombre in nombres if nombre in catalogo]
+
+    def nombre_de(self, estado_id: Optional[int]) -> Optional[str]:
+        """
+        Obtiene el nombre de un estado a partir de su id.
+
+        Args:
+            estado_id: Id del EstadoOT
+
+        Returns:
+            Nombre del estado o None
+        """
+        if estado_id is None:
+            return None
+        nombre = self._catalogo()[1].get(estado_id)
+        if nombre is None:
+            nombre = self._recargar()[1].get(estado_id)
+        return nombre
+
+    def invalidar(self) -> None:
+        """Descarta el catálogo; se recarga en el próximo uso."""
+        with self._lock:
+            self._datos = None
+
+
+# Instancia global del catálogo (Singleton pattern)
+_state_catalog = None
+
+
+def get_state_catalog() -> StateCatalog:
+    """
+    Obtiene la instancia global del catálogo de estados (Singleton).
+
+    Returns:
+        Instancia de StateCatalog
+    """
+    global _state_catalog
+
+    if _state_catalog is None:
+        _state_catalog = StateCatalog()
+
+    return _state_catalog
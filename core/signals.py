@@ -4,32 +4,25 @@ Señales de Django para notificaciones automáticas usando el patrón Observador
 Estas señales detectan cambios en los modelos y notifican automáticamente
 a los observadores registrados.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from datetime import date
 
-from .models import OrdenTrabajo, BitacoraTrabajo, ControlCalidad
+from .models import (
+    OrdenTrabajo, BitacoraTrabajo, ControlCalidad, EstadoOT, Repuesto, Notificacion,
+    ItemServicio, ItemRepuesto, Cliente, Vehiculo, Herramienta, MarcaVehiculo, ModeloVehiculo
+)
 from .patterns.observer import get_orden_trabajo_subject
+from .services.state_catalog import get_state_catalog
+from .services.dashboard_cache import DashboardCache
+from .services.search_index import SearchIndex, ORIGEN_POR_MODELO, TIPO_POR_MODELO
 
 
-# Variable para rastrear el estado anterior
-_estado_anterior_cache = {}
-
-
-@receiver(pre_save, sender=OrdenTrabajo)
-def guardar_estado_anterior(sender, instance, **kwargs):
-    """
-    Guarda el estado anterior de la OT antes de guardar.
-    Esto permite detectar cambios de estado.
-    """
-    if instance.pk:
-        try:
-            ot_anterior = OrdenTrabajo.objects.get(pk=instance.pk)
-            _estado_anterior_cache[instance.pk] = ot_anterior.estado.nombre if ot_anterior.estado else None
-        except OrdenTrabajo.DoesNotExist:
-            _estado_anterior_cache[instance.pk] = None
-    else:
-        _estado_anterior_cache[instance.pk] = None
+@receiver(post_save, sender=EstadoOT)
+@receiver(post_delete, sender=EstadoOT)
+def invalidar_catalogo_estados(sender, **kwargs):
+    """Invalida el catálogo en memoria de estados cuando cambia EstadoOT."""
+    get_state_catalog().invalidar()
 
 
 @receiver(post_save, sender=OrdenTrabajo)
@@ -37,30 +30,32 @@ def notificar_cambio_estado_ot(sender, instance, created, **kwargs):
     """
     Notifica automáticamente cuando cambia el estado de una OT.
     Usa el patrón Observador.
+    
+    El estado anterior viene del seguimiento de campos de la instancia
+    (snapshot de ``estado_id`` al cargarla), sin re-consultar la OT.
     """
-    estado_anterior = _estado_anterior_cache.get(instance.pk)
-    estado_nuevo = instance.estado.nombre if instance.estado else None
+    if not instance.campo_cambio("estado_id") or not instance.estado_id:
+        return
     
-    # Solo notificar si el estado cambió
-    if estado_anterior != estado_nuevo and estado_nuevo:
-        subject = get_orden_trabajo_subject()
-        
-        # Obtener emisor (si está disponible en el contexto)
-        # Nota: En señales, no tenemos acceso directo al request.user
-        # Por eso usamos None como emisor, los observers pueden manejarlo
-        event = {
-            'orden': instance,
-            'tipo_evento': 'ESTADO_CAMBIADO',
-            'estado_anterior': estado_anterior,
-            'estado_nuevo': estado_nuevo,
-            'emisor': None  # Se puede mejorar pasando el usuario en el contexto
-        }
-        
-        subject.notify(event)
-        
-        # Limpiar cache
-        if instance.pk in _estado_anterior_cache:
-            del _estado_anterior_cache[instance.pk]
+    # Nombres desde el catálogo en memoria (sin consultar EstadoOT)
+    catalogo = get_state_catalog()
+    estado_anterior = catalogo.nombre_de(instance.valor_original("estado_id"))
+    estado_nuevo = catalogo.nombre_de(instance.estado_id)
+    
+    subject = get_orden_trabajo_subject()
+    
+    # Obtener emisor (si está disponible en el contexto)
+    # Nota: En señales, no tenemos acceso directo al request.user
+    # Por eso usamos None como emisor, los observers pueden manejarlo
+    event = {
+        'orden': instance,
+        'tipo_evento': 'ESTADO_CAMBIADO',
+        'estado_anterior': estado_anterior,
+        'estado_nuevo': estado_nuevo,
+        'emisor': None  # Se puede mejorar pasando el usuario en el contexto
+    }
+    
+    subject.notify(event)
 
 
 @receiver(post_save, sender=BitacoraTrabajo)
@@ -72,18 +67,11 @@ def notificar_bitacora_registrada(sender, instance, created, **kwargs):
     if created:
         subject = get_orden_trabajo_subject()
         
-        # Obtener perfil del mecánico si está disponible
+        # Obtener perfil del mecánico si está disponible (vínculo directo)
         emisor = None
-        if instance.mecanico:
-            # Intentar obtener el perfil del mecánico
-            nombre_parts = instance.mecanico.nombre.split(maxsplit=1)
-            if len(nombre_parts) == 2:
-                from .models import PerfilUsuario
-                emisor = PerfilUsuario.objects.filter(
-                    rol="MECANICO",
-                    usuario__first_name=nombre_parts[0],
-                    usuario__last_name=nombre_parts[1]
-                ).first()
+        if instance.mecanico_id:
+            from .models import PerfilUsuario
+            emisor = PerfilUsuario.objects.filter(mecanico__id=instance.mecanico_id).first()
         
         event = {
             'orden': instance.orden,
@@ -127,3 +115,108 @@ def notificar_control_calidad(sender, instance, created, **kwargs):
             }
             subject.notify(event_finalizada)
 
+
+
+# ============================
+# INVALIDACIÓN DEL CACHÉ DEL DASHBOARD
+# ============================
+
+@receiver(post_save, sender=OrdenTrabajo)
+@receiver(post_delete, sender=OrdenTrabajo)
+def invalidar_cache_dashboard_ot(sender, instance, created=False, **kwargs):
+    """
+    Invalida los contadores del encargado y de los mecánicos afectados,
+    solo si cambió algún campo que los contadores usan.
+    """
+    # Una OT nueva o borrada afecta a todos sus contadores
+    todo = created or kwargs.get('signal') is post_delete
+    claves = set()
+    
+    if todo or instance.campo_cambio("estado_id") or instance.campo_cambio("fecha_estimada_entrega"):
+        claves.add(DashboardCache.clave_encargado())
+    
+    if todo or instance.campo_cambio("estado_id") or instance.campo_cambio("mecanico_id"):
+        for mecanico_id in {instance.mecanico_id, instance.valor_original("mecanico_id")}:
+            if mecanico_id:
+                claves.add(DashboardCache.clave_mecanico(mecanico_id))
+    
+    DashboardCache().invalidar(*claves)
+
+
+@receiver(post_save, sender=Repuesto)
+@receiver(post_delete, sender=Repuesto)
+def invalidar_cache_dashboard_repuesto(sender, instance, created=False, **kwargs):
+    """Invalida el contador de stock bajo cuando cambia el stock o el punto de reorden."""
+    if (
+        created
+        or kwargs.get('signal') is post_delete
+        or instance.campo_cambio("stock")
+        or instance.campo_cambio("punto_reorden")
+    ):
+        DashboardCache().invalidar(DashboardCache.clave_bodega())
+
+
+@receiver(post_save, sender=Notificacion)
+@receiver(post_delete, sender=Notificacion)
+def invalidar_cache_no_leidas(sender, instance, **kwargs):
+    """Invalida el contador de no leídas del receptor."""
+    DashboardCache().invalidar_no_leidas([instance.receptor_id])
+
+
+@receiver(post_save, sender=ItemServicio)
+@receiver(post_delete, sender=ItemServicio)
+@receiver(post_save, sender=ItemRepuesto)
+@receiver(post_delete, sender=ItemRepuesto)
+def actualizar_totales_ot(sender, instance, **kwargs):
+    """
+    Recalcula los subtotales guardados de la OT del ítem (y de la OT anterior
+    si el ítem se movió) con un UPDATE sobre sus ítems.
+    """
+    ordenes = {instance.orden_id}
+    if kwargs.get('signal') is post_save and not kwargs.get('created'):
+        ordenes.add(instance.valor_original("orden_id"))
+    ordenes.discard(None)
+    
+    OrdenTrabajo.objects.filter(pk__in=ordenes).recalcular_totales()
+
+
+# ============================
+# ÍNDICE DE BÚSQUEDA GLOBAL
+# ============================
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_save, sender=OrdenTrabajo)
+@receiver(post_save, sender=Repuesto)
+@receiver(post_save, sender=Herramienta)
+def indexar_busqueda(sender, instance, created, **kwargs):
+    """
+    Actualiza el documento del registro (y los que copian sus datos) en el
+    índice FTS5, solo si es nuevo o cambió algún dato del documento.
+    """
+    indice = SearchIndex()
+    if created:
+        indice.indexar_instancia(instance, dependientes=False)
+    elif indice.requiere_reindexar(instance):
+        indice.indexar_instancia(instance)
+
+
+@receiver(post_save, sender=MarcaVehiculo)
+@receiver(post_save, sender=ModeloVehiculo)
+def indexar_busqueda_dependientes(sender, instance, created, **kwargs):
+    """
+    Al renombrar una marca o un modelo reindexa los vehículos que copian su
+    nombre (un registro nuevo todavía no tiene vehículos).
+    """
+    if not created:
+        SearchIndex().indexar_dependientes(ORIGEN_POR_MODELO[sender], instance.pk)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Vehiculo)
+@receiver(post_delete, sender=OrdenTrabajo)
+@receiver(post_delete, sender=Repuesto)
+@receiver(post_delete, sender=Herramienta)
+def desindexar_busqueda(sender, instance, **kwargs):
+    """Quita el documento del registro borrado del índice FTS5."""
+    SearchIndex().eliminar(TIPO_POR_MODELO[sender], [instance.pk])
@@ -1,9 +1,13 @@
 """
 Suite completa de tests para el sistema de taller mecánico.
 """
-from django.test import TestCase, Client
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import date, timedelta
 
@@ -11,7 +15,7 @@ from .models import (
     PerfilUsuario, RolUsuario, Cliente, Vehiculo, MarcaVehiculo, ModeloVehiculo,
     OrdenTrabajo, EstadoOT, BitacoraTrabajo, FotoBitacora,
     Repuesto, Herramienta, Mecanico, EspecialidadMecanico, ZonaTrabajo,
-    ControlCalidad, Notificacion, Proveedor
+    ControlCalidad, Notificacion, TipoNotificacion, Proveedor, EventoOutbox, EstadoEventoOutbox
 )
 
 
@@ -20,6 +24,9 @@ class BaseTestCase(TestCase):
     
     def setUp(self):
         """Configuración inicial para todos los tests."""
+        # Los contadores cacheados no deben pasar de un test a otro
+        cache.clear()
+        
         # Crear usuarios y perfiles
         self.user_recepcionista = User.objects.create_user(
             username="recepcionista",
@@ -82,6 +89,7 @@ class BaseTestCase(TestCase):
         
         self.especialidad = EspecialidadMecanico.objects.create(nombre="Motor")
         self.mecanico_obj = Mecanico.objects.create(
+            perfil=self.perfil_mecanico,
             nombre="mecanico",
             especialidad=self.especialidad
         )
@@ -465,6 +473,92 @@ class NotificacionesTests(BaseTestCase):
         
         notif.refresh_from_db()
         self.assertTrue(notif.leida)
+    
+    def _crear_pendientes(self, receptor, tipos):
+        return [
+            Notificacion.objects.create(tipo=tipo, mensaje=f"Aviso {i}", receptor=receptor)
+            for i, tipo in enumerate(tipos)
+        ]
+    
+    def _no_leidas_cacheadas(self, perfil):
+        from .services.dashboard_cache import DashboardCache
+        return cache.get(DashboardCache.clave_no_leidas(perfil.pk))
+    
+    def _cachear_no_leidas(self, perfil):
+        from .services.dashboard_cache import DashboardCache
+        DashboardCache().actualizar(
+            DashboardCache.clave_no_leidas(perfil.pk),
+            Notificacion.objects.filter(receptor=perfil, leida=False).count()
+        )
+    
+    def test_marcar_todas_un_update(self):
+        """Marcar todas usa un solo UPDATE, deja el contador en 0 y no toca otros receptores."""
+        from .services.notification_service import NotificationService
+        self._crear_pendientes(self.perfil_recepcionista, ["MENSAJE_GENERAL"] * 3)
+        ajena, = self._crear_pendientes(self.perfil_encargado, ["MENSAJE_GENERAL"])
+        self._cachear_no_leidas(self.perfil_recepcionista)
+        
+        with self.assertNumQueries(1):
+            marcadas = NotificationService().marcar_leidas(self.perfil_recepcionista)
+        
+        self.assertEqual(marcadas, 3)
+        self.assertEqual(self._no_leidas_cacheadas(self.perfil_recepcionista), 0)
+        ajena.refresh_from_db()
+        self.assertFalse(ajena.leida)
+    
+    def test_marcar_por_tipo_e_ids_descuenta_contador(self):
+        """Marcar un subconjunto resta lo marcado del contador cacheado."""
+        from .services.notification_service import NotificationService
+        notifs = self._crear_pendientes(
+            self.perfil_recepcionista, ["MENSAJE_GENERAL", "ATRASO_TRABAJO", "ATRASO_TRABAJO"]
+        )
+        self._cachear_no_leidas(self.perfil_recepcionista)
+        servicio = NotificationService()
+        
+        self.assertEqual(servicio.marcar_leidas(self.perfil_recepcionista, ids=[notifs[0].id]), 1)
+        self.assertEqual(self._no_leidas_cacheadas(self.perfil_recepcionista), 2)
+        
+        self.assertEqual(servicio.marcar_leidas(self.perfil_recepcionista, tipo="ATRASO_TRABAJO"), 2)
+        self.assertEqual(self._no_leidas_cacheadas(self.perfil_recepcionista), 0)
+    
+    def test_endpoint_marcar_todas_ignora_tipo(self):
+        """'Marcar todas' marca todo aunque el POST traiga también un tipo."""
+        self._crear_pendientes(
+            self.perfil_recepcionista, ["MENSAJE_GENERAL", "ATRASO_TRABAJO", "ATRASO_TRABAJO"]
+        )
+        
+        self.client.login(username='recepcionista', password='test123')
+        response = self.client.post(
+            reverse('notificaciones_leidas') + "?formato=json",
+            {"todas": "1", "tipo": "MENSAJE_GENERAL"}
+        )
+        
+        self.assertEqual(response.json(), {"marcadas": 3})
+        self.assertFalse(
+            Notificacion.objects.filter(receptor=self.perfil_recepcionista, leida=False).exists()
+        )
+    
+    def test_endpoint_marcar_por_ot(self):
+        """El endpoint masivo marca solo las notificaciones de la OT indicada."""
+        orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Revisión", descripcion_problema="Ruido", fecha_ingreso=date.today()
+        )
+        de_ot = Notificacion.objects.create(
+            tipo="MENSAJE_GENERAL", mensaje="De la OT", receptor=self.perfil_recepcionista, orden=orden
+        )
+        otra, = self._crear_pendientes(self.perfil_recepcionista, ["MENSAJE_GENERAL"])
+        
+        self.client.login(username='recepcionista', password='test123')
+        response = self.client.post(
+            reverse('notificaciones_leidas') + "?formato=json", {"orden": orden.id}
+        )
+        
+        self.assertEqual(response.json(), {"marcadas": 1})
+        de_ot.refresh_from_db()
+        otra.refresh_from_db()
+        self.assertTrue(de_ot.leida)
+        self.assertFalse(otra.leida)
 
 
 class ValidacionesTests(BaseTestCase):
@@ -554,3 +648,1749 @@ class HerramientasTests(BaseTestCase):
         
         self.herramienta.refresh_from_db()
         self.assertEqual(self.herramienta.estado, "OPERATIVA")
+        # Encargado de bodega y encargado de taller
+        self.assertEqual(
+            set(Notificacion.objects.values_list("receptor_id", flat=True)),
+            {self.perfil_bodega.id, self.perfil_encargado.id}
+        )
+
+
+@override_settings(NOTIFICACIONES_ASINCRONAS=False)
+class ObserverLoteTests(BaseTestCase):
+    """Tests para el despacho en lote del patrón Observador."""
+    
+    def setUp(self):
+        super().setUp()
+        from .patterns.observer import (
+            OrdenTrabajoSubject, MecanicoObserver, EncargadoObserver, RecepcionistaObserver
+        )
+        self.ot = OrdenTrabajo.objects.create(
+            cliente=self.cliente,
+            vehiculo=self.vehiculo,
+            estado=self.estado_en_progreso,
+            mecanico=self.mecanico_obj,
+            motivo_ingreso="Reparación",
+            descripcion_problema="Problema en motor",
+            fecha_ingreso=date.today()
+        )
+        Notificacion.objects.all().delete()
+        
+        self.subject = OrdenTrabajoSubject()
+        self.subject.attach(MecanicoObserver())
+        self.subject.attach(EncargadoObserver())
+        self.subject.attach(RecepcionistaObserver())
+    
+    def test_despacho_en_lote_acotado_en_consultas(self):
+        """Un evento con varios receptores usa una consulta de perfiles y un insert."""
+        ot = OrdenTrabajo.objects.select_related("mecanico").get(pk=self.ot.pk)
+        event = {'orden': ot, 'tipo_evento': 'ESTADO_CAMBIADO', 'estado_nuevo': 'FINALIZADO'}
+        
+        with self.assertNumQueries(2):
+            self.subject.notify(event)
+        
+        self.assertTrue(Notificacion.objects.filter(receptor=self.perfil_mecanico).exists())
+        metricas = self.subject.metricas()
+        self.assertEqual(metricas['ESTADO_CAMBIADO']['eventos'], 1)
+        self.assertEqual(metricas['ESTADO_CAMBIADO']['ultimas_consultas'], 2)
+    
+    def test_lote_equivale_a_despacho_individual(self):
+        """El despacho en lote crea las mismas notificaciones que el individual."""
+        from .patterns.observer import OrdenTrabajoSubject
+        eventos = [
+            {'orden': self.ot, 'tipo_evento': 'ASIGNACION'},
+            {'orden': self.ot, 'tipo_evento': 'BITACORA_REGISTRADA'},
+            {'orden': self.ot, 'tipo_evento': 'OT_FINALIZADA'},
+        ]
+        
+        for event in eventos:
+            self.subject.notify(event)
+        en_lote = sorted(Notificacion.objects.values_list("receptor_id", "mensaje"))
+        Notificacion.objects.all().delete()
+        
+        individual = OrdenTrabajoSubject(en_lote=False)
+        for observer in self.subject._observers:
+            individual.attach(observer)
+        for event in eventos:
+            individual.notify(event)
+        
+        self.assertEqual(en_lote, sorted(Notificacion.objects.values_list("receptor_id", "mensaje")))
+        self.assertEqual(len(en_lote), 3)
+    
+    def test_evento_sin_destinatarios_no_consulta(self):
+        """Un evento que no interesa a ningún observador no toca la base de datos."""
+        with self.assertNumQueries(0):
+            self.subject.notify({'orden': self.ot, 'tipo_evento': 'OTRO'})
+    
+    def test_todos_los_perfiles_del_rol_reciben(self):
+        """Con varios encargados, cada uno recibe la notificación en el mismo insert."""
+        otro = User.objects.create_user(username="encargado2", password="test123")
+        perfil_otro = PerfilUsuario.objects.create(usuario=otro, rol=RolUsuario.ENCARGADO_TALLER)
+        
+        with self.assertNumQueries(2):
+            self.subject.notify({'orden': self.ot, 'tipo_evento': 'BITACORA_REGISTRADA'})
+        
+        self.assertEqual(
+            set(Notificacion.objects.values_list("receptor_id", flat=True)),
+            {self.perfil_encargado.id, perfil_otro.id}
+        )
+    
+    def test_notificar_roles_una_consulta_y_un_insert(self):
+        """notificar_roles resuelve todos los roles juntos y escribe con un bulk_create."""
+        from .services.notification_service import NotificationService
+        for i in range(3):
+            usuario = User.objects.create_user(username=f"bodega{i}", password="test123")
+            PerfilUsuario.objects.create(usuario=usuario, rol=RolUsuario.ENCARGADO_BODEGA)
+        
+        with self.assertNumQueries(2):
+            creadas = NotificationService().notificar_roles(
+                ["ENCARGADO_BODEGA", "ENCARGADO_TALLER"], "Herramienta devuelta",
+                emisor=self.perfil_mecanico
+            )
+        
+        self.assertEqual(len(creadas), 5)
+        self.assertFalse(Notificacion.objects.filter(receptor=self.perfil_recepcionista).exists())
+
+
+@override_settings(NOTIFICACIONES_ASINCRONAS=True)
+class OutboxTests(BaseTestCase):
+    """Tests para el outbox de notificaciones y su worker."""
+    
+    def setUp(self):
+        super().setUp()
+        self.ot = OrdenTrabajo.objects.create(
+            cliente=self.cliente,
+            vehiculo=self.vehiculo,
+            estado=self.estado_en_progreso,
+            mecanico=self.mecanico_obj,
+            motivo_ingreso="Reparación",
+            descripcion_problema="Problema en motor",
+            fecha_ingreso=date.today()
+        )
+    
+    def test_bitacora_encola_eventos_sin_notificar_en_request(self):
+        """Registrar bitácora deja eventos en el outbox y no escribe notificaciones."""
+        Notificacion.objects.all().delete()
+        client = Client()
+        client.login(username='mecanico', password='test123')
+        
+        response = client.post(reverse('registrar_bitacora', args=[self.ot.id]), {
+            'descripcion': 'Cambio de aceite realizado',
+            'tiempo_ejecucion_minutos': 30,
+            'estado_avance': 'FINALIZADO'
+        })
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(EventoOutbox.objects.filter(tipo_evento='BITACORA_REGISTRADA').exists())
+        self.assertFalse(Notificacion.objects.exists())
+    
+    def test_worker_despacha_eventos(self):
+        """El worker procesa los eventos pendientes y crea las notificaciones."""
+        from django.core.management import call_command
+        from io import StringIO
+        from .services.notification_service import NotificationService
+        
+        NotificationService().notificar_bitacora_registrada(
+            orden=self.ot, emisor=self.perfil_mecanico
+        )
+        call_command('procesar_outbox', stdout=StringIO())
+        
+        evento = EventoOutbox.objects.get(tipo_evento='BITACORA_REGISTRADA')
+        self.assertEqual(evento.estado, EstadoEventoOutbox.PROCESADO)
+        self.assertTrue(Notificacion.objects.filter(
+            receptor=self.perfil_encargado,
+            orden=self.ot,
+            emisor=self.perfil_mecanico
+        ).exists())
+    
+    def test_reintento_y_dead_letter(self):
+        """Un evento que falla se reintenta y pasa a dead letter al agotar intentos."""
+        from unittest import mock
+        from .patterns.observer import OrdenTrabajoSubject
+        from .services.notification_outbox import NotificationOutbox
+        
+        EventoOutbox.objects.all().delete()
+        subject = OrdenTrabajoSubject()
+        outbox = NotificationOutbox(subject=subject, max_intentos=2)
+        evento = outbox.encolar({'orden': self.ot, 'tipo_evento': 'ATRASO'})
+        
+        with mock.patch.object(subject, 'despachar', side_effect=RuntimeError("falla")):
+            self.assertEqual(outbox.procesar_lote()['reintentos'], 1)
+            evento.refresh_from_db()
+            self.assertEqual(evento.estado, EstadoEventoOutbox.PENDIENTE)
+            self.assertIn("falla", evento.ultimo_error)
+            
+            EventoOutbox.objects.filter(pk=evento.pk).update(disponible_en=timezone.now())
+            self.assertEqual(outbox.procesar_lote()['fallidos'], 1)
+        
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EstadoEventoOutbox.FALLIDO)
+        self.assertEqual(evento.intentos, 2)
+
+
+@override_settings(NOTIFICACIONES_ASINCRONAS=True)
+class SeguimientoEstadoOTTests(BaseTestCase):
+    """Tests para el seguimiento en memoria del estado de la OT."""
+    
+    def setUp(self):
+        super().setUp()
+        self.ot = OrdenTrabajo.objects.create(
+            cliente=self.cliente,
+            vehiculo=self.vehiculo,
+            estado=self.estado_pendiente,
+            motivo_ingreso="Reparación",
+            descripcion_problema="Problema en motor",
+            fecha_ingreso=date.today()
+        )
+        EventoOutbox.objects.all().delete()
+    
+    def test_guardar_sin_cambio_de_estado_no_consulta_de_mas(self):
+        """Guardar una OT sin cambiar el estado solo ejecuta el UPDATE."""
+        ot = OrdenTrabajo.objects.get(pk=self.ot.pk)
+        ot.motivo_ingreso = "Otro motivo"
+        
+        with self.assertNumQueries(1):
+            ot.save()
+        self.assertFalse(EventoOutbox.objects.exists())
+    
+    def test_cambio_de_estado_notifica_con_estado_anterior(self):
+        """El cambio de estado se detecta comparando con el snapshot de carga."""
+        ot = OrdenTrabajo.objects.get(pk=self.ot.pk)
+        self.assertEqual(ot.valor_original("estado_id"), self.estado_pendiente.id)
+        
+        ot.estado = self.estado_en_progreso
+        ot.save()
+        
+        evento = EventoOutbox.objects.get(tipo_evento='ESTADO_CAMBIADO')
+        self.assertEqual(evento.datos['estado_anterior'], "PENDIENTE")
+        self.assertEqual(evento.datos['estado_nuevo'], "EN_PROGRESO")
+        
+        # Tras guardar, el snapshot se actualiza y un nuevo save no notifica
+        ot.save()
+        self.assertEqual(EventoOutbox.objects.count(), 1)
+    
+    def test_estado_diferido_se_resuelve_al_comparar(self):
+        """Si estado_id se difirió con only(), se consulta solo al comparar."""
+        ot = OrdenTrabajo.objects.only("id", "motivo_ingreso").get(pk=self.ot.pk)
+        ot.estado_id = self.estado_finalizado.id
+        self.assertTrue(ot.campo_cambio("estado_id"))
+
+
+class MecanicoUsuarioTests(BaseTestCase):
+    """Tests para el vínculo directo Mecanico ↔ PerfilUsuario."""
+    
+    def test_obtener_mecanico_una_consulta_y_cache_por_request(self):
+        """Resolver el mecánico cuesta una consulta indexada y luego se reutiliza."""
+        from .helpers import obtener_mecanico_desde_usuario
+        user = User.objects.select_related("perfilusuario").get(pk=self.user_mecanico.pk)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_mecanico_desde_usuario(user), self.mecanico_obj)
+            self.assertEqual(obtener_mecanico_desde_usuario(user), self.mecanico_obj)
+    
+    def test_mecanico_legado_se_vincula_por_nombre(self):
+        """Un mecánico sin vínculo se enlaza una vez por nombre, sin crear filas."""
+        from .helpers import obtener_mecanico_desde_usuario
+        user = User.objects.create_user(
+            username="legado", password="test123", first_name="Rosa", last_name="Vera"
+        )
+        perfil = PerfilUsuario.objects.create(usuario=user, rol=RolUsuario.MECANICO)
+        legado = Mecanico.objects.create(nombre="Rosa Vera", especialidad=self.especialidad)
+        
+        self.assertEqual(obtener_mecanico_desde_usuario(user), legado)
+        legado.refresh_from_db()
+        self.assertEqual(legado.perfil, perfil)
+    
+    def test_sin_coincidencia_no_crea_mecanico(self):
+        """Si no hay mecánico asociado, el helper devuelve None y no crea filas."""
+        from .helpers import obtener_mecanico_desde_usuario
+        user = User.objects.create_user(username="sin_mecanico", password="test123")
+        PerfilUsuario.objects.create(usuario=user, rol=RolUsuario.MECANICO)
+        total = Mecanico.objects.count()
+        
+        self.assertIsNone(obtener_mecanico_desde_usuario(user))
+        self.assertEqual(Mecanico.objects.count(), total)
+
+
+class IndicesConsultasTests(BaseTestCase):
+    """Tests para los índices de las consultas frecuentes."""
+    
+    def test_consultas_frecuentes_usan_indice(self):
+        """Cada consulta crítica se resuelve con su índice esperado y no con un scan."""
+        from django.db import connection
+        from .management.commands.explicar_consultas import consultas_frecuentes, usa_indice
+        
+        if connection.vendor != "sqlite":
+            self.skipTest("El plan se verifica con EXPLAIN QUERY PLAN de SQLite")
+        
+        for nombre, queryset, indice in consultas_frecuentes():
+            with self.subTest(consulta=nombre):
+                plan = queryset.explain()
+                scans = [
+                    linea for linea in plan.splitlines()
+                    if " SCAN " in f" {linea} " and "USING" not in linea
+                ]
+                self.assertEqual(scans, [])
+                self.assertTrue(usa_indice(plan, indice), f"{nombre} no usa {indice}:\n{plan}")
+    
+    def test_indice_de_otra_columna_no_cuenta(self):
+        """El índice simple de la FK no cumple la verificación del índice compuesto."""
+        from .management.commands.explicar_consultas import usa_indice
+        plan = "3 0 0 SEARCH core_notificacion USING INDEX core_notificacion_receptor_id_cdf11fd2 (receptor_id=?)"
+        self.assertFalse(usa_indice(plan, "notif_receptor_leida_idx"))
+        self.assertTrue(usa_indice(plan, "core_notificacion_receptor_id_cdf11fd2"))
+
+
+class CatalogoEstadosTests(BaseTestCase):
+    """Tests para el catálogo en memoria de estados de OT."""
+    
+    def setUp(self):
+        super().setUp()
+        from .services.state_catalog import get_state_catalog
+        self.catalogo = get_state_catalog()
+        self.catalogo.ids_de("PENDIENTE")  # Carga inicial
+    
+    def test_resolver_estados_no_consulta(self):
+        """Con el catálogo cargado, resolver ids y nombres no consulta la base."""
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogo.id_de("FINALIZADO"), self.estado_finalizado.id)
+            self.assertEqual(self.catalogo.nombre_de(self.estado_pendiente.id), "PENDIENTE")
+            self.assertEqual(
+                self.catalogo.ids_de("PENDIENTE", "NO_EXISTE"),
+                [self.estado_pendiente.id]
+            )
+    
+    def test_guardar_o_borrar_estado_invalida(self):
+        """Crear o borrar un EstadoOT invalida el catálogo."""
+        cancelada = EstadoOT.objects.create(nombre="CANCELADA")
+        self.assertEqual(self.catalogo.id_de("CANCELADA"), cancelada.id)
+        
+        cancelada.delete()
+        self.assertEqual(self.catalogo.ids_de("CANCELADA"), [])
+    
+    def test_estado_creado_sin_senal_se_recarga(self):
+        """Un estado creado en otro proceso (sin señal) se resuelve tras una recarga."""
+        EstadoOT.objects.bulk_create([EstadoOT(nombre="EN_ESPERA")])
+        en_espera = EstadoOT.objects.get(nombre="EN_ESPERA")
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(self.catalogo.nombre_de(en_espera.id), "EN_ESPERA")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogo.ids_de("EN_ESPERA"), [en_espera.id])
+    
+    def test_nombre_desconocido_recarga_con_intervalo(self):
+        """Un nombre desconocido recarga el catálogo solo pasado el intervalo."""
+        EstadoOT.objects.bulk_create([EstadoOT(nombre="EN_ESPERA")])
+        en_espera = EstadoOT.objects.get(nombre="EN_ESPERA")
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogo.ids_de("EN_ESPERA"), [])
+        with override_settings(ESTADOS_RECARGA_SEGUNDOS=0), self.assertNumQueries(1):
+            self.assertEqual(self.catalogo.ids_de("EN_ESPERA"), [en_espera.id])
+            self.assertEqual(self.catalogo.id_de("EN_ESPERA"), en_espera.id)
+    
+    def test_control_calidad_sin_consultas_de_catalogo(self):
+        """La transición de estado en control de calidad no consulta EstadoOT."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        ot = OrdenTrabajo.objects.create(
+            cliente=self.cliente,
+            vehiculo=self.vehiculo,
+            estado=self.estado_en_progreso,
+            mecanico=self.mecanico_obj,
+            motivo_ingreso="Reparación",
+            descripcion_problema="Problema en motor",
+            fecha_ingreso=date.today()
+        )
+        client = Client()
+        client.login(username='encargado', password='test123')
+        
+        with CaptureQueriesContext(connection) as consultas:
+            client.post(reverse('control_calidad', args=[ot.id]), {'resultado': 'APROBADO'})
+        
+        ot.refresh_from_db()
+        self.assertEqual(ot.estado_id, self.estado_finalizado.id)
+        self.assertFalse([q for q in consultas if 'FROM "core_estadoot"' in q['sql']])
+
+
+class DashboardConsultasTests(BaseTestCase):
+    """Regresión: número de consultas del dashboard por rol."""
+    
+    # sesión + usuario + perfil + no leídas + agregación (+ mecánico / + consumo precalculado)
+    CONSULTAS_POR_ROL = {
+        'recepcionista': 4,
+        'encargado': 5,
+        'mecanico': 6,
+        'bodega': 6,
+    }
+    
+    def setUp(self):
+        super().setUp()
+        from .services.state_catalog import get_state_catalog
+        get_state_catalog().ids_de("PENDIENTE")  # Catálogo ya cargado en el proceso
+    
+    def test_consultas_por_rol(self):
+        """Cada dashboard usa una sola agregación y cuenta no leídas una vez."""
+        for username, esperado in self.CONSULTAS_POR_ROL.items():
+            with self.subTest(rol=username):
+                client = Client()
+                client.login(username=username, password='test123')
+                with self.assertNumQueries(esperado):
+                    response = client.get(reverse('dashboard'))
+                self.assertEqual(response.status_code, 200)
+    
+    def test_contadores_encargado(self):
+        """La agregación condicional calcula los mismos contadores."""
+        ayer = date.today() - timedelta(days=1)
+        for estado, fecha in [
+            (self.estado_pendiente, None),
+            (self.estado_en_progreso, ayer),
+            (self.estado_en_progreso, date.today() + timedelta(days=3)),
+        ]:
+            OrdenTrabajo.objects.create(
+                cliente=self.cliente, vehiculo=self.vehiculo, estado=estado,
+                motivo_ingreso="Revisión", descripcion_problema="Ruido",
+                fecha_ingreso=ayer, fecha_estimada_entrega=fecha
+            )
+        
+        client = Client()
+        client.login(username='encargado', password='test123')
+        response = client.get(reverse('dashboard'))
+        self.assertEqual(response.context['pendientes'], 1)
+        self.assertEqual(response.context['en_progreso'], 2)
+        self.assertEqual(response.context['atrasadas'], 1)
+
+
+class DashboardCacheTests(BaseTestCase):
+    """Tests del caché de contadores del dashboard."""
+    
+    def setUp(self):
+        super().setUp()
+        from .services.state_catalog import get_state_catalog
+        get_state_catalog().ids_de("PENDIENTE")
+        self.orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Revisión", descripcion_problema="Ruido",
+            fecha_ingreso=date.today()
+        )
+        self.client = Client()
+        self.client.login(username='encargado', password='test123')
+    
+    def test_segunda_visita_usa_cache(self):
+        """Con el caché caliente no se repiten agregación ni conteo de no leídas."""
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(3):  # sesión + usuario + perfil
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_cambio_estado_invalida_contadores(self):
+        """Guardar una OT con otro estado recalcula los contadores del encargado."""
+        self.assertEqual(self.client.get(reverse('dashboard')).context['pendientes'], 1)
+        
+        self.orden.estado = self.estado_en_progreso
+        self.orden.save()
+        
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['pendientes'], 0)
+        self.assertEqual(response.context['en_progreso'], 1)
+    
+    def test_stock_invalida_contador_bodega(self):
+        """Cambiar el stock de un repuesto invalida el contador de bodega."""
+        from .services.dashboard_cache import DashboardCache
+        dashboard_cache = DashboardCache()
+        dashboard_cache.actualizar(DashboardCache.clave_bodega(), 7)
+        
+        self.repuesto.stock = 1
+        self.repuesto.save()
+        
+        self.assertIsNone(cache.get(DashboardCache.clave_bodega()))
+    
+    @override_settings(NOTIFICACIONES_ASINCRONAS=False)
+    def test_notificacion_invalida_no_leidas(self):
+        """Las notificaciones en lote invalidan el contador del receptor."""
+        self.assertEqual(self.client.get(reverse('dashboard')).context['notif_no_leidas'], 0)
+        
+        from .patterns.observer import get_orden_trabajo_subject
+        get_orden_trabajo_subject().notify({
+            'tipo_evento': 'SOLICITUD_CAMBIO',
+            'orden': self.orden,
+            'emisor': self.perfil_mecanico,
+            'mensaje': 'Necesito más tiempo',
+        })
+        
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['notif_no_leidas'], 1)
+    
+    def test_estadisticas(self):
+        """Se cuentan aciertos y fallos."""
+        from .services.dashboard_cache import DashboardCache
+        dashboard_cache = DashboardCache()
+        dashboard_cache.reiniciar_estadisticas()
+        
+        dashboard_cache.obtener("dashboard:prueba", lambda: 5)
+        dashboard_cache.obtener("dashboard:prueba", lambda: 5)
+        
+        self.assertEqual(dashboard_cache.estadisticas(), {
+            'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 50.0
+        })
+
+
+class ListadoOTConsultasTests(BaseTestCase):
+    """Regresión N+1: las listas de OT no crecen en consultas con el número de filas."""
+    
+    def setUp(self):
+        super().setUp()
+        from .services.state_catalog import get_state_catalog
+        get_state_catalog().ids_de("PENDIENTE")
+    
+    def _crear_ots(self, cantidad, **campos):
+        for _ in range(cantidad):
+            OrdenTrabajo.objects.create(
+                cliente=self.cliente, vehiculo=self.vehiculo,
+                motivo_ingreso="Revisión", descripcion_problema="Ruido",
+                fecha_ingreso=date.today(), **campos
+            )
+    
+    def _contar_consultas(self, username, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        cache.clear()  # Mismo punto de partida en cada medición
+        client = Client()
+        client.login(username=username, password='test123')
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(consultas)
+    
+    def test_planificacion_no_depende_de_n(self):
+        """planificacion hace las mismas consultas con 1 o 10 OTs."""
+        self._crear_ots(1, estado=self.estado_pendiente)
+        con_una = self._contar_consultas('encargado', reverse('planificacion'))
+        
+        self._crear_ots(9, estado=self.estado_pendiente)
+        con_diez = self._contar_consultas('encargado', reverse('planificacion'))
+        
+        self.assertEqual(con_una, con_diez)
+    
+    def test_mis_trabajos_no_depende_de_n(self):
+        """mis_trabajos hace las mismas consultas con 1 o 10 OTs."""
+        campos = {
+            'estado': self.estado_en_progreso,
+            'mecanico': self.mecanico_obj,
+            'fecha_estimada_entrega': date.today() + timedelta(days=3),
+        }
+        self._crear_ots(1, **campos)
+        con_una = self._contar_consultas('mecanico', reverse('mis_trabajos'))
+        
+        self._crear_ots(9, **campos)
+        con_diez = self._contar_consultas('mecanico', reverse('mis_trabajos'))
+        
+        self.assertEqual(con_una, con_diez)
+    
+    def test_para_listado_trae_relaciones(self):
+        """Patente, cliente y estado se leen sin consultas adicionales."""
+        self._crear_ots(3, estado=self.estado_pendiente)
+        with self.assertNumQueries(1):
+            filas = [
+                (ot.vehiculo.patente, ot.cliente.nombre, ot.estado.nombre, ot.prioridad)
+                for ot in OrdenTrabajo.objects.para_listado()
+            ]
+        self.assertEqual(len(filas), 3)
+
+
+@override_settings(PAGINACION_TAMANO=3)
+class PaginacionKeysetTests(BaseTestCase):
+    """Tests de la paginación por cursor."""
+    
+    def _crear_notificaciones(self, cantidad):
+        Notificacion.objects.bulk_create([
+            Notificacion(
+                tipo=TipoNotificacion.MENSAJE_GENERAL,
+                mensaje=f"Mensaje {i}",
+                receptor=self.perfil_encargado,
+            )
+            for i in range(cantidad)
+        ])
+    
+    def _recorrer(self, client, url):
+        """Sigue los cursores de un endpoint JSON hasta el final."""
+        ids, cursor, paginas = [], None, 0
+        while True:
+            datos = client.get(url, {'cursor': cursor} if cursor else {}).json()
+            ids += [fila['id'] for fila in datos['resultados']]
+            paginas += 1
+            cursor = datos['siguiente']
+            if not cursor:
+                return ids, paginas
+    
+    def test_notificaciones_recorre_todas_sin_repetir(self):
+        """Los cursores cubren todas las filas una sola vez, más recientes primero."""
+        self._crear_notificaciones(8)
+        client = Client()
+        client.login(username='encargado', password='test123')
+        
+        ids, paginas = self._recorrer(client, reverse('api_notificaciones'))
+        
+        esperados = list(
+            Notificacion.objects.filter(receptor=self.perfil_encargado)
+            .order_by('-creada_en', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+        self.assertEqual(paginas, 3)
+    
+    def test_inventario_ordenado_por_nombre(self):
+        """El inventario se pagina por (nombre, id)."""
+        for i, nombre in enumerate(["Bujía", "Aceite", "Correa", "Aceite", "Disco"]):
+            Repuesto.objects.create(
+                codigo=f"REP1{i}", nombre=nombre, stock=5,
+                precio_compra=1000, precio_venta=2000, fecha_ingreso=date.today()
+            )
+        client = Client()
+        client.login(username='bodega', password='test123')
+        
+        ids, _ = self._recorrer(client, reverse('api_inventario'))
+        
+        self.assertEqual(ids, list(Repuesto.objects.order_by('nombre', 'id').values_list('id', flat=True)))
+    
+    def test_cursor_invalido_vuelve_a_primera_pagina(self):
+        """Un cursor manipulado no produce error."""
+        self._crear_notificaciones(2)
+        client = Client()
+        client.login(username='encargado', password='test123')
+        
+        for cursor in ['no-es-base64!', 'WyJ4Il0', 'WyJ4IiwgMV0']:
+            with self.subTest(cursor=cursor):
+                response = client.get(reverse('api_notificaciones'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['resultados']), 2)
+    
+    def test_vista_html_muestra_siguiente(self):
+        """La lista HTML solo renderiza una página y enlaza la siguiente."""
+        self._crear_notificaciones(5)
+        client = Client()
+        client.login(username='encargado', password='test123')
+        
+        response = client.get(reverse('notificaciones'))
+        
+        self.assertEqual(len(response.context['notificaciones']), 3)
+        self.assertContains(response, '?cursor=')
+    
+    def test_consultas_constantes_entre_paginas(self):
+        """Una página profunda cuesta las mismas consultas que la primera."""
+        self._crear_notificaciones(12)
+        client = Client()
+        client.login(username='encargado', password='test123')
+        primera = client.get(reverse('api_notificaciones')).json()
+        
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as inicio:
+            client.get(reverse('api_notificaciones'))
+        with CaptureQueriesContext(connection) as siguiente:
+            client.get(reverse('api_notificaciones'), {'cursor': primera['siguiente']})
+        
+        self.assertEqual(len(inicio), len(siguiente))
+        self.assertNotIn('OFFSET', siguiente.captured_queries[-1]['sql'].upper())
+
+
+class InformePdfTests(BaseTestCase):
+    """Tests de la cola de informes PDF."""
+    
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        
+        self.orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Revisión", descripcion_problema="Ruido",
+            fecha_ingreso=date.today()
+        )
+        self.client = Client()
+        self.client.login(username='encargado', password='test123')
+        
+        from .services import pdf_report_queue
+        self.modulo_cola = pdf_report_queue
+        self.modulo_cola._pdf_report_queue = None
+        self.addCleanup(setattr, self.modulo_cola, '_pdf_report_queue', None)
+    
+    def test_generar_encola_y_descarga(self):
+        """El endpoint devuelve el trabajo y la URL de descarga entrega el PDF."""
+        with override_settings(MEDIA_ROOT=self.media, INFORMES_PDF_WORKERS=0):
+            response = self.client.get(
+                reverse('generar_informe_pdf', args=[self.orden.id]), {'formato': 'json'}
+            )
+            self.assertEqual(response.status_code, 202)
+            datos = response.json()
+            self.assertTrue(datos['trabajo'].startswith(f"{self.orden.id}-"))
+            self.assertEqual(datos['estado'], 'LISTO')
+            
+            descarga = self.client.get(datos['descarga_url'])
+            self.assertEqual(descarga['Content-Type'], 'application/pdf')
+            self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+    
+    def test_generar_redirige_a_estado(self):
+        """Desde el navegador se redirige a la página de estado."""
+        with override_settings(MEDIA_ROOT=self.media, INFORMES_PDF_WORKERS=0):
+            response = self.client.get(reverse('generar_informe_pdf', args=[self.orden.id]))
+            self.assertEqual(response.status_code, 302)
+            estado = self.client.get(response.url)
+            self.assertContains(estado, 'El informe está listo')
+    
+    def test_pool_de_procesos(self):
+        """Con workers el PDF se genera en otro proceso y queda en MEDIA_ROOT/informes."""
+        from .services.pdf_report_queue import PdfReportQueue, EstadoInforme
+        cola = PdfReportQueue(directorio=f"{self.media}/informes", workers=1)
+        self.addCleanup(cola.cerrar)
+        
+        trabajo_id = cola.encolar(self.orden.id, "<html><body><p>Informe</p></body></html>")
+        self.assertIn(cola.estado(trabajo_id), (EstadoInforme.PENDIENTE, EstadoInforme.LISTO))
+        cola.cerrar()
+        
+        self.assertEqual(cola.estado(trabajo_id), EstadoInforme.LISTO)
+        self.assertTrue(cola.ruta_archivo(trabajo_id).read_bytes().startswith(b'%PDF'))
+    
+    def _generar(self):
+        response = self.client.get(
+            reverse('generar_informe_pdf', args=[self.orden.id]), {'formato': 'json'}
+        )
+        return response.json()['trabajo']
+    
+    def test_cache_reutiliza_pdf(self):
+        """Un segundo pedido de la misma OT no vuelve a renderizar."""
+        from unittest import mock
+        with override_settings(MEDIA_ROOT=self.media, INFORMES_PDF_WORKERS=0):
+            primero = self._generar()
+            with mock.patch.object(self.modulo_cola, 'renderizar_pdf') as renderizar:
+                segundo = self._generar()
+            renderizar.assert_not_called()
+        self.assertEqual(primero, segundo)
+    
+    def test_cambio_en_ot_invalida_cache(self):
+        """Agregar un ítem cambia la huella y elimina el PDF anterior."""
+        from .models import Servicio, ItemServicio
+        with override_settings(MEDIA_ROOT=self.media, INFORMES_PDF_WORKERS=0):
+            primero = self._generar()
+            ItemServicio.objects.create(
+                orden=self.orden, servicio=Servicio.objects.create(nombre="Cambio aceite", precio_base=10000),
+                precio=12000
+            )
+            segundo = self._generar()
+        
+        self.assertNotEqual(primero, segundo)
+        cola = self.modulo_cola.get_pdf_report_queue()
+        self.assertIsNone(cola.estado(primero))
+        self.assertEqual(cola.estado(segundo), 'LISTO')
+    
+    def test_desalojo_lru(self):
+        """Al superar el tamaño máximo se eliminan los PDFs menos usados."""
+        import os
+        from .services.pdf_report_queue import PdfReportQueue
+        cola = PdfReportQueue(directorio=self.media, workers=0)
+        for i, mtime in enumerate([300, 100, 200]):
+            ruta = cola.directorio / f"{i + 1}-{'a' * 16}.pdf"
+            ruta.write_bytes(b'x' * 10)
+            os.utime(ruta, (mtime, mtime))
+        
+        cola.max_bytes = 20
+        self.assertEqual(cola.desalojar(), 1)
+        self.assertIsNone(cola.estado(f"2-{'a' * 16}"))  # El menos usado
+        self.assertEqual(cola.estado(f"1-{'a' * 16}"), 'LISTO')
+    
+    def test_marcador_pendiente_vencido_se_reencola(self):
+        """Un .pendiente de un worker caído vence y el siguiente pedido lo vuelve a generar."""
+        import os
+        import time
+        from .services.pdf_report_queue import PdfReportQueue, EstadoInforme
+        cola = PdfReportQueue(directorio=self.media, workers=0)
+        huella = 'b' * 16
+        trabajo_id = f"{self.orden.id}-{huella}"
+        marcador = cola.directorio / f"{trabajo_id}.pendiente"
+        marcador.touch()
+        self.assertEqual(cola.estado(trabajo_id), EstadoInforme.PENDIENTE)
+        
+        vencido = time.time() - cola.expiracion_pendiente - 60
+        os.utime(marcador, (vencido, vencido))
+        self.assertIsNone(cola.estado(trabajo_id))
+        self.assertFalse(marcador.exists())
+        
+        cola.solicitar(self.orden.id, huella, lambda: "<html><body><p>Informe</p></body></html>")
+        self.assertEqual(cola.estado(trabajo_id), EstadoInforme.LISTO)
+    
+    def test_descarga_de_pdf_desalojado_responde_404(self):
+        """Si el desalojo elimina el PDF entre la consulta y la apertura, se responde 404."""
+        from pathlib import Path
+        from unittest import mock
+        from .services.pdf_report_queue import PdfReportQueue
+        with override_settings(MEDIA_ROOT=self.media, INFORMES_PDF_WORKERS=0):
+            trabajo_id = self._generar()
+            ruta = self.modulo_cola.get_pdf_report_queue().ruta_archivo(trabajo_id)
+            
+            def desalojado(cola, trabajo):
+                ruta.unlink()
+                return Path(ruta)
+            
+            with mock.patch.object(PdfReportQueue, 'ruta_archivo', desalojado):
+                response = self.client.get(reverse('descargar_informe_pdf', args=[trabajo_id]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_trabajo_inexistente(self):
+        """Ids desconocidos o mal formados responden 404."""
+        with override_settings(MEDIA_ROOT=self.media):
+            for trabajo_id in ['1-0123456789abcdef', '..-etc', 'x']:
+                with self.subTest(trabajo_id=trabajo_id):
+                    response = self.client.get(reverse('estado_informe_pdf', args=[trabajo_id]))
+                    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(INFORMES_PDF_WORKERS=0)
+class ExportacionInformesTests(BaseTestCase):
+    """Tests de la exportación masiva de informes."""
+    
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        
+        from .models import Servicio, ItemServicio
+        servicio = Servicio.objects.create(nombre="Cambio aceite", precio_base=10000)
+        self.entregada = date.today() - timedelta(days=5)
+        for _ in range(3):
+            orden = OrdenTrabajo.objects.create(
+                cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_finalizado,
+                mecanico=self.mecanico_obj, motivo_ingreso="Revisión", descripcion_problema="Ruido",
+                fecha_ingreso=self.entregada, fecha_entrega_real=self.entregada
+            )
+            ItemServicio.objects.create(orden=orden, servicio=servicio, precio=12000)
+        
+        from .services import pdf_report_queue
+        pdf_report_queue._pdf_report_queue = None
+        self.addCleanup(setattr, pdf_report_queue, '_pdf_report_queue', None)
+    
+    def test_precarga_no_depende_de_n(self):
+        """Huella y HTML de todas las OTs se arman con consultas fijas."""
+        from .services.report_builder import ots_para_lote, huella_informe, html_informe
+        
+        # cliente/vehículo/... en un JOIN + servicios, repuestos y bitácoras precargados
+        with self.assertNumQueries(5):
+            ots = list(ots_para_lote(estado_id=self.estado_finalizado.id))
+            for ot in ots:
+                huella_informe(ot)
+                html_informe(ot)
+        self.assertEqual(len(ots), 3)
+    
+    def test_vista_genera_zip(self):
+        """La vista encola el lote y el ZIP trae un PDF por OT."""
+        import io
+        import zipfile
+        
+        client = Client()
+        client.login(username='encargado', password='test123')
+        with override_settings(MEDIA_ROOT=self.media):
+            response = client.post(reverse('exportar_informes'), {
+                'desde': self.entregada.isoformat(),
+                'hasta': date.today().isoformat(),
+            })
+            self.assertEqual(response.status_code, 302)
+            
+            estado = client.get(f"{response.url}&formato=json").json()
+            self.assertEqual(estado['estado'], 'LISTO')
+            
+            descarga = client.get(estado['descarga_url'])
+            contenido = zipfile.ZipFile(io.BytesIO(b''.join(descarga.streaming_content)))
+        
+        self.assertEqual(len(contenido.namelist()), 3)
+        self.assertTrue(all(nombre.startswith('informe_OT_') for nombre in contenido.namelist()))
+    
+    def test_filtro_requerido(self):
+        """Sin rango ni estado el formulario no es válido."""
+        client = Client()
+        client.login(username='encargado', password='test123')
+        response = client.post(reverse('exportar_informes'), {})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Indique un rango de fechas o un estado.')
+    
+    def test_comando(self):
+        """El comando escribe el ZIP con los informes del estado indicado."""
+        import io
+        import zipfile
+        from django.core.management import call_command
+        
+        salida = f"{self.media}/informes.zip"
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command(
+                'exportar_informes', '--estado', 'FINALIZADO', '--salida', salida,
+                '--procesos', '0', stdout=io.StringIO()
+            )
+        self.assertEqual(len(zipfile.ZipFile(salida).namelist()), 3)
+
+
+class TotalesOTTests(BaseTestCase):
+    """Tests de los totales guardados de la OT."""
+    
+    def setUp(self):
+        super().setUp()
+        from .models import Servicio
+        self.servicio = Servicio.objects.create(nombre="Cambio aceite", precio_base=10000)
+        self.orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Revisión", descripcion_problema="Ruido",
+            fecha_ingreso=date.today()
+        )
+    
+    def _recargar(self):
+        return OrdenTrabajo.objects.get(pk=self.orden.pk)
+    
+    def test_items_actualizan_totales(self):
+        """Crear, modificar y borrar ítems mantiene los subtotales."""
+        from .models import ItemServicio, ItemRepuesto
+        servicio = ItemServicio.objects.create(orden=self.orden, servicio=self.servicio, precio=12000)
+        repuesto = ItemRepuesto.objects.create(
+            orden=self.orden, repuesto=self.repuesto, cantidad=2, precio_unitario=8000
+        )
+        self.assertEqual(self._recargar().total_general(), 28000)
+        
+        repuesto.cantidad = 3
+        repuesto.save()
+        ot = self._recargar()
+        self.assertEqual((ot.total_servicios(), ot.total_repuestos()), (12000, 24000))
+        
+        servicio.delete()
+        self.assertEqual(self._recargar().total_general(), 24000)
+    
+    def test_lectura_sin_consultas(self):
+        """Leer los totales no consulta los ítems."""
+        from .models import ItemServicio
+        ItemServicio.objects.create(orden=self.orden, servicio=self.servicio, precio=12000)
+        ot = self._recargar()
+        with self.assertNumQueries(0):
+            self.assertEqual(ot.total_general(), 12000)
+    
+    def test_mover_item_recalcula_ambas_ots(self):
+        """Un ítem que cambia de OT descuenta su valor de la OT anterior."""
+        from .models import ItemServicio
+        otra = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Frenos", descripcion_problema="Chirrido", fecha_ingreso=date.today()
+        )
+        item = ItemServicio.objects.create(orden=self.orden, servicio=self.servicio, precio=12000)
+        item.orden = otra
+        item.save()
+        
+        self.assertEqual(self._recargar().total_servicios(), 0)
+        self.assertEqual(OrdenTrabajo.objects.get(pk=otra.pk).total_servicios(), 12000)
+    
+    def test_guardar_ot_desactualizada_no_pisa_totales(self):
+        """Guardar una instancia cargada antes de agregar ítems conserva los totales."""
+        from .models import ItemServicio
+        ot_vieja = self._recargar()
+        ItemServicio.objects.create(orden=self.orden, servicio=self.servicio, precio=12000)
+        
+        ot_vieja.prioridad = "ALTA"
+        ot_vieja.save()
+        
+        ot = self._recargar()
+        self.assertEqual(ot.prioridad, "ALTA")
+        self.assertEqual(ot.total_servicios(), 12000)
+    
+    def test_recompute_totals_repara_desfase(self):
+        """El comando corrige ítems cargados sin señales (bulk_create)."""
+        import io
+        from django.core.management import call_command
+        from .models import ItemServicio
+        ItemServicio.objects.bulk_create([
+            ItemServicio(orden=self.orden, servicio=self.servicio, precio=5000),
+            ItemServicio(orden=self.orden, servicio=self.servicio, precio=7000),
+        ])
+        self.assertEqual(self._recargar().total_servicios(), 0)
+        
+        salida = io.StringIO()
+        call_command('recompute_totals', stdout=salida)
+        
+        self.assertIn('1 OTs', salida.getvalue())
+        self.assertEqual(self._recargar().total_servicios(), 12000)
+
+
+class ExportacionDatosTests(BaseTestCase):
+    """Tests de la exportación CSV/XLSX por streaming."""
+    
+    def setUp(self):
+        super().setUp()
+        from .models import Servicio, ItemServicio
+        self.orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_pendiente,
+            motivo_ingreso="Revisión", descripcion_problema="Ruido",
+            fecha_ingreso=date.today()
+        )
+        servicio = Servicio.objects.create(nombre="Cambio aceite", precio_base=10000)
+        ItemServicio.objects.create(orden=self.orden, servicio=servicio, precio=12000)
+    
+    def _csv(self, response):
+        import csv
+        contenido = b"".join(response.streaming_content).decode("utf-8-sig")
+        return list(csv.reader(contenido.splitlines()))
+    
+    def test_csv_ordenes_streaming_con_totales(self):
+        """El CSV de órdenes se entrega por streaming e incluye los totales."""
+        self.client.login(username="encargado", password="test123")
+        response = self.client.get(reverse("exportar_datos", args=["ordenes"]))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        filas = self._csv(response)
+        self.assertEqual(filas[0][0], "OT")
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][0], str(self.orden.id))
+        self.assertEqual(filas[1][-1], "12000")
+    
+    def test_csv_lee_por_bloques(self):
+        """Las filas se leen en bloques del tamaño configurado."""
+        from .services.data_export import DataExporter
+        for i in range(4):
+            Repuesto.objects.create(
+                codigo=f"EXP{i}", nombre=f"Repuesto {i}", stock=1, precio_compra=1,
+                precio_venta=2, fecha_ingreso=date.today(), proveedor=self.proveedor
+            )
+        lineas = DataExporter("repuestos", chunk_size=2).lineas_csv()
+        # El generador no consulta hasta que se consume
+        self.assertTrue(next(lineas).startswith("\ufeffCódigo"))
+        self.assertEqual(len(list(lineas)), 5)
+    
+    def test_roles_por_exportacion(self):
+        """Bodega exporta repuestos pero no órdenes; un nombre desconocido es 404."""
+        self.client.login(username="bodega", password="test123")
+        response = self.client.get(reverse("exportar_datos", args=["repuestos"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("REP001", "".join(r[0] for r in self._csv(response)))
+        
+        response = self.client.get(reverse("exportar_datos", args=["ordenes"]))
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        
+        response = self.client.get(reverse("exportar_datos", args=["usuarios"]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_comando_exportar_datos(self):
+        """El comando escribe el CSV en el archivo indicado."""
+        import io
+        import os
+        from django.core.management import call_command
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ruta = os.path.join(directorio, "notificaciones.csv")
+        Notificacion.objects.create(
+            tipo=TipoNotificacion.MENSAJE_GENERAL, mensaje="Nueva OT",
+            receptor=self.perfil_mecanico, orden=self.orden
+        )
+        
+        salida = io.StringIO()
+        call_command("exportar_datos", "notificaciones", salida=ruta, stdout=salida)
+        
+        with open(ruta, encoding="utf-8-sig") as archivo:
+            contenido = archivo.read()
+        self.assertIn("Nueva OT", contenido)
+        self.assertIn(ruta, salida.getvalue())
+
+
+class RetencionNotificacionesTests(BaseTestCase):
+    """Tests de retención y compactación de notificaciones."""
+    
+    def _crear(self, mensaje, dias=0, leida=False, receptor=None):
+        notif = Notificacion.objects.create(
+            tipo=TipoNotificacion.MENSAJE_GENERAL, mensaje=mensaje,
+            receptor=receptor or self.perfil_encargado, leida=leida
+        )
+        if dias:
+            Notificacion.objects.filter(pk=notif.pk).update(
+                creada_en=timezone.now() - timedelta(days=dias)
+            )
+        return notif
+    
+    def test_purga_leidas_antiguas_en_lotes(self):
+        """Se borran solo las leídas vencidas, en lotes del tamaño indicado."""
+        from .services.notification_retention import NotificationRetention
+        for i in range(5):
+            self._crear(f"Vieja {i}", dias=100, leida=True)
+        no_leida = self._crear("Vieja sin leer", dias=100)
+        reciente = self._crear("Reciente", leida=True)
+        
+        borradas = NotificationRetention(dias=90, lote=2).purgar()
+        
+        self.assertEqual(borradas, 5)
+        self.assertEqual(
+            set(Notificacion.objects.values_list("pk", flat=True)), {no_leida.pk, reciente.pk}
+        )
+    
+    def test_archivo_conserva_las_borradas(self):
+        """Con archivo, las filas borradas quedan en un JSON Lines comprimido."""
+        import gzip
+        import json
+        import os
+        from .services.notification_retention import NotificationRetention
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ruta = os.path.join(directorio, "archivo.jsonl.gz")
+        self._crear("Archivada", dias=100, leida=True)
+        
+        NotificationRetention(dias=90).purgar(archivo=ruta)
+        
+        with gzip.open(ruta, "rt", encoding="utf-8") as archivo:
+            filas = [json.loads(linea) for linea in archivo]
+        self.assertEqual([f["mensaje"] for f in filas], ["Archivada"])
+        self.assertEqual(filas[0]["receptor_id"], self.perfil_encargado.id)
+    
+    def test_compacta_avisos_repetidos(self):
+        """Los avisos idénticos quedan en la fila más reciente con el contador."""
+        from .services.notification_retention import NotificationRetention
+        for _ in range(3):
+            ultima = self._crear("Repuesto Filtro bajo en stock (solo 2 unidades).")
+        self._crear("Repuesto Filtro bajo en stock (solo 2 unidades).", receptor=self.perfil_bodega)
+        self._crear("Otro aviso")
+        
+        eliminadas = NotificationRetention(lote=1).compactar()
+        
+        self.assertEqual(eliminadas, 2)
+        ultima.refresh_from_db()
+        self.assertEqual(ultima.repeticiones, 3)
+        self.assertEqual(Notificacion.objects.count(), 3)
+    
+    def test_compacta_alertas_de_stock_con_distinto_texto(self):
+        """Las alertas de un mismo repuesto se agrupan por clave aunque cambie el stock del texto."""
+        from .services.notification_retention import NotificationRetention
+        for periodo, stock in [("2026-10-01", 2), ("2026-10-02", 1)]:
+            ultima = Notificacion.objects.create(
+                tipo=TipoNotificacion.MENSAJE_GENERAL, receptor=self.perfil_encargado,
+                mensaje=f"Repuesto Filtro bajo en stock (solo {stock} unidades).",
+                clave_dedup=f"stock_bajo:{self.repuesto.id}", periodo=periodo
+            )
+        self._crear("Repuesto Filtro bajo en stock (solo 1 unidades).")  # sin clave
+        
+        retencion = NotificationRetention()
+        self.assertEqual(len(retencion.duplicados()), 1)
+        eliminadas = retencion.compactar()
+        
+        self.assertEqual(eliminadas, 1)
+        ultima.refresh_from_db()
+        self.assertEqual(ultima.repeticiones, 2)
+        self.assertEqual(Notificacion.objects.count(), 2)
+    
+    def test_comando_dry_run_no_modifica(self):
+        """--dry-run informa sin borrar."""
+        import io
+        from django.core.management import call_command
+        self._crear("Vieja", dias=100, leida=True)
+        
+        salida = io.StringIO()
+        call_command("purgar_notificaciones", "--dry-run", stdout=salida)
+        
+        self.assertIn("1 notificaciones leídas", salida.getvalue())
+        self.assertEqual(Notificacion.objects.count(), 1)
+        
+        call_command("purgar_notificaciones", stdout=salida)
+        self.assertEqual(Notificacion.objects.count(), 0)
+
+
+@override_settings(NOTIFICACIONES_ASINCRONAS=False)
+class DedupNotificacionesTests(BaseTestCase):
+    """Tests de las claves de deduplicación de notificaciones."""
+    
+    def setUp(self):
+        super().setUp()
+        self.ot = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_en_progreso,
+            mecanico=self.mecanico_obj, motivo_ingreso="Revisión", descripcion_problema="Ruido",
+            fecha_ingreso=date.today() - timedelta(days=10),
+            fecha_estimada_entrega=date.today() - timedelta(days=2)
+        )
+        Notificacion.objects.all().delete()
+    
+    def test_atraso_se_avisa_una_vez(self):
+        """Un segundo aviso de atraso de la misma OT se resuelve con una consulta."""
+        from .services.notification_service import NotificationService
+        servicio = NotificationService()
+        self.assertEqual(servicio.notificar_atrasos([self.ot], self.perfil_mecanico), 1)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(servicio.notificar_atrasos([self.ot], self.perfil_mecanico), 0)
+        
+        notif = Notificacion.objects.get(tipo=TipoNotificacion.ATRASO_TRABAJO)
+        self.assertEqual(notif.clave_dedup, f"atraso:{self.ot.id}")
+    
+    def test_mis_trabajos_no_repite_atraso(self):
+        """Visitar mis trabajos varias veces deja un solo aviso por OT atrasada."""
+        self.client.login(username="mecanico", password="test123")
+        self.client.get(reverse("mis_trabajos"))
+        self.client.get(reverse("mis_trabajos"))
+        
+        self.assertEqual(
+            Notificacion.objects.filter(tipo=TipoNotificacion.ATRASO_TRABAJO, orden=self.ot).count(), 1
+        )
+    
+    @override_settings(NOTIFICACIONES_ASINCRONAS=True)
+    def test_atraso_encolado_no_se_repite(self):
+        """Con el outbox activo, un atraso ya encolado no se vuelve a encolar."""
+        from django.core.management import call_command
+        from io import StringIO
+        from .services.notification_service import NotificationService
+        servicio = NotificationService()
+        self.assertEqual(servicio.notificar_atrasos([self.ot], self.perfil_mecanico), 1)
+        self.assertEqual(servicio.notificar_atrasos([self.ot], self.perfil_mecanico), 0)
+        self.assertEqual(EventoOutbox.objects.filter(tipo_evento='ATRASO').count(), 1)
+        
+        call_command('procesar_outbox', stdout=StringIO())
+        self.assertEqual(servicio.notificar_atrasos([self.ot], self.perfil_mecanico), 0)
+        
+        avisos = Notificacion.objects.filter(tipo=TipoNotificacion.ATRASO_TRABAJO, orden=self.ot)
+        self.assertTrue(avisos.exists())
+        self.assertEqual(
+            avisos.values("receptor").distinct().count(), avisos.count()
+        )
+    
+    def test_stock_bajo_una_alerta_por_dia(self):
+        """La alerta de stock bajo lleva clave y fecha; la segunda del día se omite."""
+        from .services.inventory_manager import InventoryManager
+        manager = InventoryManager()
+        
+        self.assertIsNotNone(manager.crear_alerta_stock_bajo(self.repuesto, self.perfil_bodega))
+        self.assertIsNone(manager.crear_alerta_stock_bajo(self.repuesto, self.perfil_bodega))
+        
+        notif = Notificacion.objects.get()
+        self.assertEqual(notif.clave_dedup, f"stock_bajo:{self.repuesto.id}")
+        self.assertEqual(notif.periodo, timezone.localdate().isoformat())
+    
+    def test_insert_or_ignore_descarta_repetidos(self):
+        """La restricción única descarta avisos repetidos escritos en paralelo."""
+        from .patterns.observer import guardar_notificaciones
+        def aviso():
+            return Notificacion(
+                tipo=TipoNotificacion.MENSAJE_GENERAL, mensaje="Stock bajo",
+                receptor=self.perfil_encargado, clave_dedup="stock_bajo:1", periodo="2026-01-01"
+            )
+        guardar_notificaciones([aviso()])
+        guardar_notificaciones([aviso(), aviso()])
+        
+        self.assertEqual(Notificacion.objects.filter(clave_dedup="stock_bajo:1").count(), 1)
+
+
+class AlertasStockBajoTests(BaseTestCase):
+    """Tests de las alertas de stock bajo por evento y por barrido."""
+    
+    def _alertas(self):
+        return Notificacion.objects.filter(clave_dedup=f"stock_bajo:{self.repuesto.id}")
+    
+    def test_alerta_llega_a_todos_los_encargados_una_vez(self):
+        """Cada encargado de taller recibe la alerta del día una sola vez."""
+        from .services.inventory_manager import InventoryManager
+        otro = PerfilUsuario.objects.create(
+            usuario=User.objects.create_user(username="encargado2", password="test123"),
+            rol=RolUsuario.ENCARGADO_TALLER
+        )
+        Repuesto.objects.filter(pk=self.repuesto.pk).update(stock=1)
+        self.repuesto.refresh_from_db()
+        manager = InventoryManager()
+        
+        manager.crear_alertas_stock_bajo([self.repuesto])
+        manager.crear_alertas_stock_bajo([self.repuesto])
+        
+        self.assertEqual(
+            sorted(self._alertas().values_list("receptor_id", flat=True)),
+            sorted([self.perfil_encargado.id, otro.id])
+        )
+    
+    def test_barrido_con_consultas_constantes(self):
+        """N repuestos y varios encargados: claves + receptores + un insert."""
+        from .services.inventory_manager import InventoryManager
+        PerfilUsuario.objects.create(
+            usuario=User.objects.create_user(username="encargado2", password="test123"),
+            rol=RolUsuario.ENCARGADO_TALLER
+        )
+        repuestos = [
+            Repuesto.objects.create(
+                codigo=f"BAJO{i}", nombre=f"Repuesto bajo {i}", stock=0, precio_compra=1000,
+                precio_venta=1500, fecha_ingreso=date.today(), proveedor=self.proveedor
+            )
+            for i in range(5)
+        ]
+        
+        with self.assertNumQueries(3):
+            InventoryManager().crear_alertas_stock_bajo(repuestos)
+        
+        self.assertEqual(Notificacion.objects.filter(clave_dedup__startswith="stock_bajo:").count(), 10)
+    
+    def test_salida_que_cruza_el_umbral_alerta(self):
+        """Solo la salida que deja el stock bajo el umbral crea la alerta."""
+        from .services.inventory_manager import InventoryManager
+        manager = InventoryManager()
+        
+        manager.realizar_movimiento_stock(self.repuesto.id, "salida", 5)  # 10 -> 5
+        self.assertFalse(self._alertas().exists())
+        
+        manager.realizar_movimiento_stock(self.repuesto.id, "salida", 3, emisor=self.perfil_bodega)  # 5 -> 2
+        alerta = self._alertas().get()
+        self.assertEqual(alerta.receptor, self.perfil_encargado)
+        self.assertEqual(alerta.emisor, self.perfil_bodega)
+        
+        # Ya estaba bajo el umbral: no consulta alertas
+        with self.assertNumQueries(2):
+            manager.realizar_movimiento_stock(self.repuesto.id, "salida", 1)  # 2 -> 1
+    
+    def test_inventario_no_escribe(self):
+        """Abrir el inventario no crea alertas."""
+        Repuesto.objects.filter(pk=self.repuesto.pk).update(stock=1)
+        self.client.login(username="bodega", password="test123")
+        
+        response = self.client.get(reverse("inventario"))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Notificacion.objects.exists())
+    
+    def test_barrido_crea_pendientes_sin_duplicar(self):
+        """El comando alerta lo que quedó bajo el umbral y se puede repetir."""
+        import io
+        from django.core.management import call_command
+        Repuesto.objects.filter(pk=self.repuesto.pk).update(stock=1)
+        
+        salida = io.StringIO()
+        call_command("alertas_stock_bajo", stdout=salida)
+        call_command("alertas_stock_bajo", stdout=salida)
+        
+        self.assertEqual(self._alertas().count(), 1)
+        self.assertIn("1 alertas nuevas", salida.getvalue())
+        self.assertIn("0 alertas nuevas", salida.getvalue())
+
+
+class ReposicionTests(BaseTestCase):
+    """Tests de puntos de reorden y del planificador de reposición."""
+    
+    def setUp(self):
+        super().setUp()
+        self.otro_proveedor = Proveedor.objects.create(nombre="Autopartes Sur")
+        self.orden = OrdenTrabajo.objects.create(
+            cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_finalizado,
+            motivo_ingreso="Mantención", descripcion_problema="Pauta",
+            fecha_ingreso=date.today() - timedelta(days=10)
+        )
+    
+    def _repuesto(self, codigo, stock, consumo=0, proveedor=None, **campos):
+        from .models import ItemRepuesto
+        repuesto = Repuesto.objects.create(
+            codigo=codigo, nombre=f"Repuesto {codigo}", stock=stock, precio_compra=1000,
+            precio_venta=1500, fecha_ingreso=date.today(),
+            proveedor=proveedor or self.proveedor, **campos
+        )
+        if consumo:
+            ItemRepuesto.objects.create(
+                orden=self.orden, repuesto=repuesto, cantidad=consumo, precio_unitario=1500
+            )
+        return repuesto
+    
+    def test_stock_bajo_por_punto_de_reorden(self):
+        """Cada repuesto usa su propio punto de reorden."""
+        alto = self._repuesto("R1", stock=8, punto_reorden=10)
+        self._repuesto("R2", stock=8, punto_reorden=2)
+        
+        self.assertEqual(list(Repuesto.objects.stock_bajo()), [alto])
+    
+    def test_urgentes_ordenados_por_dias_hasta_quiebre(self):
+        """Los más próximos a quedar sin stock primero; k limita el resultado."""
+        from .services.reorder_planner import ReorderPlanner
+        # Consumo de 90 unidades en 90 días = 1 por día
+        lento = self._repuesto("R1", stock=6, consumo=90, tiempo_reposicion_dias=7)
+        rapido = self._repuesto("R2", stock=2, consumo=90, tiempo_reposicion_dias=7)
+        self._repuesto("R3", stock=50, consumo=90, tiempo_reposicion_dias=7)  # Cubre la reposición
+        agotado = self._repuesto("R4", stock=0, punto_reorden=1)
+        self._calcular_consumo()
+        
+        urgentes = ReorderPlanner().urgentes(k=3)
+        
+        self.assertEqual([s.repuesto for s in urgentes], [agotado, rapido, lento])
+        self.assertAlmostEqual(urgentes[1].dias_hasta_quiebre, 2.0)
+        # Punto de reorden (3) + 7 días de consumo - stock (2)
+        self.assertEqual(urgentes[1].cantidad_sugerida, 8)
+        self.assertEqual(len(ReorderPlanner().urgentes(k=1)), 1)
+    
+    def test_orden_compra_por_proveedor(self):
+        """La orden de compra agrupa por proveedor con su total."""
+        from .services.reorder_planner import ReorderPlanner
+        self._repuesto("R1", stock=0, punto_reorden=2)
+        self._repuesto("R2", stock=1, punto_reorden=2)
+        self._repuesto("R3", stock=0, punto_reorden=4, proveedor=self.otro_proveedor)
+        
+        orden = ReorderPlanner().orden_compra()
+        
+        self.assertEqual([g["proveedor"] for g in orden], [self.otro_proveedor, self.proveedor])
+        self.assertEqual(orden[0]["total"], 4000)
+        self.assertEqual(sorted(i.repuesto.codigo for i in orden[1]["items"]), ["R1", "R2"])
+    
+    def _calcular_consumo(self):
+        from .services.consumption_analytics import ConsumptionAnalytics
+        # Media de los 90 días y sin stock de seguridad (z = 0)
+        ConsumptionAnalytics(ventana_dias=90, ventana_movil_dias=90, z_servicio=0).recalcular()
+    
+    def test_urgentes_leen_solo_k_filas_del_indice(self):
+        """urgentes(k) es una consulta acotada por k sobre repuesto_quiebre_idx."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services.reorder_planner import ReorderPlanner
+        for i in range(5):
+            self._repuesto(f"R{i}", stock=i + 1, consumo=90)
+        self._calcular_consumo()
+        
+        with CaptureQueriesContext(connection) as consultas:
+            urgentes = ReorderPlanner().urgentes(k=2)
+        
+        self.assertEqual([s.repuesto.codigo for s in urgentes], ["R0", "R1"])
+        self.assertEqual(len(consultas), 1)
+        self.assertIn("LIMIT 2", consultas[0]['sql'])
+    
+    def test_movimiento_de_stock_actualiza_urgencia(self):
+        """Una entrada de stock recalcula los días hasta el quiebre en save()."""
+        from .services.inventory_manager import InventoryManager
+        from .services.reorder_planner import ReorderPlanner
+        repuesto = self._repuesto("R1", stock=2, consumo=90, tiempo_reposicion_dias=7)
+        self._calcular_consumo()
+        self.assertEqual([s.repuesto for s in ReorderPlanner().urgentes()], [repuesto])
+        
+        InventoryManager().realizar_movimiento_stock(repuesto.id, "entrada", 48)
+        
+        repuesto.refresh_from_db()
+        self.assertAlmostEqual(repuesto.dias_hasta_quiebre, 50.0)
+        self.assertFalse(repuesto.requiere_reposicion)
+        self.assertEqual(ReorderPlanner().urgentes(), [])
+    
+    def test_vista_reposicion(self):
+        """El plan de reposición se muestra a bodega."""
+        self._repuesto("R1", stock=0)
+        self.client.login(username="bodega", password="test123")
+        
+        response = self.client.get(reverse("reposicion"))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Repuesto R1")
+        self.assertContains(response, "Proveedor Test")
+
+
+class ConsumoRepuestosTests(BaseTestCase):
+    """Tests de las estadísticas de consumo precalculadas."""
+    
+    def setUp(self):
+        super().setUp()
+        from .models import ItemRepuesto
+        # 10 unidades hace 5 días y 20 hace 40 días
+        for dias, cantidad in [(5, 10), (40, 20)]:
+            orden = OrdenTrabajo.objects.create(
+                cliente=self.cliente, vehiculo=self.vehiculo, estado=self.estado_finalizado,
+                motivo_ingreso="Mantención", descripcion_problema="Pauta",
+                fecha_ingreso=timezone.localdate() - timedelta(days=dias)
+            )
+            ItemRepuesto.objects.create(
+                orden=orden, repuesto=self.repuesto, cantidad=cantidad, precio_unitario=8000
+            )
+    
+    def test_estadisticas_de_la_serie(self):
+        """Promedio, media móvil, desviación y stock de seguridad por repuesto."""
+        import math
+        import statistics
+        from .services.consumption_analytics import ConsumptionAnalytics
+        analytics = ConsumptionAnalytics(ventana_dias=60, ventana_movil_dias=30, z_servicio=2)
+        
+        with self.assertNumQueries(2):  # tiempos de reposición + historial
+            consumo, = analytics.calcular()
+        
+        serie = [0] * 60
+        serie[-6], serie[-41] = 10, 20
+        self.assertAlmostEqual(consumo.consumo_promedio, 0.5)
+        self.assertAlmostEqual(consumo.consumo_reciente, 10 / 30)
+        self.assertAlmostEqual(consumo.desviacion, statistics.pstdev(serie))
+        self.assertEqual(
+            consumo.stock_seguridad,
+            math.ceil(2 * statistics.pstdev(serie) * math.sqrt(self.repuesto.tiempo_reposicion_dias))
+        )
+        self.assertAlmostEqual(
+            sum(consumo.estacionalidad[m] * serie_mes for m, serie_mes in
+                self._dias_por_mes(analytics).items()) / 60,
+            1.0, places=2
+        )
+    
+    def _dias_por_mes(self, analytics):
+        conteo = {}
+        for dia in analytics.dias:
+            conteo[str(dia.month)] = conteo.get(str(dia.month), 0) + 1
+        return conteo
+    
+    def test_comando_y_dashboard_leen_la_tabla(self):
+        """El comando llena la tabla y el dashboard de bodega la muestra."""
+        import io
+        from django.core.management import call_command
+        from .models import ConsumoRepuesto
+        
+        salida = io.StringIO()
+        call_command("calcular_consumo", "--ventana", "60", stdout=salida)
+        
+        self.assertIn("1 repuestos", salida.getvalue())
+        self.assertEqual(ConsumoRepuesto.objects.get().repuesto, self.repuesto)
+        
+        self.client.login(username="bodega", password="test123")
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["mayor_consumo"][0]["repuesto__codigo"], "REP001")
+    
+    def test_planner_usa_stock_de_seguridad(self):
+        """Con la tabla precalculada, el plan usa su consumo y stock de seguridad."""
+        from .models import ConsumoRepuesto
+        from .services.consumption_analytics import ConsumptionAnalytics
+        from .services.reorder_planner import ReorderPlanner
+        ConsumoRepuesto.objects.create(
+            repuesto=self.repuesto, consumo_reciente=0.1, stock_seguridad=12,
+            calculado_en=timezone.now()
+        )
+        ConsumptionAnalytics.actualizar_repuestos(list(ConsumoRepuesto.objects.all()))
+        
+        sugerencia, = ReorderPlanner().urgentes()
+        
+        # stock 10 < seguridad 12: objetivo 12 + ceil(0.1 * 7) = 13
+        self.assertEqual(sugerencia.cantidad_sugerida, 3)
+
+
+class BusquedaGlobalTests(BaseTestCase):
+    """Tests de la búsqueda global sobre el índice FTS5."""
+    
+    def test_indice_se_mantiene_con_senales(self):
+        """Crear, editar y borrar registros actualiza el índice."""
+        from .services.search_index import SearchIndex
+        indice = SearchIndex()
+        
+        self.assertEqual([r.objeto_id for r in indice.buscar("abcd")], [self.vehiculo.id])
+        # Sin acentos y por prefijo
+        self.assertEqual([r.tipo for r in indice.buscar("perez")], ["cliente", "vehiculo"])
+        
+        # El vehículo copia el nombre del cliente: se reindexa con él
+        self.cliente.nombre = "Juan Soto"
+        self.cliente.save()
+        self.assertEqual(indice.buscar("perez"), [])
+        self.assertEqual(len(indice.buscar("soto")), 2)
+        
+        self.herramienta.delete()
+        self.assertEqual(indice.buscar("llave"), [])
+    
+    def test_renombrar_marca_o_modelo_reindexa_vehiculos(self):
+        """El documento del vehículo copia marca y modelo: se reindexa al renombrarlos."""
+        from .services.search_index import SearchIndex
+        indice = SearchIndex()
+        self.marca.nombre = "Zetamotors"
+        self.marca.save()
+        self.modelo.nombre = "Ventisca"
+        self.modelo.save()
+        
+        self.assertEqual([r.objeto_id for r in indice.buscar("zetamotors ventisca")], [self.vehiculo.id])
+    
+    def test_ranking_titulo_primero(self):
+        """Los registros con la palabra en el título aparecen antes."""
+        from .services.search_index import SearchIndex
+        Repuesto.objects.create(
+            codigo="REP002", nombre="Bujía", marca="Filtron", stock=5,
+            precio_compra=1000, precio_venta=2000, fecha_ingreso=date.today()
+        )
+        
+        resultados = SearchIndex().buscar("filtro", tipos=["repuesto"])
+        
+        self.assertEqual([r.titulo for r in resultados], ["Filtro de aceite", "Bujía"])
+    
+    def test_reconstruir(self):
+        """El comando vuelve a llenar el índice con lo cargado sin señales."""
+        import io
+        from django.core.management import call_command
+        from .services.search_index import SearchIndex
+        Herramienta.objects.bulk_create([
+            Herramienta(codigo="HER002", nombre="Gata hidráulica", ubicacion_fisica="Piso",
+                        fecha_adquisicion=date.today())
+        ])
+        self.assertEqual(SearchIndex().buscar("gata"), [])
+        
+        salida = io.StringIO()
+        call_command("reconstruir_busqueda", stdout=salida)
+        
+        self.assertEqual(SearchIndex().buscar("hidraulica")[0].titulo, "Gata hidráulica")
+        self.assertIn("herramienta: 2", salida.getvalue())
+    
+    def test_vista_filtra_por_rol(self):
+        """Cada rol solo ve sus tipos; los enlaces solo a vistas que puede abrir."""
+        self.client.login(username="bodega", password="test123")
+        response = self.client.get(reverse("buscar"), {"q": "filtro perez", "formato": "json"})
+        self.assertEqual(response.json()["resultados"], [])
+        
+        response = self.client.get(reverse("buscar"), {"q": "filtro", "formato": "json"})
+        resultado, = response.json()["resultados"]
+        self.assertEqual(resultado["url"], reverse("editar_repuesto", args=[self.repuesto.id]))
+        
+        self.client.login(username="recepcionista", password="test123")
+        response = self.client.get(reverse("buscar"), {"q": "juan"})
+        self.assertEqual([r["tipo"] for r in response.context["resultados"]], ["cliente", "vehiculo"])
+        self.assertNotContains(response, "Filtro de aceite")
+    
+    def test_texto_con_sintaxis_fts(self):
+        """Comillas y operadores del usuario no rompen la consulta."""
+        from .services.search_index import SearchIndex, consulta_fts
+        self.assertEqual(consulta_fts('"abcd" OR (x*'), '"abcd"* "or"* "x"*')
+        self.assertEqual(SearchIndex().buscar('"(*'), [])
+
+
+class ClavesNormalizadasTests(BaseTestCase):
+    """Tests de RUT y patente normalizados y del autocompletado por prefijo."""
+    
+    def _solicitud(self, **datos):
+        base = {
+            'rut': '98765432-5', 'nombre': 'María González', 'telefono': '987654321',
+            'patente': 'EFGH34', 'marca': self.marca.id, 'modelo': self.modelo.id,
+            'anio': 2021, 'kilometraje': 30000, 'motivo': 'Mantención',
+            'descripcion': 'Cambio de aceite', 'fecha': date.today(),
+        }
+        base.update(datos)
+        self.client.login(username='recepcionista', password='test123')
+        return self.client.post(reverse('registrar_solicitud'), base)
+    
+    def test_claves_se_calculan_al_guardar(self):
+        self.assertEqual(self.cliente.rut_normalizado, "123456789")
+        self.assertEqual(self.vehiculo.patente_normalizada, "ABCD12")
+        
+        self.vehiculo.patente = "ab-cd 13"
+        self.vehiculo.save(update_fields=["patente"])
+        self.assertEqual(Vehiculo.objects.por_patente("ABCD13").get(), self.vehiculo)
+    
+    def test_admin_rechaza_rut_y_patente_con_otro_formato(self):
+        """El admin muestra un error (no un 500) si la clave normalizada ya existe."""
+        User.objects.create_superuser(username="admin", password="test123")
+        self.client.login(username="admin", password="test123")
+        
+        response = self.client.post(reverse("admin:core_cliente_add"), {
+            "rut": "12.345.678-9", "nombre": "Otro Juan", "telefono": "1",
+            "vehiculos-TOTAL_FORMS": "1", "vehiculos-INITIAL_FORMS": "0",
+            "vehiculos-MIN_NUM_FORMS": "0", "vehiculos-MAX_NUM_FORMS": "1000",
+            "vehiculos-0-patente": "ab cd 12", "vehiculos-0-marca": self.marca.id,
+            "vehiculos-0-modelo": self.modelo.id, "vehiculos-0-anio": 2020,
+            "vehiculos-0-kilometraje": 1000,
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Ya existe un cliente con este RUT")
+        self.assertContains(response, "Ya existe un vehículo con esta patente")
+        self.assertEqual(Cliente.objects.count(), 1)
+    
+    def test_clean_permite_guardar_el_mismo_registro(self):
+        """La validación excluye al propio registro."""
+        self.cliente.full_clean()
+        self.vehiculo.full_clean()
+    
+    def test_rut_con_formato_reutiliza_el_cliente(self):
+        """'98.765.432-5' y '98765432-5' son el mismo cliente."""
+        existente = Cliente.objects.create(rut="98765432-5", nombre="María", telefono="1")
+        
+        response = self._solicitud(rut="98.765.432-5")
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Cliente.objects.filter(rut_normalizado="987654325").count(), 1)
+        self.assertEqual(OrdenTrabajo.objects.get(vehiculo__patente="EFGH34").cliente, existente)
+    
+    def test_patente_con_formato_no_se_duplica(self):
+        response = self._solicitud(patente="ab cd 12")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Vehiculo.objects.count(), 1)
+    
+    def test_autocompletado_por_prefijo(self):
+        """Un dígito inicial busca clientes por RUT; una letra, vehículos por patente."""
+        Cliente.objects.create(rut="12.399.000-1", nombre="Otro", telefono="1")
+        self.client.login(username='recepcionista', password='test123')
+        
+        with self.assertNumQueries(4):  # sesión + usuario + perfil + clientes
+            response = self.client.get(reverse('buscar_cliente_vehiculo'), {'q': '12.34'})
+        self.assertEqual([r["nombre"] for r in response.json()["resultados"]], ["Juan Pérez"])
+        
+        response = self.client.get(reverse('buscar_cliente_vehiculo'), {'q': 'abc'})
+        resultado, = response.json()["resultados"]
+        self.assertEqual(resultado["patente"], "ABCD12")
+        self.assertEqual(resultado["cliente"]["rut"], "12345678-9")
+        
+        response = self.client.get(reverse('buscar_cliente_vehiculo'), {'q': 'zz'})
+        self.assertEqual(response.json()["resultados"], [])
+    
+    def test_rango_de_prefijo(self):
+        from .models import filtro_prefijo
+        self.assertEqual(
+            filtro_prefijo("patente_normalizada", "AB1"),
+            {"patente_normalizada__gte": "AB1", "patente_normalizada__lt": "AB2"},
+        )
+
+
+class IngresoRecurrenteTests(BaseTestCase):
+    """Tests del ingreso de vehículos que vuelven al taller."""
+    
+    def _datos(self, **cambios):
+        datos = {
+            'rut': '12.345.678-9', 'nombre': 'Juan Pérez', 'telefono': '123456789', 'email': '',
+            'patente': 'abcd 12', 'marca': self.marca, 'modelo': self.modelo,
+            'anio': 2020, 'kilometraje': 60000, 'motivo': 'Mantención',
+            'descripcion': 'Pauta 60.000 km', 'fecha': date.today(),
+        }
+        datos.update(cambios)
+        return datos
+    
+    def test_vehiculo_recurrente_reutiliza_y_actualiza_kilometraje(self):
+        """La patente registrada abre la OT sobre el mismo vehículo y cliente."""
+        from .services.intake_service import IntakeService
+        servicio = IntakeService()
+        pendiente_id = servicio.catalogo_estados.id_de("PENDIENTE")
+        
+        # SAVEPOINT, vehículo+cliente, UPDATE km, INSERT OT,
+        # índice de búsqueda (consulta, SAVEPOINT, DELETE, INSERT, RELEASE), RELEASE
+        with self.assertNumQueries(10):
+            exito, mensaje, orden = servicio.registrar_solicitud(self._datos())
+        
+        self.assertTrue(exito, mensaje)
+        self.assertEqual(orden.vehiculo, self.vehiculo)
+        self.assertEqual(orden.cliente, self.cliente)
+        self.assertEqual(orden.estado_id, pendiente_id)
+        self.vehiculo.refresh_from_db()
+        self.assertEqual(self.vehiculo.kilometraje, 60000)
+        self.assertEqual(Vehiculo.objects.count(), 1)
+        self.assertEqual(Cliente.objects.count(), 1)
+    
+    def test_recurrente_con_otro_cliente_o_kilometraje_menor(self):
+        from .services.intake_service import IntakeService
+        servicio = IntakeService()
+        
+        exito, mensaje, _ = servicio.registrar_solicitud(self._datos(rut='98765432-5'))
+        self.assertFalse(exito)
+        self.assertIn("otro cliente", mensaje)
+        
+        exito, mensaje, _ = servicio.registrar_solicitud(self._datos(kilometraje=100))
+        self.assertFalse(exito)
+        self.assertIn("50000 km", mensaje)
+        self.assertFalse(OrdenTrabajo.objects.exists())
+    
+    def test_vista_registra_vehiculo_recurrente(self):
+        # (el RUT del cliente base no pasa el validador del formulario)
+        cliente = Cliente.objects.create(rut="98765432-5", nombre="María", telefono="1")
+        vehiculo = Vehiculo.objects.create(
+            cliente=cliente, patente="EFGH34", marca=self.marca, modelo=self.modelo,
+            anio=2021, kilometraje=30000
+        )
+        self.client.login(username='recepcionista', password='test123')
+        datos = self._datos(
+            rut="98.765.432-5", patente="efgh34", marca=self.marca.id, modelo=self.modelo.id
+        )
+        
+        response = self.client.post(reverse('registrar_solicitud'), datos)
+        
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(OrdenTrabajo.objects.get().vehiculo, vehiculo)
+    
+    def test_benchmark_no_deja_datos(self):
+        import io
+        from django.core.management import call_command
+        salida = io.StringIO()
+        
+        call_command("benchmark_recepcion", "--n", "10", "--recurrentes", "0.5", stdout=salida)
+        
+        self.assertIn("10 solicitudes", salida.getvalue())
+        self.assertFalse(OrdenTrabajo.objects.exists())
+        self.assertEqual(Vehiculo.objects.count(), 1)
@@ -12,6 +12,19 @@ urlpatterns = [
     
     # AJAX
     path("ajax/cargar-modelos/", views.cargar_modelos, name="cargar_modelos"),
+    path("ajax/buscar-cliente/", views.buscar_cliente_vehiculo, name="buscar_cliente_vehiculo"),
+
+    # API JSON (paginación por cursor: ?cursor=...&tamano=...)
+    path("api/planificacion/", views.api_planificacion, name="api_planificacion"),
+    path("api/inventario/", views.api_inventario, name="api_inventario"),
+    path("api/herramientas/", views.api_herramientas, name="api_herramientas"),
+    path("api/notificaciones/", views.api_notificaciones, name="api_notificaciones"),
+
+    # Exportación CSV/XLSX (?formato=csv|xlsx)
+    path("exportar/<str:nombre>/", views.exportar_datos, name="exportar_datos"),
+
+    # Búsqueda global (?q=...&tipo=...&formato=json)
+    path("buscar/", views.buscar, name="buscar"),
 
     # RECEPCIONISTA (HU001)
     path("solicitudes/registrar/", views.registrar_solicitud, name="registrar_solicitud"),
@@ -24,6 +37,10 @@ urlpatterns = [
     path("mecanico/mis-trabajos/", views.mis_trabajos, name="mis_trabajos"),
     path("mecanico/ot/<int:ot_id>/bitacora/", views.registrar_bitacora, name="registrar_bitacora"),
     path("encargado/ot/<int:ot_id>/informe/", views.generar_informe_pdf, name="generar_informe_pdf"),
+    path("informes/<str:trabajo_id>/", views.estado_informe_pdf, name="estado_informe_pdf"),
+    path("informes/<str:trabajo_id>/descargar/", views.descargar_informe_pdf, name="descargar_informe_pdf"),
+    path("encargado/informes/exportar/", views.exportar_informes, name="exportar_informes"),
+    path("encargado/informes/exportar/<str:lote_id>/", views.descargar_lote_informes, name="descargar_lote_informes"),
 
 
     # CONTROL DE CALIDAD (CU-06)
@@ -31,6 +48,7 @@ urlpatterns = [
 
 # Inventario
 path("inventario/", views.inventario, name="inventario"),
+path("inventario/reposicion/", views.reposicion, name="reposicion"),
 path("inventario/repuesto/<int:id>/editar/", views.editar_repuesto, name="editar_repuesto"),
 path("inventario/herramientas/", views.herramientas, name="herramientas"),
 path("inventario/herramienta/<int:id>/editar/", views.editar_herramienta, name="editar_herramienta"),
@@ -45,6 +63,7 @@ path("herramienta/<int:id>/devolver/", views.devolver_herramienta, name="devolve
 # Notificaciones
 path("notificaciones/", views.notificaciones, name="notificaciones"),
 path("notificaciones/leida/<int:id>/", views.marcar_notificacion_leida, name="notificacion_leida"),
+path("notificaciones/leidas/", views.marcar_notificaciones_leidas, name="notificaciones_leidas"),
 
 
 ]
@@ -5,6 +5,22 @@ import re
 from django.core.exceptions import ValidationError
 
 
+def normalizar_rut(value):
+    """
+    Forma canónica de un RUT: sin puntos, guion ni espacios y con K mayúscula.
+    Ej: "12.345.678-k" -> "12345678K"
+    """
+    return re.sub(r"[.\-\s]", "", value or "").upper()
+
+
+def normalizar_patente(value):
+    """
+    Forma canónica de una patente: sin espacios, guiones ni puntos y en mayúsculas.
+    Ej: "ab 12-34" -> "AB1234"
+    """
+    return re.sub(r"[.\-\s]", "", value or "").upper()
+
+
 def validar_rut_chileno(value):
     """
     Valida RUT chileno con formato: 12345678-9 o 12.345.678-9
@@ -13,7 +29,7 @@ def validar_rut_chileno(value):
         return
 
     # Limpiar el RUT
-    rut_limpio = value.replace(".", "").replace("-", "").upper()
+    rut_limpio = normalizar_rut(value)
 
     if len(rut_limpio) < 8 or len(rut_limpio) > 9:
         raise ValidationError("RUT inválido")
@@ -63,8 +79,8 @@ def validar_patente_chilena(value):
     if not value:
         return
 
-    # Normalizar: quitar espacios y convertir a mayúsculas
-    patente = value.replace(" ", "").upper()
+    # Normalizar: quitar espacios y guiones y convertir a mayúsculas
+    patente = normalizar_patente(value)
 
     # Formato antiguo: 4 letras + 2 números (ej: ABCD12)
     patron_antiguo = re.compile(r'^[A-Z]{4}\d{2}$')
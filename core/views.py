@@ -2,29 +2,49 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.utils import timezone
-from django.template.loader import get_template
-from django.http import HttpResponse, JsonResponse
-from xhtml2pdf import pisa
+from django.http import JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.db import transaction
+from django.db.models import Count, Q
 from datetime import date
+import tempfile
 
 from .models import (
     PerfilUsuario, Cliente, Vehiculo, MarcaVehiculo, ModeloVehiculo,
-    OrdenTrabajo, EstadoOT, BitacoraTrabajo, FotoBitacora,
+    OrdenTrabajo, BitacoraTrabajo, FotoBitacora,
     Repuesto, Herramienta, HerramientaEnUso, Mecanico, ZonaTrabajo,
-    ControlCalidad, Notificacion, TipoNotificacion, EspecialidadMecanico
+    ControlCalidad, Notificacion, TipoNotificacion, EspecialidadMecanico, ConsumoRepuesto
 )
 from .forms import (
     RegistroUsuarioForm, RegistrarSolicitudForm, AsignarOTForm,
     BitacoraForm, ControlCalidadForm, EditarRepuestoForm,
-    MovimientoRepuestoForm, EditarHerramientaForm
+    MovimientoRepuestoForm, EditarHerramientaForm, ExportarInformesForm
 )
 from .decorators import requiere_perfil_usuario, requiere_rol
-from .validators import validar_fecha_estimada_mayor_ingreso
-from .helpers import obtener_mecanico_desde_usuario
+from .validators import validar_fecha_estimada_mayor_ingreso, normalizar_rut
+from .helpers import obtener_mecanico_desde_usuario, contar_notificaciones_no_leidas
 from .services.inventory_manager import InventoryManager
 from .services.assignment_service import AssignmentService
+from .services.intake_service import IntakeService
 from .services.notification_service import NotificationService
+from .services.state_catalog import get_state_catalog
+from .services.dashboard_cache import DashboardCache
+from .services.keyset_paginator import KeysetPaginator
+from .services.pdf_report_queue import PdfReportQueue, get_pdf_report_queue
+from .services.data_export import DataExporter, EXPORTACIONES
+from .services.reorder_planner import ReorderPlanner
+from .services.search_index import SearchIndex, TIPOS
+from .services.report_builder import html_informe, huella_informe, ots_para_lote, documentos_lote
+
+
+def _respuesta_pagina(pagina, serializar):
+    """Respuesta JSON común de los endpoints paginados por cursor."""
+    return JsonResponse({
+        "resultados": [serializar(elemento) for elemento in pagina],
+        "siguiente": pagina.cursor_siguiente,
+    })
 
 
 # ============================
@@ -87,6 +107,7 @@ def registro_view(request):
                     nombre="General"
                 )
                 Mecanico.objects.create(
+                    perfil=perfil,
                     nombre=nombre_completo,
                     especialidad=especialidad_default
                 )
@@ -109,8 +130,10 @@ def dashboard(request):
     """Dashboard principal según el rol del usuario."""
     perfil = request.user.perfilusuario
     
-    # Contador de notificaciones no leídas
-    notif_no_leidas = perfil.notificaciones_recibidas.filter(leida=False).count()
+    # Contador de notificaciones no leídas (compartido con el context processor)
+    notif_no_leidas = contar_notificaciones_no_leidas(request)
+    catalogo_estados = get_state_catalog()
+    dashboard_cache = DashboardCache()
     
     # RECEPCIONISTA
     if perfil.rol == "RECEPCIONISTA":
@@ -120,17 +143,22 @@ def dashboard(request):
     
     # ENCARGADO DE TALLER
     if perfil.rol == "ENCARGADO_TALLER":
-        pendientes = OrdenTrabajo.objects.filter(estado__nombre="PENDIENTE").count()
-        en_progreso = OrdenTrabajo.objects.filter(estado__nombre="EN_PROGRESO").count()
-        atrasadas = OrdenTrabajo.objects.filter(
-            fecha_estimada_entrega__lt=date.today(),
-            estado__nombre="EN_PROGRESO"
-        ).count()
+        # Todos los contadores en una sola consulta con agregación condicional
+        en_progreso_ids = catalogo_estados.ids_de("EN_PROGRESO")
+        contadores = dashboard_cache.obtener(
+            DashboardCache.clave_encargado(),
+            lambda: OrdenTrabajo.objects.aggregate(
+                pendientes=Count("id", filter=Q(estado_id__in=catalogo_estados.ids_de("PENDIENTE"))),
+                en_progreso=Count("id", filter=Q(estado_id__in=en_progreso_ids)),
+                atrasadas=Count("id", filter=Q(
+                    estado_id__in=en_progreso_ids,
+                    fecha_estimada_entrega__lt=date.today()
+                )),
+            )
+        )
         
         return render(request, "core/dashboard/encargado.html", {
-            "pendientes": pendientes,
-            "en_progreso": en_progreso,
-            "atrasadas": atrasadas,
+            **contadores,
             "notif_no_leidas": notif_no_leidas,
         })
     
@@ -140,10 +168,12 @@ def dashboard(request):
         mecanico_obj = obtener_mecanico_desde_usuario(request.user)
         trabajos = 0
         if mecanico_obj:
-            trabajos = OrdenTrabajo.objects.filter(
-                mecanico=mecanico_obj,
-                estado__nombre="EN_PROGRESO"
-            ).count()
+            trabajos = dashboard_cache.obtener(
+                DashboardCache.clave_mecanico(mecanico_obj.pk),
+                lambda: OrdenTrabajo.objects.filter(mecanico=mecanico_obj).aggregate(
+                    trabajos=Count("id", filter=Q(estado_id__in=catalogo_estados.ids_de("EN_PROGRESO")))
+                )["trabajos"]
+            )
         
         return render(request, "core/dashboard/mecanico.html", {
             "trabajos": trabajos,
@@ -152,10 +182,26 @@ def dashboard(request):
     
     # ENCARGADO DE BODEGA
     if perfil.rol == "ENCARGADO_BODEGA":
-        stock_bajo = Repuesto.objects.filter(stock__lt=3).count()
+        stock_bajo = dashboard_cache.obtener(
+            DashboardCache.clave_bodega(),
+            lambda: Repuesto.objects.stock_bajo().count()
+        )
+        # Estadísticas precalculadas por el comando calcular_consumo
+        mayor_consumo = dashboard_cache.obtener(
+            DashboardCache.clave_consumo(),
+            lambda: list(
+                ConsumoRepuesto.objects.filter(consumo_reciente__gt=0)
+                .order_by("-consumo_reciente")
+                .values(
+                    "repuesto__codigo", "repuesto__nombre", "repuesto__stock",
+                    "consumo_reciente", "stock_seguridad",
+                )[:5]
+            )
+        )
         
         return render(request, "core/dashboard/bodega.html", {
             "stock_bajo": stock_bajo,
+            "mayor_consumo": mayor_consumo,
             "notif_no_leidas": notif_no_leidas,
         })
     
@@ -172,54 +218,19 @@ def dashboard(request):
 @login_required
 @requiere_rol("RECEPCIONISTA")
 def registrar_solicitud(request):
-    """Registrar nueva solicitud de trabajo."""
+    """
+    Registrar nueva solicitud de trabajo.
+    Si la patente ya está registrada (vehículo que vuelve al taller) se reutiliza
+    el vehículo y su cliente y solo se actualiza el kilometraje.
+    """
     if request.method == "POST":
         form = RegistrarSolicitudForm(request.POST)
         if form.is_valid():
-            # Crear o actualizar cliente
-            cliente, _ = Cliente.objects.get_or_create(
-                rut=form.cleaned_data["rut"],
-                defaults={
-                    "nombre": form.cleaned_data["nombre"],
-                    "telefono": form.cleaned_data["telefono"],
-                    "email": form.cleaned_data.get("email", ""),
-                }
-            )
-            
-            # Validar que no exista vehículo con esa patente
-            patente = form.cleaned_data["patente"]
-            if Vehiculo.objects.filter(patente=patente).exists():
-                messages.error(request, f"Ya existe un vehículo con la patente {patente}.")
-                return render(request, "core/recepcion/registrar_solicitud.html", {
-                    "form": form,
-                    "marcas": MarcaVehiculo.objects.all(),
-                })
-            
-            # Crear vehículo
-            vehiculo = Vehiculo.objects.create(
-                cliente=cliente,
-                patente=patente,
-                marca=form.cleaned_data["marca"],
-                modelo=form.cleaned_data["modelo"],
-                anio=form.cleaned_data["anio"],
-                kilometraje=form.cleaned_data["kilometraje"],
-            )
-            
-            # Obtener estado PENDIENTE
-            estado = EstadoOT.objects.get_or_create(nombre="PENDIENTE")[0]
-            
-            # Crear OT
-            OrdenTrabajo.objects.create(
-                cliente=cliente,
-                vehiculo=vehiculo,
-                estado=estado,
-                motivo_ingreso=form.cleaned_data["motivo"],
-                descripcion_problema=form.cleaned_data["descripcion"],
-                fecha_ingreso=form.cleaned_data["fecha"],
-            )
-            
-            messages.success(request, "Solicitud registrada correctamente.")
-            return redirect("dashboard")
+            exito, mensaje, _ = IntakeService().registrar_solicitud(form.cleaned_data)
+            if exito:
+                messages.success(request, mensaje)
+                return redirect("dashboard")
+            messages.error(request, mensaje)
     else:
         form = RegistrarSolicitudForm()
     
@@ -233,24 +244,51 @@ def registrar_solicitud(request):
 # ENCARGADO DE TALLER
 # ============================
 
+ORDEN_PLANIFICACION = ("fecha_ingreso", "id")
+
+
+def _consulta_planificacion():
+    return OrdenTrabajo.objects.para_listado().filter(
+        estado_id__in=get_state_catalog().ids_de("PENDIENTE", "EN_ESPERA")
+    )
+
+
 @login_required
 @requiere_rol("ENCARGADO_TALLER")
 def planificacion(request):
     """Vista de planificación de OTs."""
-    pendientes = OrdenTrabajo.objects.filter(
-        estado__nombre__in=["PENDIENTE", "EN_ESPERA"]
-    ).order_by("fecha_ingreso")
+    pendientes = KeysetPaginator.desde_request(request, ORDEN_PLANIFICACION).paginar(
+        _consulta_planificacion(), request.GET.get("cursor")
+    )
     
     mecanicos = Mecanico.objects.all().order_by("especialidad__nombre", "nombre")
     zonas = ZonaTrabajo.objects.filter(activa=True)
     
     return render(request, "core/encargado/planificacion.html", {
         "pendientes": pendientes,
+        "pagina": pendientes,
         "mecanicos": mecanicos,
         "zonas": zonas,
     })
 
 
+@login_required
+@requiere_rol("ENCARGADO_TALLER")
+def api_planificacion(request):
+    """Versión JSON de planificacion, paginada por cursor."""
+    pagina = KeysetPaginator.desde_request(request, ORDEN_PLANIFICACION).paginar(
+        _consulta_planificacion(), request.GET.get("cursor")
+    )
+    return _respuesta_pagina(pagina, lambda ot: {
+        "id": ot.id,
+        "patente": ot.vehiculo.patente,
+        "cliente": ot.cliente.nombre,
+        "fecha_ingreso": ot.fecha_ingreso,
+        "estado": ot.estado.nombre,
+        "prioridad": ot.prioridad,
+    })
+
+
 @login_required
 @requiere_rol("ENCARGADO_TALLER")
 def detalle_ot(request, ot_id):
@@ -315,41 +353,145 @@ def detalle_ot(request, ot_id):
     })
 
 
+def _respuesta_estado_informe(request, trabajo_id, estado, status=200):
+    """Estado de un informe en JSON (?formato=json) o como página que se recarga sola."""
+    if request.GET.get("formato") == "json":
+        return JsonResponse({
+            "trabajo": trabajo_id,
+            "estado": estado,
+            "estado_url": reverse("estado_informe_pdf", args=[trabajo_id]),
+            "descarga_url": reverse("descargar_informe_pdf", args=[trabajo_id]),
+        }, status=status)
+    
+    return render(request, "core/encargado/estado_informe.html", {
+        "trabajo_id": trabajo_id,
+        "estado": estado,
+        "ot_id": PdfReportQueue.ot_de(trabajo_id),
+    }, status=status)
+
+
 @login_required
 @requiere_rol("ENCARGADO_TALLER", "RECEPCIONISTA")
 def generar_informe_pdf(request, ot_id):
-    """Generar PDF de informe de OT."""
-    ot = get_object_or_404(OrdenTrabajo, pk=ot_id)
-    
-    # Calcular totales
-    total_servicios = ot.total_servicios()
-    total_repuestos = ot.total_repuestos()
-    total_general = ot.total_general()
-    
-    # Calcular tiempo total
-    tiempo_total = sum([b.tiempo_ejecucion_minutos for b in ot.bitacoras.all()])
-    
-    template_path = "core/encargado/informe_pdf.html"
-    context = {
-        "ot": ot,
-        "total_servicios": total_servicios,
-        "total_repuestos": total_repuestos,
-        "total_general": total_general,
-        "tiempo_total": tiempo_total,
-    }
-    
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f"attachment; filename=informe_OT_{ot.id}.pdf"
+    """
+    Encola el PDF del informe de OT.
+    El renderizado corre en el pool de procesos de PdfReportQueue; la respuesta
+    entrega el id del trabajo y las URLs de estado y descarga. Si la OT no
+    cambió desde el último informe, se reutiliza el PDF cacheado.
+    """
+    ot = get_object_or_404(OrdenTrabajo.objects.para_informe(), pk=ot_id)
     
-    pisa_status = pisa.CreatePDF(html, dest=response)
+    cola = get_pdf_report_queue()
+    trabajo_id = cola.solicitar(ot.id, huella_informe(ot), lambda: html_informe(ot))
     
-    if pisa_status.err:
-        return HttpResponse("Hubo un error generando el PDF", status=500)
+    if request.GET.get("formato") == "json":
+        return _respuesta_estado_informe(request, trabajo_id, cola.estado(trabajo_id), status=202)
+    return redirect("estado_informe_pdf", trabajo_id=trabajo_id)
+
+
+@login_required
+@requiere_rol("ENCARGADO_TALLER", "RECEPCIONISTA")
+def estado_informe_pdf(request, trabajo_id):
+    """Consulta el estado de un informe encolado."""
+    cola = get_pdf_report_queue()
+    estado = cola.estado(trabajo_id)
+    if estado is None or cola.es_lote(trabajo_id):
+        raise Http404("Informe no encontrado")
+    return _respuesta_estado_informe(request, trabajo_id, estado)
+
+
+@login_required
+@requiere_rol("ENCARGADO_TALLER", "RECEPCIONISTA")
+def descargar_informe_pdf(request, trabajo_id):
+    """Descarga un informe terminado."""
+    cola = get_pdf_report_queue()
+    archivo = None if cola.es_lote(trabajo_id) else cola.abrir(trabajo_id)
+    if archivo is None:
+        # Sin estado: no existe o el desalojo LRU acaba de eliminar el PDF
+        if cola.estado(trabajo_id) is None or cola.es_lote(trabajo_id):
+            raise Http404("Informe no encontrado")
+        # Pendiente o con error: volver a la página de estado
+        return redirect("estado_informe_pdf", trabajo_id=trabajo_id)
+    
+    # FileResponse entrega el archivo por bloques (wsgi.file_wrapper/sendfile)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"informe_OT_{cola.ot_de(trabajo_id)}.pdf",
+        content_type="application/pdf",
+    )
+
+
+@login_required
+@requiere_rol("ENCARGADO_TALLER")
+def exportar_informes(request):
+    """
+    Exportación masiva de informes PDF en un ZIP (ej: cierre de mes).
+    Las OTs se cargan con todas sus relaciones de una vez y los PDFs se
+    renderizan en paralelo en el pool de PdfReportQueue.
+    """
+    cola = get_pdf_report_queue()
+    
+    # Consulta de estado de un lote ya encolado
+    lote_id = request.GET.get("lote")
+    if lote_id:
+        estado = cola.estado(lote_id) if cola.es_lote(lote_id) else None
+        if estado is None:
+            raise Http404("Exportación no encontrada")
+        if request.GET.get("formato") == "json":
+            return JsonResponse({
+                "lote": lote_id,
+                "estado": estado,
+                "descarga_url": reverse("descargar_lote_informes", args=[lote_id]),
+            })
+        return render(request, "core/encargado/exportar_informes.html", {
+            "form": ExportarInformesForm(),
+            "lote_id": lote_id,
+            "estado": estado,
+        })
     
-    return response
+    form = ExportarInformesForm(request.POST if request.method == "POST" else None)
+    if form.is_bound and form.is_valid():
+        estado = form.cleaned_data["estado"]
+        ots = ots_para_lote(
+            desde=form.cleaned_data["desde"],
+            hasta=form.cleaned_data["hasta"],
+            estado_id=estado.id if estado else None,
+        )
+        cantidad = ots.count()
+        maximo = getattr(settings, "INFORMES_LOTE_MAXIMO", 500)
+        
+        if cantidad == 0:
+            messages.warning(request, "No hay órdenes que coincidan con el filtro.")
+        elif cantidad > maximo:
+            messages.error(request, f"El filtro incluye {cantidad} órdenes (máximo {maximo}). Acote el rango.")
+        else:
+            lote_id = cola.encolar_lote(documentos_lote(ots))
+            return redirect(f"{reverse('exportar_informes')}?lote={lote_id}")
+    
+    return render(request, "core/encargado/exportar_informes.html", {"form": form})
+
+
+@login_required
+@requiere_rol("ENCARGADO_TALLER")
+def descargar_lote_informes(request, lote_id):
+    """Descarga el ZIP de una exportación masiva terminada."""
+    cola = get_pdf_report_queue()
+    if not cola.es_lote(lote_id) or cola.estado(lote_id) is None:
+        raise Http404("Exportación no encontrada")
+    
+    archivo = cola.abrir(lote_id)
+    if archivo is None:
+        if cola.estado(lote_id) is None:
+            raise Http404("Exportación no encontrada")
+        return redirect(f"{reverse('exportar_informes')}?lote={lote_id}")
+    
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"informes_{date.today():%Y%m%d}.zip",
+        content_type="application/zip",
+    )
 
 
 @login_required
@@ -369,29 +511,30 @@ def control_calidad(request, ot_id):
     if request.method == "POST":
         form = ControlCalidadForm(request.POST)
         if form.is_valid():
-            control = form.save(commit=False)
-            control.orden = ot
-            control.responsable = request.user.username
-            control.save()
-            
-            # Cambiar estado de la OT
-            if control.resultado == "APROBADO":
-                estado_finalizado = EstadoOT.objects.get_or_create(nombre="FINALIZADO")[0]
-                ot.estado = estado_finalizado
-            else:
-                estado_pendiente = EstadoOT.objects.get_or_create(nombre="PENDIENTE")[0]
-                ot.estado = estado_pendiente
-            
-            ot.save()
-            
-            # Notificación automática usando NotificationService con patrón Observer
-            # La señal post_save también notificará automáticamente
-            notification_service = NotificationService()
-            notification_service.notificar_control_calidad(
-                orden=ot,
-                resultado=control.resultado,
-                emisor=request.user.perfilusuario
-            )
+            # Cambio de la OT y eventos del outbox en la misma transacción
+            with transaction.atomic():
+                control = form.save(commit=False)
+                control.orden = ot
+                control.responsable = request.user.username
+                control.save()
+                
+                # Cambiar estado de la OT
+                catalogo_estados = get_state_catalog()
+                if control.resultado == "APROBADO":
+                    ot.estado_id = catalogo_estados.id_de("FINALIZADO")
+                else:
+                    ot.estado_id = catalogo_estados.id_de("PENDIENTE")
+                
+                ot.save()
+                
+                # Notificación automática usando NotificationService con patrón Observer
+                # La señal post_save también notificará automáticamente
+                notification_service = NotificationService()
+                notification_service.notificar_control_calidad(
+                    orden=ot,
+                    resultado=control.resultado,
+                    emisor=request.user.perfilusuario
+                )
             
             messages.success(request, "Control de calidad registrado.")
             return redirect("detalle_ot", ot_id=ot.id)
@@ -422,21 +565,21 @@ def mis_trabajos(request):
         messages.warning(request, "Tu perfil de mecánico no está completamente configurado. Contacta al administrador.")
         trabajos = []
     else:
-        trabajos = OrdenTrabajo.objects.filter(
+        catalogo_estados = get_state_catalog()
+        trabajos = OrdenTrabajo.objects.para_listado().filter(
             mecanico=mecanico_obj,
-            estado__nombre__in=["EN_PROGRESO", "PENDIENTE"]
+            estado_id__in=catalogo_estados.ids_de("EN_PROGRESO", "PENDIENTE")
         ).order_by("fecha_ingreso")
         
         # ALERTAS DE ATRASO (HU010) - Usa NotificationService con patrón Observer
-        notification_service = NotificationService()
-        
-        for ot in trabajos:
-            if ot.fecha_estimada_entrega and ot.estado.nombre != "FINALIZADO":
-                if date.today() > ot.fecha_estimada_entrega:
-                    notification_service.notificar_atraso(
-                        orden=ot,
-                        emisor=request.user.perfilusuario
-                    )
+        # (una consulta para saber qué OTs ya fueron avisadas)
+        atrasadas = [
+            ot for ot in trabajos
+            if ot.fecha_estimada_entrega
+            and catalogo_estados.nombre_de(ot.estado_id) != "FINALIZADO"
+            and date.today() > ot.fecha_estimada_entrega
+        ]
+        NotificationService().notificar_atrasos(atrasadas, emisor=request.user.perfilusuario)
     
     return render(request, "core/mecanico/mis_trabajos.html", {"trabajos": trabajos})
 
@@ -463,31 +606,33 @@ def registrar_bitacora(request, ot_id):
     if request.method == "POST":
         form = BitacoraForm(request.POST, request.FILES)
         if form.is_valid():
-            bitacora = form.save(commit=False)
-            bitacora.orden = ot
-            bitacora.mecanico = mecanico_obj
-            bitacora.save()
-            
-            # Guardar fotos
-            imagenes = request.FILES.getlist("imagenes")
-            for img in imagenes:
-                FotoBitacora.objects.create(bitacora=bitacora, imagen=img)
-            
-            # Notificación automática de bitácora registrada (patrón Observer)
-            # La señal post_save también notificará automáticamente
-            notification_service.notificar_bitacora_registrada(
-                orden=ot,
-                emisor=request.user.perfilusuario
-            )
-            
-            # Solicitud de cambio (HU007) - Usa NotificationService
-            solicitud_cambio = form.cleaned_data.get("solicitud_cambio", "").strip()
-            if solicitud_cambio:
-                notification_service.notificar_solicitud_cambio(
+            # Bitácora y eventos del outbox en la misma transacción
+            with transaction.atomic():
+                bitacora = form.save(commit=False)
+                bitacora.orden = ot
+                bitacora.mecanico = mecanico_obj
+                bitacora.save()
+                
+                # Guardar fotos
+                imagenes = request.FILES.getlist("imagenes")
+                for img in imagenes:
+                    FotoBitacora.objects.create(bitacora=bitacora, imagen=img)
+                
+                # Notificación automática de bitácora registrada (patrón Observer)
+                # La señal post_save también notificará automáticamente
+                notification_service.notificar_bitacora_registrada(
                     orden=ot,
-                    mensaje=solicitud_cambio,
                     emisor=request.user.perfilusuario
                 )
+                
+                # Solicitud de cambio (HU007) - Usa NotificationService
+                solicitud_cambio = form.cleaned_data.get("solicitud_cambio", "").strip()
+                if solicitud_cambio:
+                    notification_service.notificar_solicitud_cambio(
+                        orden=ot,
+                        mensaje=solicitud_cambio,
+                        emisor=request.user.perfilusuario
+                    )
             
             messages.success(request, "Bitácora registrada correctamente.")
             return redirect("mis_trabajos")
@@ -504,28 +649,64 @@ def registrar_bitacora(request, ot_id):
 # INVENTARIO
 # ============================
 
+ORDEN_INVENTARIO = ("nombre", "id")
+
+
 @login_required
 @requiere_rol("ENCARGADO_BODEGA", "ENCARGADO_TALLER")
 def inventario(request):
     """
-    Vista de inventario de repuestos.
-    Usa InventoryManager con Inyección de Dependencias.
+    Vista de inventario de repuestos (solo lectura).
+    Las alertas de stock bajo las generan los movimientos de stock
+    (InventoryManager.realizar_movimiento_stock) y el comando alertas_stock_bajo.
     """
-    # Inyección de Dependencias: Crear InventoryManager
-    inventory_manager = InventoryManager()
-    
-    repuestos = Repuesto.objects.all().order_by("nombre")
-    
-    # ALERTA DE STOCK BAJO - Usa InventoryManager
-    repuestos_stock_bajo = inventory_manager.verificar_stock_bajo(umbral=3)
-    for repuesto in repuestos_stock_bajo:
-        inventory_manager.crear_alerta_stock_bajo(
-            repuesto=repuesto,
-            emisor=request.user.perfilusuario
-        )
+    repuestos = KeysetPaginator.desde_request(request, ORDEN_INVENTARIO).paginar(
+        Repuesto.objects.all(), request.GET.get("cursor")
+    )
     
     return render(request, "core/inventario/inventario.html", {
         "repuestos": repuestos,
+        "pagina": repuestos,
+    })
+
+
+@login_required
+@requiere_rol("ENCARGADO_BODEGA", "ENCARGADO_TALLER")
+def api_inventario(request):
+    """Versión JSON del inventario de repuestos, paginada por cursor."""
+    pagina = KeysetPaginator.desde_request(request, ORDEN_INVENTARIO).paginar(
+        Repuesto.objects.all(), request.GET.get("cursor")
+    )
+    return _respuesta_pagina(pagina, lambda r: {
+        "id": r.id,
+        "codigo": r.codigo,
+        "nombre": r.nombre,
+        "stock": r.stock,
+        "precio_venta": r.precio_venta,
+        "estado": r.estado,
+    })
+
+
+@login_required
+@requiere_rol("ENCARGADO_BODEGA", "ENCARGADO_TALLER")
+def reposicion(request):
+    """
+    Plan de reposición: repuestos más próximos a quedar sin stock y orden de
+    compra sugerida por proveedor.
+    """
+    try:
+        k = min(max(int(request.GET.get("k", 0)), 0), settings.PAGINACION_TAMANO_MAXIMO)
+    except ValueError:
+        k = 0
+    
+    planner = ReorderPlanner()
+    urgentes = planner.urgentes(k or None)
+    orden_compra = planner.orden_compra(urgentes)
+    
+    return render(request, "core/inventario/reposicion.html", {
+        "urgentes": urgentes,
+        "orden_compra": orden_compra,
+        "ventana_dias": getattr(settings, "CONSUMO_VENTANA_MOVIL_DIAS", 30),
     })
 
 
@@ -567,7 +748,8 @@ def movimiento_repuesto(request, id):
             exito, mensaje = inventory_manager.realizar_movimiento_stock(
                 repuesto_id=repuesto.id,
                 tipo=tipo,
-                cantidad=cantidad
+                cantidad=cantidad,
+                emisor=request.user.perfilusuario
             )
             
             if not exito:
@@ -588,13 +770,35 @@ def movimiento_repuesto(request, id):
     })
 
 
+ORDEN_HERRAMIENTAS = ("nombre", "id")
+
+
 @login_required
 @requiere_rol("ENCARGADO_BODEGA", "MECANICO")
 def herramientas(request):
     """Lista de herramientas."""
-    herramientas = Herramienta.objects.all()
+    herramientas = KeysetPaginator.desde_request(request, ORDEN_HERRAMIENTAS).paginar(
+        Herramienta.objects.select_related("responsable_asignado"), request.GET.get("cursor")
+    )
     return render(request, "core/inventario/herramientas.html", {
         "herramientas": herramientas,
+        "pagina": herramientas,
+    })
+
+
+@login_required
+@requiere_rol("ENCARGADO_BODEGA", "MECANICO")
+def api_herramientas(request):
+    """Versión JSON de la lista de herramientas, paginada por cursor."""
+    pagina = KeysetPaginator.desde_request(request, ORDEN_HERRAMIENTAS).paginar(
+        Herramienta.objects.select_related("responsable_asignado"), request.GET.get("cursor")
+    )
+    return _respuesta_pagina(pagina, lambda h: {
+        "id": h.id,
+        "codigo": h.codigo,
+        "nombre": h.nombre,
+        "estado": h.estado,
+        "responsable": h.responsable_asignado.nombre if h.responsable_asignado else None,
     })
 
 
@@ -640,7 +844,7 @@ def retirar_herramienta(request, id):
     # Crear registro de herramienta en uso
     ot_activa = OrdenTrabajo.objects.filter(
         mecanico=mecanico_obj,
-        estado__nombre="EN_PROGRESO"
+        estado_id__in=get_state_catalog().ids_de("EN_PROGRESO")
     ).first()
     
     if ot_activa:
@@ -690,30 +894,13 @@ def devolver_herramienta(request, id):
     # Obtener perfil del mecánico (emisor de la notificación)
     perfil_mecanico = request.user.perfilusuario
     
-    # Crear notificaciones para los roles relevantes
+    # Notificar a todos los encargados de bodega y de taller
     mensaje = f"El mecánico {mecanico_obj.nombre} ha devuelto la herramienta '{herramienta.nombre}'."
-    
-    # Notificar a Encargado de Bodega
-    perfil_encargado_bodega = PerfilUsuario.objects.filter(rol="ENCARGADO_BODEGA").first()
-    if perfil_encargado_bodega:
-        Notificacion.objects.create(
-            tipo=TipoNotificacion.MENSAJE_GENERAL,
-            orden=None,
-            mensaje=mensaje,
-            emisor=perfil_mecanico,
-            receptor=perfil_encargado_bodega
-        )
-    
-    # Notificar a Encargado de Taller
-    perfil_encargado_taller = PerfilUsuario.objects.filter(rol="ENCARGADO_TALLER").first()
-    if perfil_encargado_taller:
-        Notificacion.objects.create(
-            tipo=TipoNotificacion.MENSAJE_GENERAL,
-            orden=None,
-            mensaje=mensaje,
-            emisor=perfil_mecanico,
-            receptor=perfil_encargado_taller
-        )
+    NotificationService().notificar_roles(
+        ["ENCARGADO_BODEGA", "ENCARGADO_TALLER"],
+        mensaje,
+        emisor=perfil_mecanico
+    )
     
     messages.success(request, "Herramienta devuelta correctamente.")
     return redirect("herramientas")
@@ -723,18 +910,42 @@ def devolver_herramienta(request, id):
 # NOTIFICACIONES
 # ============================
 
+# Más recientes primero; coincide con el índice (receptor, creada_en)
+ORDEN_NOTIFICACIONES = ("-creada_en", "-id")
+
+
 @login_required
 @requiere_perfil_usuario
 def notificaciones(request):
     """Lista de notificaciones del usuario."""
     perfil = request.user.perfilusuario
     
-    lista = Notificacion.objects.filter(
-        receptor=perfil
-    ).order_by("-creada_en")
+    lista = KeysetPaginator.desde_request(request, ORDEN_NOTIFICACIONES).paginar(
+        Notificacion.objects.filter(receptor=perfil), request.GET.get("cursor")
+    )
     
     return render(request, "core/notificaciones/lista.html", {
-        "notificaciones": lista
+        "notificaciones": lista,
+        "pagina": lista,
+        "tipos": TipoNotificacion.choices,
+    })
+
+
+@login_required
+@requiere_perfil_usuario
+def api_notificaciones(request):
+    """Versión JSON de las notificaciones del usuario, paginada por cursor."""
+    pagina = KeysetPaginator.desde_request(request, ORDEN_NOTIFICACIONES).paginar(
+        Notificacion.objects.filter(receptor=request.user.perfilusuario), request.GET.get("cursor")
+    )
+    return _respuesta_pagina(pagina, lambda n: {
+        "id": n.id,
+        "tipo": n.tipo,
+        "mensaje": n.mensaje,
+        "orden": n.orden_id,
+        "creada_en": n.creada_en,
+        "leida": n.leida,
+        "repeticiones": n.repeticiones,
     })
 
 
@@ -754,6 +965,134 @@ def marcar_notificacion_leida(request, id):
     return redirect("notificaciones")
 
 
+def _filtros_marcar_leidas(request):
+    """Filtros de marcar_leidas desde el POST (None si los ids no son válidos)."""
+    filtros = {}
+    try:
+        if request.POST.getlist("ids"):
+            filtros["ids"] = [int(i) for i in request.POST.getlist("ids")]
+        if request.POST.get("orden"):
+            filtros["orden_id"] = int(request.POST["orden"])
+    except ValueError:
+        filtros = None  # Ids manipulados: no se marca nada
+    if filtros is not None and request.POST.get("tipo"):
+        filtros["tipo"] = request.POST["tipo"]
+    return filtros
+
+
+@login_required
+@requiere_perfil_usuario
+def marcar_notificaciones_leidas(request):
+    """
+    Marca varias notificaciones como leídas (POST): todas, las de un tipo, las
+    de una OT o los ids seleccionados. Con ?formato=json responde JSON.
+    """
+    if request.method != "POST":
+        return redirect("notificaciones")
+    
+    # "Marcar todas" ignora cualquier otro filtro que venga en el POST
+    if request.POST.get("todas") == "1":
+        filtros = {}
+    else:
+        filtros = _filtros_marcar_leidas(request)
+    
+    # Sin filtros solo se marcan todas si se pidió explícitamente
+    if filtros is None or (not filtros and request.POST.get("todas") != "1"):
+        marcadas = 0
+    else:
+        marcadas = NotificationService().marcar_leidas(request.user.perfilusuario, **filtros)
+    
+    if request.GET.get("formato") == "json":
+        return JsonResponse({"marcadas": marcadas})
+    
+    messages.success(request, f"{marcadas} notificación(es) marcada(s) como leída(s).")
+    return redirect("notificaciones")
+
+
+# ============================
+# EXPORTACIÓN DE DATOS (CSV / XLSX)
+# ============================
+
+@login_required
+@requiere_perfil_usuario
+def exportar_datos(request, nombre):
+    """
+    Exporta órdenes, repuestos o notificaciones.
+    El CSV se envía por streaming y el XLSX (si openpyxl está instalado) se arma
+    en un archivo temporal; en ambos casos las filas se leen por bloques.
+    """
+    if nombre not in EXPORTACIONES:
+        raise Http404("Exportación no encontrada")
+    
+    exportador = DataExporter(nombre)
+    if request.user.perfilusuario.rol not in exportador.exportacion.roles:
+        messages.error(request, "No tienes permisos para acceder a esta página.")
+        return redirect("dashboard")
+    
+    formato = request.GET.get("formato", "csv")
+    nombre_archivo = f"{nombre}_{date.today():%Y%m%d}"
+    
+    if formato == "xlsx":
+        if not exportador.xlsx_disponible():
+            messages.error(request, "La exportación XLSX no está disponible en este servidor.")
+            return redirect("dashboard")
+        archivo = tempfile.TemporaryFile()
+        exportador.escribir_xlsx(archivo)
+        archivo.seek(0)
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=f"{nombre_archivo}.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    
+    response = StreamingHttpResponse(exportador.lineas_csv(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}.csv"'
+    return response
+
+
+# ============================
+# BÚSQUEDA GLOBAL
+# ============================
+
+@login_required
+@requiere_perfil_usuario
+def buscar(request):
+    """
+    Búsqueda global (índice FTS5) sobre los tipos de registro que ve el rol.
+    ?q=texto&tipo=cliente|vehiculo|orden|repuesto|herramienta&formato=json
+    """
+    rol = request.user.perfilusuario.rol
+    texto = request.GET.get("q", "").strip()
+    permitidos = SearchIndex.tipos_para_rol(rol)
+    tipo = request.GET.get("tipo", "")
+    tipos = [tipo] if tipo in permitidos else permitidos
+    
+    resultados = []
+    for resultado in SearchIndex().buscar(texto, tipos) if texto else []:
+        definicion = TIPOS[resultado.tipo]
+        url = None
+        if definicion.url and rol in definicion.roles_url:
+            url = reverse(definicion.url, args=[resultado.objeto_id])
+        resultados.append({
+            "tipo": resultado.tipo,
+            "id": resultado.objeto_id,
+            "titulo": resultado.titulo,
+            "contenido": resultado.contenido,
+            "url": url,
+        })
+    
+    if request.GET.get("formato") == "json":
+        return JsonResponse({"resultados": resultados})
+    
+    return render(request, "core/busqueda.html", {
+        "q": texto,
+        "tipo": tipo if tipo in permitidos else "",
+        "tipos": permitidos,
+        "resultados": resultados,
+    })
+
+
 # ============================
 # AJAX: Cargar modelos por marca
 # ============================
@@ -766,3 +1105,43 @@ def cargar_modelos(request):
         modelos = ModeloVehiculo.objects.filter(marca_id=marca_id).values("id", "nombre")
         return JsonResponse(list(modelos), safe=False)
     return JsonResponse([], safe=False)
+
+
+def _datos_cliente(cliente):
+    return {
+        "rut": cliente.rut,
+        "nombre": cliente.nombre,
+        "telefono": cliente.telefono,
+        "email": cliente.email or "",
+    }
+
+
+@login_required
+@requiere_rol("RECEPCIONISTA", "ENCARGADO_TALLER")
+def buscar_cliente_vehiculo(request):
+    """
+    Autocompletado de recepción (?q=...): si el texto empieza con un dígito
+    busca clientes por prefijo de RUT, si no, vehículos por prefijo de patente
+    (con su cliente). Una consulta por rango sobre la columna normalizada.
+    """
+    texto = request.GET.get("q", "")
+    limite = getattr(settings, "AUTOCOMPLETADO_LIMITE", 10)
+    
+    if normalizar_rut(texto)[:1].isdigit():
+        clientes = Cliente.objects.con_prefijo_rut(texto)[:limite]
+        resultados = [{"tipo": "cliente", **_datos_cliente(c)} for c in clientes]
+    else:
+        vehiculos = Vehiculo.objects.con_prefijo_patente(texto).select_related("cliente")[:limite]
+        resultados = [
+            {
+                "tipo": "vehiculo",
+                "patente": v.patente,
+                "marca_id": v.marca_id,
+                "modelo_id": v.modelo_id,
+                "anio": v.anio,
+                "kilometraje": v.kilometraje,
+                "cliente": _datos_cliente(v.cliente),
+            }
+            for v in vehiculos
+        ]
+    return JsonResponse({"resultados": resultados})
@@ -131,3 +131,67 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Notificaciones asíncronas (outbox + worker). Con False (default) los
+# observadores se ejecutan dentro del request. Con True los eventos solo se
+# guardan en el outbox: activarlo únicamente si corre el worker junto al
+# servidor, p. ej. como servicio aparte:
+#     python manage.py procesar_outbox --continuo
+# Sin worker no se crea ninguna notificación.
+NOTIFICACIONES_ASINCRONAS = False
+OUTBOX_TAMANO_LOTE = 50
+OUTBOX_MAX_INTENTOS = 5
+OUTBOX_LEASE_SEGUNDOS = 300
+
+# Retención de notificaciones (python manage.py purgar_notificaciones)
+NOTIFICACIONES_RETENCION_DIAS = 90
+NOTIFICACIONES_RETENCION_LOTE = 500
+
+# Plan de reposición: repuestos mostrados (el consumo es la media móvil de
+# CONSUMO_VENTANA_MOVIL_DIAS que copia calcular_consumo)
+REPOSICION_TOP = 20
+
+# Estadísticas de consumo precalculadas (python manage.py calcular_consumo)
+CONSUMO_VENTANA_DIAS = 365
+CONSUMO_VENTANA_MOVIL_DIAS = 30
+CONSUMO_Z_SERVICIO = 1.65
+
+# Búsqueda global (FTS5): resultados por consulta y documentos por inserción
+# al reconstruir el índice (python manage.py reconstruir_busqueda)
+BUSQUEDA_LIMITE = 20
+BUSQUEDA_LOTE = 2000
+
+# Autocompletado de RUT / patente en recepción: sugerencias por consulta
+AUTOCOMPLETADO_LIMITE = 10
+
+# Catálogo de estados de OT en memoria: un nombre desconocido recarga el
+# catálogo a lo más una vez por este intervalo (estados creados en otro proceso)
+ESTADOS_RECARGA_SEGUNDOS = 30
+
+# Caché (sin servicios externos). Para compartir los contadores entre procesos
+# usar 'django.core.cache.backends.filebased.FileBasedCache' con LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'taller-mecanico',
+    }
+}
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TTL = 30  # segundos
+
+# Paginación por cursor de las listas (filas por página)
+PAGINACION_TAMANO = 50
+PAGINACION_TAMANO_MAXIMO = 200
+
+# Informes PDF: procesos del pool que renderiza con xhtml2pdf
+# (0 = renderizar en el mismo proceso). Los PDFs quedan en MEDIA_ROOT/informes.
+INFORMES_PDF_WORKERS = 2
+# Tamaño máximo del caché de PDFs (se eliminan los menos usados)
+INFORMES_PDF_CACHE_MAX_MB = 200
+# Un informe "pendiente" más antiguo que esto (worker caído) se vuelve a encolar
+INFORMES_PENDIENTE_EXPIRA_SEGUNDOS = 900
+# Exportación masiva: máximo de OTs por ZIP
+INFORMES_LOTE_MAXIMO = 500
+
+# Exportación CSV/XLSX: filas leídas por bloque del cursor
+EXPORTACION_CHUNK_SIZE = 2000
@@ -3,7 +3,10 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.admin import metricas_cache
+
 urlpatterns = [
+    path('admin/metricas-cache/', admin.site.admin_view(metricas_cache), name='metricas_cache'),
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
 ]